@@ -7,7 +7,13 @@ Performs data quality checks, explores structure, and suggests schema design.
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from pathlib import Path
 import os
+import sys
+
+sys.path.append(str(Path(__file__).parent / "src"))
+from etl.csv_reader import read_csv_frame
+from etl.profiling import run_entry_point
 
 
 def load_and_inspect_data():
@@ -18,7 +24,7 @@ def load_and_inspect_data():
     
     try:
         # Load dataset from external folder
-        df = pd.read_csv("data/external/ev_charging_patterns.csv")
+        df = read_csv_frame("data/external/ev_charging_patterns.csv")
         
         # Print general dataset info
         print(f"Dataset Shape: {df.shape[0]} rows, {df.shape[1]} columns")
@@ -338,4 +344,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    run_entry_point(main, "analyze_kaggle_data")
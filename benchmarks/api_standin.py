@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+NREL / OpenWeather Stand-in Server
+Replays recorded API responses over local HTTP so the extractors can be
+load-tested without keys or quota. Recordings are ordinary raw extracts: run
+the extractors once against the live APIs and point the server at the files
+they wrote to data/raw (or at synthetic ones from synthetic_data.py).
+
+    python benchmarks/api_standin.py --nrel data/raw/nrel_stations_*.ndjson.gz \\
+        --weather data/raw/weather_data_*.ndjson.gz --latency 0.05 --quota 100 --window 60
+
+Point an extractor at it by overriding its base_url:
+
+    extractor.base_url = "http://127.0.0.1:8765/api/alt-fuel-stations/v1"
+    extractor.base_url = "http://127.0.0.1:8765/data/2.5"
+
+Served behaviour:
+    /api/alt-fuel-stations/v1.json  stations filtered by state, paged by limit/offset
+    /data/2.5/weather               the next recorded observation for q's city
+    latency + jitter                added to every response
+    error_rate                      share of requests answered with HTTP 500
+    quota per window                fixed-window limit; over it answers 429 with
+                                    Retry-After, X-RateLimit-* and RateLimit-Reset
+                                    headers otherwise
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "src"))
+
+from data_sources.json_codec import iter_raw_records
+
+# Mirror the live base URLs so extractors only swap the host
+NREL_BASE_PATH = "/api/alt-fuel-stations/v1"
+WEATHER_BASE_PATH = "/data/2.5"
+DEFAULT_PAGE_SIZE = 200
+
+
+class StandInAPI:
+    def __init__(self, stations=(), weather=(), latency=0.0, jitter=0.0, error_rate=0.0,
+                 quota=None, window=60.0, rate_headers=True, seed=42):
+        """
+        Args:
+            stations (iterable): NREL fuel station records to serve
+            weather (iterable): OpenWeather records to serve, keyed by their 'name'
+            latency (float): Seconds added to every response
+            jitter (float): Extra random seconds, uniform in [0, jitter)
+            error_rate (float): Share of requests answered with HTTP 500
+            quota (int): Requests allowed per window; None disables throttling
+            window (float): Length of the quota window in seconds
+            rate_headers (bool): Send X-RateLimit-* headers (NREL does, OpenWeather does not)
+        """
+        self.stations = list(stations)
+        self.weather = defaultdict(list)
+        for rec in weather:
+            self.weather[rec.get("name", "").lower()].append(rec)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.quota = quota
+        self.window = window
+        self.rate_headers = rate_headers
+        self.stats = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._used = 0
+        self._weather_pos = Counter()
+        self._server = None
+
+    @classmethod
+    def from_files(cls, nrel=None, weather=None, **kwargs):
+        """Load recordings from raw extracts (NDJSON or legacy JSON)."""
+        stations = iter_raw_records(nrel, "fuel_stations") if nrel else ()
+        observations = iter_raw_records(weather, "weather_data") if weather else ()
+        return cls(stations, observations, **kwargs)
+
+    def admit(self):
+        """Decide how to answer the next request: (status, headers)."""
+        with self._lock:
+            self.stats["requests"] += 1
+            headers = {}
+            if self.quota:
+                now = time.monotonic()
+                if now - self._window_start >= self.window:
+                    self._window_start, self._used = now, 0
+                reset = self._window_start + self.window - now
+                if self._used >= self.quota:
+                    self.stats["throttled"] += 1
+                    headers["Retry-After"] = str(math.ceil(reset))
+                    if self.rate_headers:
+                        headers.update({"X-RateLimit-Limit": str(self.quota), "X-RateLimit-Remaining": "0"})
+                    return 429, headers
+                self._used += 1
+                if self.rate_headers:
+                    headers.update({"X-RateLimit-Limit": str(self.quota),
+                                    "X-RateLimit-Remaining": str(self.quota - self._used),
+                                    "RateLimit-Reset": str(math.ceil(reset))})
+            if self._rng.random() < self.error_rate:
+                self.stats["errors"] += 1
+                return 500, headers
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+        return 200, headers
+
+    def stations_page(self, params):
+        state = params.get("state")
+        stations = [s for s in self.stations if not state or s.get("state") == state]
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", DEFAULT_PAGE_SIZE))
+        page = stations[offset:offset + limit]
+        with self._lock:
+            self.stats["records"] += len(page)
+        return 200, {"total_results": len(stations), "offset": offset, "fuel_stations": page}
+
+    def current_weather(self, params):
+        city = params.get("q", "").split(",")[0].strip().lower()
+        records = self.weather.get(city)
+        if not records:
+            return 404, {"cod": "404", "message": "city not found"}
+        with self._lock:
+            rec = records[self._weather_pos[city] % len(records)]
+            self._weather_pos[city] += 1
+            self.stats["records"] += 1
+        return 200, {k: v for k, v in rec.items() if k != "extraction_timestamp"}
+
+    def start(self, host="127.0.0.1", port=0):
+        """Serve on a background thread; returns the base URL."""
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                status, headers = api.admit()
+                if status != 200:
+                    body = {"error": {"code": status, "message": "stand-in injected response"}}
+                elif url.path == NREL_BASE_PATH + ".json":
+                    status, body = api.stations_page(params)
+                elif url.path == WEATHER_BASE_PATH + "/weather":
+                    status, body = api.current_weather(params)
+                else:
+                    status, body = 404, {"error": {"code": 404, "message": f"unknown path {url.path}"}}
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self._server.server_address[1]}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded NREL and OpenWeather responses locally")
+    parser.add_argument("--nrel", type=Path, help="raw NREL extract to replay")
+    parser.add_argument("--weather", type=Path, help="raw weather extract to replay")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random seconds per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered 500")
+    parser.add_argument("--quota", type=int, help="requests allowed per window before 429s")
+    parser.add_argument("--window", type=float, default=60.0, help="quota window in seconds")
+    parser.add_argument("--no-rate-headers", action="store_true", help="omit X-RateLimit-* headers")
+    args = parser.parse_args()
+
+    api = StandInAPI.from_files(args.nrel, args.weather, latency=args.latency, jitter=args.jitter,
+                                error_rate=args.error_rate, quota=args.quota, window=args.window,
+                                rate_headers=not args.no_rate_headers)
+    url = api.start(port=args.port)
+    print(f"Serving {len(api.stations)} stations and {sum(map(len, api.weather.values()))} "
+          f"weather records at {url} (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.stop()
+        print(json.dumps(dict(api.stats)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
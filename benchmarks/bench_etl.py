@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+ETL Scale Benchmark
+Generates synthetic datasets at several scales, runs each ETL stage in its own
+process and records throughput, peak RSS and output size. Results are compared
+against benchmarks/baseline.json, which --update-baseline rewrites.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import resource
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
+
+from data_sources.raw_store import RawStore
+from data_sources.synthetic_data import generate_dataset, parse_scale
+
+BASELINE = Path(__file__).parent / "baseline.json"
+DEFAULT_WORKDIR = Path("data/bench")
+# A stage regresses when it is this much slower or hungrier than the baseline
+TOLERANCE = 0.20
+
+
+def stage_transform_sessions(root):
+    from etl.transform import transform_ev_sessions
+    out = root / "data/processed/ev_sessions_transformed.csv"
+    rows = transform_ev_sessions(root / "data/raw/ev_charging_patterns.csv", out)
+    return rows, out
+
+
+def stage_transform_nrel(root):
+    from etl.transform import transform_nrel_stations
+    out = root / "data/processed/nrel_stations_transformed.csv"
+    rows = transform_nrel_stations(RawStore(root / "data/raw").latest("nrel_stations"), out)
+    return rows, out
+
+
+def stage_transform_weather(root):
+    from etl.transform import transform_weather
+    out = root / "data/processed/weather_transformed.csv"
+    rows = transform_weather(RawStore(root / "data/raw").latest("weather_data"), out)
+    return rows, out
+
+
+def stage_read_rows_csv(root):
+    # The row reader transform_ev_sessions uses
+    from etl.csv_reader import iter_csv_rows
+    rows = sum(1 for _ in iter_csv_rows(root / "data/raw/ev_charging_patterns.csv"))
+    return rows, None
+
+
+def stage_read_rows_arrow(root):
+    # The same dicts from pyarrow's parallel parse; switch the transform only if this wins
+    from etl.csv_reader import iter_csv_batches
+    rows = 0
+    for batch in iter_csv_batches(root / "data/raw/ev_charging_patterns.csv"):
+        for row in batch.to_pylist():
+            rows += 1
+    return rows, None
+
+
+def stage_data_quality(root):
+    from etl.data_quality import validate_columns, validate_csv_not_empty
+    from etl.transform import SESSION_FIELDS
+    path = root / "data/processed/ev_sessions_transformed.csv"
+    validate_columns(path, SESSION_FIELDS)
+    validate_csv_not_empty(path)
+    return _count_lines(path) - 1, None
+
+
+def stage_build_facts(root):
+    from etl.facts import build_fact_sessions
+    from etl.keys import KeyRegistries
+    out = root / "data/processed/fact_charging_sessions.csv"
+    with KeyRegistries(root / "data/state/keys") as keys:
+        rows = build_fact_sessions(root / "data/processed/ev_sessions_transformed.csv", out, keys=keys)
+    return rows, out
+
+
+def stage_analyze_kaggle(root):
+    import analyze_kaggle_data as analysis
+    # analyze_kaggle_data reads and writes relative to the project root
+    os.chdir(root)
+    df = analysis.load_and_inspect_data()
+    analysis.analyze_data_quality(df)
+    analysis.analyze_key_fields(df)
+    analysis.analyze_numeric_fields(df)
+    analysis.analyze_datetime_fields(df)
+    cleaning_tasks = analysis.identify_data_cleaning_needs(df)
+    analysis.save_analysis_results(df, cleaning_tasks)
+    return len(df), root / "reports/numeric_summary.csv"
+
+
+STAGES = {
+    "read_rows_csv": stage_read_rows_csv,
+    "read_rows_arrow": stage_read_rows_arrow,
+    "transform_ev_sessions": stage_transform_sessions,
+    "transform_nrel_stations": stage_transform_nrel,
+    "transform_weather": stage_transform_weather,
+    "data_quality": stage_data_quality,
+    "build_fact_sessions": stage_build_facts,
+    "analyze_kaggle_data": stage_analyze_kaggle,
+}
+
+
+def _count_lines(path):
+    with open(path, 'rb') as f:
+        return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
+
+
+def _peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _run_stage(name, root, queue):
+    # Keep stage output from drowning the benchmark report
+    sys.stdout = open(os.devnull, 'w')
+    started = time.perf_counter()
+    rows, output = STAGES[name](root)
+    elapsed = time.perf_counter() - started
+    queue.put({
+        "seconds": round(elapsed, 3),
+        "rows": rows,
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed else None,
+        "peak_rss_mb": round(_peak_rss_bytes() / 1024**2, 1),
+        "output_mb": round(output.stat().st_size / 1024**2, 2) if output else None,
+    })
+
+
+def run_stage(name, root):
+    """Run one stage in a fresh process so peak RSS is attributable to it."""
+    queue = mp.Queue()
+    proc = mp.Process(target=_run_stage, args=(name, root.resolve(), queue))
+    proc.start()
+    proc.join()
+    if proc.exitcode != 0:
+        return {"error": f"exit code {proc.exitcode}"}
+    return queue.get()
+
+
+def run_scale(scale, workdir, stages, seed):
+    sessions = parse_scale(scale)
+    root = workdir / f"{scale}_seed{seed}"
+    marker = root / "data/raw/.complete"
+    if not marker.exists():
+        print(f"Generating {scale} dataset in {root}...")
+        generate_dataset(root, sessions, seed=seed)
+        marker.touch()
+    (root / "data/processed").mkdir(parents=True, exist_ok=True)
+
+    results = {}
+    for name in stages:
+        results[name] = run_stage(name, root)
+        print(f"  {scale:>6} {name:<25} {json.dumps(results[name])}")
+    return results
+
+
+def compare(results, baseline):
+    """Return a list of regression messages versus the stored baseline."""
+    regressions = []
+    for scale, stages in results.items():
+        for stage, current in stages.items():
+            base = baseline.get(scale, {}).get(stage)
+            if not base or "error" in base or "error" in current:
+                continue
+            # rows_per_sec is None when a stage finished too fast to time
+            if (current["rows_per_sec"] is not None and base["rows_per_sec"] is not None
+                    and current["rows_per_sec"] < base["rows_per_sec"] * (1 - TOLERANCE)):
+                regressions.append(f"{scale}/{stage}: throughput {current['rows_per_sec']} rows/s "
+                                   f"vs baseline {base['rows_per_sec']}")
+            if current["peak_rss_mb"] > base["peak_rss_mb"] * (1 + TOLERANCE):
+                regressions.append(f"{scale}/{stage}: peak RSS {current['peak_rss_mb']} MB "
+                                   f"vs baseline {base['peak_rss_mb']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ETL stages on synthetic data")
+    parser.add_argument("--scales", nargs="+", default=["100k"], help="e.g. 1M 10M 100M")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=list(STAGES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", type=Path, default=DEFAULT_WORKDIR)
+    parser.add_argument("--output", type=Path, help="write results JSON here")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = {scale: run_scale(scale, args.workdir, args.stages, args.seed) for scale in args.scales}
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    if args.update_baseline:
+        baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+        for scale, stages in results.items():
+            baseline.setdefault(scale, {}).update(stages)
+        BASELINE.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"Baseline updated: {BASELINE}")
+        return 0
+
+    if not BASELINE.exists():
+        print("No baseline stored yet; rerun with --update-baseline to record one")
+        return 0
+
+    regressions = compare(results, json.loads(BASELINE.read_text()))
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    print(f"{len(regressions)} regressions against {BASELINE}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
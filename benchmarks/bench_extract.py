@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Extractor Load Benchmark
+Drives NRELExtractor and WeatherExtractor against the local stand-in server
+(benchmarks/api_standin.py) and reports throughput, retries and time spent
+waiting on the rate limiter, at one or more worker counts.
+
+NREL jobs page through every state's stations; weather jobs request each city
+--weather-rounds times. Workers share one rate limiter per source, as threads
+of one extractor would. Recordings default to synthetic extracts; pass real
+ones with --nrel / --weather.
+
+    python benchmarks/bench_extract.py --workers 1 4 16 --latency 0.05 --error-rate 0.02 --quota 600
+"""
+
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
+sys.path.append(str(Path(__file__).parent))
+
+from api_standin import NREL_BASE_PATH, WEATHER_BASE_PATH, StandInAPI
+from data_sources.synthetic_data import generate_nrel_json, generate_weather_json
+
+DEFAULT_WORKDIR = Path("data/bench/extract")
+
+
+def load_recordings(args):
+    nrel, weather = args.nrel, args.weather
+    args.workdir.mkdir(parents=True, exist_ok=True)
+    if nrel is None:
+        nrel = generate_nrel_json(args.workdir / "nrel_stations.ndjson", args.stations, seed=args.seed)
+    if weather is None:
+        weather = generate_weather_json(args.workdir / "weather_data.ndjson", 1000, seed=args.seed)
+    return nrel, weather
+
+
+def _thread_extractors(factory, limiter, base_url):
+    """One extractor (and HTTP session) per worker thread, all sharing one limiter."""
+    local = threading.local()
+
+    def get():
+        if not hasattr(local, "extractor"):
+            local.extractor = factory()
+            local.extractor.limiter = limiter
+            local.extractor.base_url = base_url
+        return local.extractor
+    return get
+
+
+def nrel_jobs(api, page_size):
+    states = sorted({s.get("state") for s in api.stations if s.get("state")})
+    for state in states:
+        total = sum(1 for s in api.stations if s.get("state") == state)
+        for offset in range(0, total, page_size):
+            yield state, offset
+
+
+def run_source(name, api, url, workers, jobs, call, min_interval):
+    """Run jobs for one source on `workers` threads; returns its result record."""
+    from etl.metrics import stage
+    from data_sources.nrel_api import NRELExtractor
+    from data_sources.weather_api import WeatherExtractor
+
+    factory, path = (NRELExtractor, NREL_BASE_PATH) if name == "nrel" else (WeatherExtractor, WEATHER_BASE_PATH)
+    limiter = factory().limiter
+    limiter.min_interval = min_interval
+    if api.quota:
+        # Without headers the limiter can only go by the published quota; make it the stand-in's
+        limiter.limit, limiter.window = api.quota, api.window
+        limiter.interval = limiter.steady_interval
+    extractor = _thread_extractors(factory, limiter, url + path)
+    before = api.stats.copy()
+
+    def job(args):
+        try:
+            return call(extractor(), *args), None
+        except Exception as e:
+            return 0, e
+
+    with stage(f"bench_extract_{name}", workers=workers) as m:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(job, jobs))
+        elapsed = time.perf_counter() - started
+    served = api.stats - before
+    records = sum(n for n, _ in results)
+    return {
+        "jobs": len(results),
+        # WeatherExtractor logs and skips a city after its last retry instead of raising
+        "failed_jobs": sum(1 for n, e in results if e is not None or not n),
+        "records": records,
+        "seconds": round(elapsed, 3),
+        "requests": m.http_requests,
+        "requests_per_sec": round(m.http_requests / elapsed, 1) if elapsed else None,
+        "records_per_sec": round(records / elapsed, 1) if elapsed else None,
+        "retries": m.http_requests - len(results),
+        "server_errors": served["errors"],
+        "throttled": served["throttled"],
+        "rate_limit_wait_seconds": round(limiter.waited_seconds, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the extractors against the stand-in API")
+    parser.add_argument("--nrel", type=Path, help="raw NREL extract to replay (default: synthetic)")
+    parser.add_argument("--weather", type=Path, help="raw weather extract to replay (default: synthetic)")
+    parser.add_argument("--stations", type=int, default=5000, help="synthetic stations when --nrel is not given")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--weather-rounds", type=int, default=5, help="requests per city")
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--quota", type=int, help="stand-in requests per window before 429s")
+    parser.add_argument("--window", type=float, default=10.0)
+    parser.add_argument("--no-rate-headers", action="store_true")
+    parser.add_argument("--min-interval", type=float, default=0.0,
+                        help="shortest spacing between requests the limiter allows")
+    parser.add_argument("--workdir", type=Path, default=DEFAULT_WORKDIR)
+    parser.add_argument("--output", type=Path, help="write results JSON here")
+    args = parser.parse_args()
+
+    # Per-request INFO lines from the extractors would drown the report
+    logging.getLogger().setLevel(logging.WARNING)
+    nrel, weather = load_recordings(args)
+    api = StandInAPI.from_files(nrel, weather, latency=args.latency, jitter=args.jitter,
+                                error_rate=args.error_rate, quota=args.quota, window=args.window,
+                                rate_headers=not args.no_rate_headers, seed=args.seed)
+    url = api.start()
+    cities = [f"{name.title()},US" for name in sorted(api.weather)] * args.weather_rounds
+    try:
+        results = {}
+        for workers in args.workers:
+            results[workers] = {
+                "nrel": run_source("nrel", api, url, workers, list(nrel_jobs(api, args.page_size)),
+                                   lambda ex, state, offset: len(ex.extract_stations(
+                                       state=state, limit=args.page_size, offset=offset)["fuel_stations"]),
+                                   args.min_interval),
+                "weather": run_source("weather", api, url, workers, [(city,) for city in cities],
+                                      lambda ex, city: len(ex.extract_current_weather([city])),
+                                      args.min_interval),
+            }
+            for source, result in results[workers].items():
+                print(f"{workers:>3} workers {source:<8} {json.dumps(result)}")
+    finally:
+        api.stop()
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+CLI Import-Time Guard
+Runs `python -X importtime evdw.py <args>` and fails when startup imports a
+heavy dependency or the import time exceeds the budget.
+
+Only modules a bare `python -c pass` does not import count toward the budget,
+so interpreter and `site` startup are left out. Each command runs several
+times and the fastest run is kept, so scheduler noise does not fail the check.
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+EVDW = ROOT / "evdw.py"
+
+# Commands that must start without touching the heavy stack
+FAST_COMMANDS = [["--help"], ["transform", "--help"], ["load", "--help"], ["profile", "--help"]]
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "requests", "snowflake", "dotenv")
+# Summed self import time of the modules evdw itself pulls in
+DEFAULT_BUDGET_MS = 30.0
+DEFAULT_RUNS = 5
+
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _importtime(argv):
+    proc = subprocess.run([sys.executable, "-X", "importtime", *argv],
+                          capture_output=True, text=True, cwd=ROOT)
+    return [LINE.match(line).groups() for line in proc.stderr.splitlines() if LINE.match(line)]
+
+
+def startup_modules():
+    """Modules the interpreter imports before running any code."""
+    return {module for _, _, _, module in _importtime(["-c", "pass"])}
+
+
+def measure(args, startup=frozenset()):
+    """
+    Return (total_ms, top-level [(cumulative_ms, module)], every imported module)
+    for one CLI invocation. total_ms sums the self time of modules not in startup.
+    """
+    total_us = 0
+    modules = []
+    imported = set()
+    for self_us, cumulative_us, indent, module in _importtime([str(EVDW), *args]):
+        imported.add(module)
+        if module not in startup:
+            total_us += int(self_us)
+        # Top-level imports have a single space of indentation
+        if len(indent) == 1 and module not in startup:
+            modules.append((int(cumulative_us) / 1000, module))
+    return total_us / 1000, sorted(modules, reverse=True), imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Guard evdw startup import time")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="maximum summed self import time of evdw's own imports per command")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="runs per command; the fastest counts")
+    parser.add_argument("--top", type=int, default=8, help="slowest top-level imports to show")
+    args = parser.parse_args()
+
+    startup = startup_modules()
+    failures = []
+    for command in FAST_COMMANDS:
+        total_ms, modules, imported = min((measure(command, startup) for _ in range(args.runs)),
+                                          key=lambda run: run[0])
+        label = "evdw " + " ".join(command)
+        print(f"{label:<24} {total_ms:7.1f} ms")
+        for cumulative_ms, module in modules[:args.top]:
+            print(f"    {cumulative_ms:7.1f} ms  {module}")
+        heavy = sorted({m for m in imported if m.split(".")[0] in HEAVY_MODULES})
+        if heavy:
+            failures.append(f"{label}: imports heavy modules {heavy}")
+        if total_ms > args.budget_ms:
+            failures.append(f"{label}: {total_ms:.1f} ms exceeds budget of {args.budget_ms:.1f} ms")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Micro-Partition Pruning Benchmark
+Builds FACT_CHARGING_SESSIONS rows from synthetic sessions in arrival order and
+in clustering order (date_id, station_id). It then counts how many
+micro-partitions typical dashboard predicates must scan. The load inserts
+new facts ordered by the same key (sql/dml/merge_facts.sql), so the clustered
+layout is what the table gets.
+
+Locally, partitions are simulated by cutting the fact file into fixed-size
+row groups and keeping min/max zone maps per group, as Snowflake does per
+micro-partition. With --snowflake the same predicates are run through
+EXPLAIN USING JSON against ANALYTICS.FACT_CHARGING_SESSIONS, and the planner's
+partitionsAssigned / partitionsTotal are reported.
+"""
+
+import argparse
+import csv
+import json
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
+
+from data_sources.synthetic_data import generate_sessions_csv, parse_scale
+from etl.facts import build_fact_sessions
+from etl.keys import KeyRegistries
+from etl.transform import transform_ev_sessions
+
+DEFAULT_WORKDIR = Path("data/bench/pruning")
+DEFAULT_PARTITION_ROWS = 20_000
+
+
+def zone_maps(fact_csv, partition_rows):
+    """[(min date_id, max date_id, min station_id, max station_id)] per simulated partition."""
+    maps, part = [], []
+    with open(fact_csv, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            part.append((int(row["date_id"]), int(row["station_id"])))
+            if len(part) == partition_rows:
+                maps.append(_zone_map(part))
+                part = []
+    if part:
+        maps.append(_zone_map(part))
+    return maps
+
+
+def _zone_map(part):
+    dates = [d for d, _ in part]
+    stations = [s for _, s in part]
+    return min(dates), max(dates), min(stations), max(stations)
+
+
+def dashboard_predicates(fact_csv):
+    """Typical dashboard filters, anchored on values present in the data."""
+    stations, days = Counter(), Counter()
+    with open(fact_csv, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            stations[int(row["station_id"])] += 1
+            days[int(row["date_id"]) // 100] += 1
+    station = stations.most_common(1)[0][0]
+    all_days = sorted(days)
+    day = all_days[len(all_days) // 2]
+    week = all_days[len(all_days) // 2: len(all_days) // 2 + 7]
+    month = day // 100
+    return {
+        "one day": (day * 100, day * 100 + 23, None),
+        "one week": (week[0] * 100, week[-1] * 100 + 23, None),
+        "one station": (None, None, station),
+        "station x month": (month * 10000, month * 10000 + 9999, station),
+    }
+
+
+def partitions_scanned(maps, predicate):
+    lo, hi, station = predicate
+    scanned = 0
+    for min_date, max_date, min_station, max_station in maps:
+        if lo is not None and (max_date < lo or min_date > hi):
+            continue
+        if station is not None and not (min_station <= station <= max_station):
+            continue
+        scanned += 1
+    return scanned
+
+
+def predicate_sql(predicate):
+    lo, hi, station = predicate
+    where = []
+    if lo is not None:
+        where.append(f"date_id BETWEEN {lo} AND {hi}")
+    if station is not None:
+        where.append(f"station_id = {station}")
+    return f"SELECT SUM(energy_consumed_kwh) FROM ANALYTICS.FACT_CHARGING_SESSIONS WHERE {' AND '.join(where)}"
+
+
+def explain_partitions(cs, sql):
+    cs.execute(f"EXPLAIN USING JSON {sql}")
+    stats = json.loads(cs.fetchone()[0])["GlobalStats"]
+    return stats["partitionsAssigned"], stats["partitionsTotal"]
+
+
+def shuffled_copy(src, dst, seed):
+    """Rewrite a CSV with its rows in random order, to mimic out-of-order arrival."""
+    with open(src, newline='', encoding='utf-8') as f:
+        header, *lines = f.readlines()
+    random.Random(seed).shuffle(lines)
+    with open(dst, 'w', newline='', encoding='utf-8') as f:
+        f.write(header)
+        f.writelines(lines)
+
+
+def run_local(args):
+    workdir = args.workdir
+    workdir.mkdir(parents=True, exist_ok=True)
+    raw = workdir / "sessions_raw.csv"
+    sessions = workdir / "sessions.csv"
+    generate_sessions_csv(raw, parse_scale(args.sessions), seed=args.seed)
+    if args.shuffle:
+        shuffled_copy(raw, raw, args.seed)
+    transform_ev_sessions(raw, sessions)
+
+    layouts = {}
+    for name, cluster in (("arrival order", False), ("clustered", True)):
+        fact_csv = workdir / f"facts_{name.replace(' ', '_')}.csv"
+        with KeyRegistries(workdir / "keys") as keys:
+            build_fact_sessions(sessions, fact_csv, cluster=cluster, keys=keys)
+        layouts[name] = zone_maps(fact_csv, args.partition_rows)
+
+    predicates = dashboard_predicates(fact_csv)
+    total = len(layouts["clustered"])
+    print(f"{parse_scale(args.sessions)} sessions, {total} partitions of {args.partition_rows} rows")
+    print(f"{'predicate':<18}" + "".join(f"{name:>24}" for name in layouts))
+    results = {}
+    for label, predicate in predicates.items():
+        cells = []
+        for name, maps in layouts.items():
+            scanned = partitions_scanned(maps, predicate)
+            results.setdefault(label, {})[name] = scanned
+            cells.append(f"{scanned:>6}/{total} ({1 - scanned / total:6.1%} pruned)")
+        print(f"{label:<18}" + "".join(f"{cell:>24}" for cell in cells))
+    return results
+
+
+def run_snowflake(args):
+    from database.snowflake_connector import get_connection
+    sessions = args.workdir / "sessions.csv"
+    if not sessions.exists():
+        raise SystemExit(f"{sessions} not found; run the local benchmark first to pick predicates")
+    fact_csv = args.workdir / "facts_clustered.csv"
+    with KeyRegistries(args.workdir / "keys") as keys:
+        build_fact_sessions(sessions, fact_csv, keys=keys)
+
+    conn = get_connection()
+    cs = conn.cursor()
+    try:
+        cs.execute("USE DATABASE EV_CHARGING_DW")
+        cs.execute("USE WAREHOUSE EV_DEV_WH")
+        results = {}
+        for label, predicate in dashboard_predicates(fact_csv).items():
+            assigned, total = explain_partitions(cs, predicate_sql(predicate))
+            results[label] = {"partitions_assigned": assigned, "partitions_total": total}
+            pruned = 1 - assigned / total if total else 0.0
+            print(f"{label:<18} {assigned:>6}/{total} partitions ({pruned:.1%} pruned)")
+        return results
+    finally:
+        cs.close()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure micro-partition pruning of the fact layout")
+    parser.add_argument("--sessions", default="200k", help="synthetic sessions, e.g. 200k or 1M")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--partition-rows", type=int, default=DEFAULT_PARTITION_ROWS,
+                        help="rows per simulated micro-partition")
+    parser.add_argument("--shuffle", action="store_true",
+                        help="shuffle the raw sessions to mimic out-of-order arrival")
+    parser.add_argument("--workdir", type=Path, default=DEFAULT_WORKDIR)
+    parser.add_argument("--snowflake", action="store_true",
+                        help="EXPLAIN the predicates against the loaded fact table instead")
+    parser.add_argument("--output", type=Path, help="write results JSON here")
+    args = parser.parse_args()
+
+    results = run_snowflake(args) if args.snowflake else run_local(args)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
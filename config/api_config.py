@@ -1,12 +1,15 @@
 import os
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
-
-# API Configuration
-NREL_API_KEY = os.getenv('NREL_API_KEY')
-OPENWEATHER_API_KEY = os.getenv('OPENWEATHER_API_KEY')
+# Settings backed by environment variables (or .env). They are resolved on first
+# access through __getattr__ below, so importing this module never pays for
+# python-dotenv or touches the filesystem.
+ENV_SETTINGS = {
+    # API Configuration
+    'NREL_API_KEY': None,
+    'OPENWEATHER_API_KEY': None,
+    # Raw extract storage: none, gzip or zstd (zstd falls back to gzip if unavailable)
+    'RAW_COMPRESSION': 'gzip',
+}
 
 # API Endpoints
 NREL_BASE_URL = "https://developer.nrel.gov/api/alt-fuel-stations/v1"
@@ -15,5 +18,39 @@ OPENWEATHER_BASE_URL = "https://api.openweathermap.org/data/2.5"
 # Request settings
 REQUEST_TIMEOUT = 30
 MAX_RETRIES = 3
-RATE_LIMIT_DELAY = 1.0  # seconds between requests
-# Headers for API requests
\ No newline at end of file
+# Published quotas as (requests, window seconds). Extractors pace themselves from
+# the quota headers of each response and fall back to these when none are sent.
+NREL_RATE_LIMIT = (1000, 3600)
+OPENWEATHER_RATE_LIMIT = (60, 60)
+# Cities the weather extract queries, as OpenWeather "city,state,country" queries
+WEATHER_CITIES = [
+    "Los Angeles,CA,US",
+    "New York,NY,US",
+    "Chicago,IL,US",
+    "Houston,TX,US",
+    "Phoenix,AZ,US",
+    "Philadelphia,PA,US",
+    "San Antonio,TX,US",
+    "San Diego,CA,US",
+    "Dallas,TX,US",
+    "Austin,TX,US",
+]
+# Headers for API requests
+
+_env_loaded = False
+
+
+def load_env():
+    """Load .env into the process environment once."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+
+def __getattr__(name):
+    if name in ENV_SETTINGS:
+        load_env()
+        return os.getenv(name, ENV_SETTINGS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
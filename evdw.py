@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+evdw - EV Charging Data Warehouse command line
+
+    evdw extract {nrel,weather,all}
+    evdw transform [--parallel] [--workers N] [--keep-shards] [--duplicates POLICY]
+    evdw validate
+    evdw load [--force | --watch [--interval S] [--max-wait S]]
+    evdw rollup
+    evdw profile [--modes cpu,mem] <command> [args...]
+
+Only the standard library is imported up front. Each command imports its
+pipeline module (and with it requests, pandas or snowflake.connector) when it
+runs, so `evdw --help` and argument errors return immediately. Any command also
+accepts --profile[=MODES] / EVDW_PROFILE, like the individual scripts.
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
+
+
+def cmd_extract(args):
+    if args.source in ("nrel", "all"):
+        from data_sources import nrel_api
+        nrel_api.main()
+    if args.source in ("weather", "all"):
+        from data_sources import weather_api
+        weather_api.main()
+
+
+def cmd_transform(args):
+    from etl import transform
+    argv = []
+    if args.parallel:
+        argv.append("--parallel")
+    if args.workers:
+        argv += ["--workers", str(args.workers)]
+    if args.keep_shards:
+        argv.append("--keep-shards")
+    argv += ["--duplicates", args.duplicates]
+    transform.main(argv)
+
+
+def cmd_validate(args):
+    from etl.data_quality import validate_columns, validate_csv_not_empty
+    from etl.transform import NREL_FIELDS, PROCESSED_DIR, SESSION_FIELDS, WEATHER_FIELDS
+    expected = {
+        "ev_sessions_transformed.csv": SESSION_FIELDS,
+        "nrel_stations_transformed.csv": NREL_FIELDS,
+        "weather_transformed.csv": WEATHER_FIELDS,
+    }
+    for name, columns in expected.items():
+        path = PROCESSED_DIR / name
+        validate_columns(path, columns)
+        validate_csv_not_empty(path)
+
+
+def cmd_load(args):
+    if args.watch:
+        from etl import microbatch
+        return microbatch.main(["--interval", str(args.interval), "--max-wait", str(args.max_wait)])
+    from etl import load
+    load.main(["--force"] if args.force else [])
+
+
+def cmd_rollup(args):
+    from etl import rollups
+    rollups.main()
+
+
+def cmd_profile(args):
+    from etl.profiling import parse_modes, run_profiled
+    if not args.command_args:
+        raise SystemExit("evdw profile: a command to profile is required")
+    inner = build_parser().parse_args(args.command_args)
+    if inner.func is cmd_profile:
+        raise SystemExit("evdw profile: cannot profile the profile command")
+    return run_profiled(inner.func, inner.command, parse_modes(args.modes), inner)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="evdw", description="EV Charging Data Warehouse pipeline")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("extract", help="pull raw data from the NREL and OpenWeather APIs")
+    p.add_argument("source", nargs="?", default="all", choices=["nrel", "weather", "all"])
+    p.set_defaults(func=cmd_extract)
+
+    p = sub.add_parser("transform", help="transform raw extracts into staging CSVs")
+    p.add_argument("--parallel", action="store_true", help="run the transforms in a process pool")
+    p.add_argument("--workers", type=int, help="pool size for --parallel (default: CPU count)")
+    p.add_argument("--keep-shards", action="store_true",
+                   help="keep per-shard session outputs instead of concatenating them")
+    p.add_argument("--duplicates", choices=["quarantine", "drop", "keep"], default="quarantine",
+                   help="repeated sessions: write to data/quarantine (default), drop, or keep")
+    p.set_defaults(func=cmd_transform)
+
+    p = sub.add_parser("validate", help="check the staging CSVs are complete and non-empty")
+    p.set_defaults(func=cmd_validate)
+
+    p = sub.add_parser("load", help="PUT and COPY staging CSVs into Snowflake")
+    p.add_argument("--force", action="store_true",
+                   help="reload files that are unchanged since their last load")
+    p.add_argument("--watch", action="store_true",
+                   help="keep running and load new staging files in micro-batches")
+    p.add_argument("--interval", type=float, default=15.0, help="--watch: seconds between polls")
+    p.add_argument("--max-wait", type=float, default=120.0,
+                   help="--watch: longest a file waits for its batch to fill, in seconds")
+    p.set_defaults(func=cmd_load)
+
+    p = sub.add_parser("rollup", help="merge newly loaded facts into the dashboard rollup tables")
+    p.set_defaults(func=cmd_rollup)
+
+    p = sub.add_parser("profile", help="run another command under cProfile/tracemalloc")
+    p.add_argument("--modes", default="all", help="comma-separated cpu,mem (default: both)")
+    p.add_argument("command_args", nargs=argparse.REMAINDER, help="command to profile")
+    p.set_defaults(func=cmd_profile)
+    return parser
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    wants_profile = os.getenv("EVDW_PROFILE") or any(
+        arg == "--profile" or arg.startswith("--profile=") for arg in argv)
+    if wants_profile:
+        from etl.profiling import run_entry_point
+        full_argv = ["evdw"] + argv
+        return run_entry_point(lambda: _dispatch(full_argv[1:]), "evdw", full_argv)
+    return _dispatch(argv)
+
+
+def _dispatch(argv):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
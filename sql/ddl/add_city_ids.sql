@@ -0,0 +1,5 @@
+-- Canonical city ID (src/etl/cities.py) carried by every staging table that names a city.
+-- The transforms write it as the last column, so COPY INTO keeps matching by position.
+ALTER TABLE STAGING.stg_ev_sessions   ADD COLUMN IF NOT EXISTS city_id INTEGER NULL;
+ALTER TABLE STAGING.stg_nrel_stations ADD COLUMN IF NOT EXISTS city_id INTEGER NULL;
+ALTER TABLE STAGING.stg_weather       ADD COLUMN IF NOT EXISTS city_id INTEGER NULL;
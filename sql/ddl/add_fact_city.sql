@@ -0,0 +1,14 @@
+-- Carry each session's own city and charger type on the fact, which the
+-- rollups group by. The Kaggle station IDs never match the NREL IDs in
+-- DIM_STATION, so a join there left every city 'Unknown'.
+ALTER TABLE STAGING.stg_fact_charging_sessions ADD COLUMN IF NOT EXISTS city_id INTEGER NULL;
+ALTER TABLE STAGING.stg_fact_charging_sessions ADD COLUMN IF NOT EXISTS charger_type STRING NULL;
+ALTER TABLE ANALYTICS.FACT_CHARGING_SESSIONS ADD COLUMN IF NOT EXISTS city_id INTEGER NULL;
+ALTER TABLE ANALYTICS.FACT_CHARGING_SESSIONS ADD COLUMN IF NOT EXISTS charger_type STRING NULL;
+
+-- The rollups now key on city_id. Drop them, rerun sql/ddl/create_rollups.sql
+-- and they are rebuilt from scratch on the next refresh.
+DROP TABLE IF EXISTS ANALYTICS.AGG_STATION_HOUR;
+DROP TABLE IF EXISTS ANALYTICS.AGG_CITY_DAY;
+TRUNCATE TABLE ANALYTICS.AGG_VEHICLE_MONTH;
+DELETE FROM ANALYTICS.ETL_WATERMARKS WHERE name = 'rollups';
@@ -0,0 +1,9 @@
+-- Give DIM_STATION the city NREL publishes for each station
+ALTER TABLE ANALYTICS.DIM_STATION ADD COLUMN IF NOT EXISTS city STRING NULL;
+
+-- Backfill existing versions from the last loaded snapshot
+UPDATE ANALYTICS.DIM_STATION d
+SET city = s.city
+FROM STAGING.stg_nrel_stations s
+WHERE d.station_id = s.station_id::STRING
+  AND d.city IS NULL;
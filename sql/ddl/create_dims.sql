@@ -2,24 +2,31 @@
 
 -- 1. User Dimension
 CREATE OR REPLACE TABLE ANALYTICS.DIM_USER (
-  user_id    INTEGER    NOT NULL PRIMARY KEY,  -- Surrogate key from CSV User ID
+  user_id    INTEGER    NOT NULL PRIMARY KEY,  -- Surrogate key of the CSV User ID
   user_type  STRING     NOT NULL               -- Category of user (Commuter, Casual, etc.)
 );
 
 -- 2. Vehicle Dimension
 CREATE OR REPLACE TABLE ANALYTICS.DIM_VEHICLE (
-  vehicle_id            STRING   NOT NULL PRIMARY KEY,  -- Surrogate key (Vehicle Model)
+  vehicle_id            INTEGER  NOT NULL PRIMARY KEY,  -- Surrogate key of the Vehicle Model
   vehicle_model         STRING   NOT NULL,              -- Name of the vehicle model
   battery_capacity_kwh  FLOAT    NOT NULL,              -- Battery capacity in kWh
   vehicle_age_years     FLOAT    NOT NULL               -- Vehicle age in years
 );
 
--- 3. Station Dimension
+-- 3. Station Dimension (SCD Type 2: one row per station version)
 CREATE OR REPLACE TABLE ANALYTICS.DIM_STATION (
-  station_id       STRING  NOT NULL PRIMARY KEY,  -- Unique station identifier
-  station_location STRING  NOT NULL,              -- City or full address
-  charger_type     STRING  NOT NULL,              -- Connector type (Level 1, 2, DCFC)
-  network_operator STRING  NULL                   -- Station operator or network provider
+  station_id       STRING        NOT NULL,        -- Unique station identifier
+  station_location STRING        NOT NULL,        -- City or full address
+  city             STRING        NULL,            -- City as published by NREL
+  charger_type     STRING        NOT NULL,        -- Connector type (Level 1, 2, DCFC)
+  network_operator STRING        NULL,            -- Station operator or network provider
+  access_days_time STRING        NULL,            -- Opening hours as published by NREL
+  row_hash         STRING        NOT NULL,        -- Hash-diff of the tracked NREL columns
+  effective_from   TIMESTAMP_NTZ NOT NULL,        -- Snapshot time this version appeared
+  effective_to     TIMESTAMP_NTZ NULL,            -- Snapshot time it was replaced; NULL while current
+  is_current       BOOLEAN       NOT NULL,        -- TRUE for the latest version of the station
+  CONSTRAINT pk_station PRIMARY KEY (station_id, effective_from)
 );
 
 -- 4. Time Dimension
@@ -34,13 +41,17 @@ CREATE OR REPLACE TABLE ANALYTICS.DIM_TIME (
   time_of_day STRING     NOT NULL              -- Morning/Afternoon/Evening
 );
 
--- 5. Weather Dimension
+-- 5. Weather Dimension (one row per city and hour, loaded by sql/dml/merge_dim_weather.sql)
 CREATE OR REPLACE TABLE ANALYTICS.DIM_WEATHER (
-  weather_id          INTEGER    NOT NULL PRIMARY KEY, -- Surrogate key per record
-  date_id             INTEGER    NOT NULL,             -- FK to DIM_TIME.date_id
-  temperature_celsius FLOAT      NOT NULL,             -- Ambient temperature
-  humidity_percent    FLOAT      NOT NULL,             -- Relative humidity
+  weather_id          INTEGER    NOT NULL PRIMARY KEY, -- Surrogate key of (city_id, date_id)
+  city_id             INTEGER    NULL,                 -- City the observation is for
+  date_id             INTEGER    NULL,                 -- FK to DIM_TIME.date_id
+  temperature_celsius FLOAT      NULL,                 -- Ambient temperature
+  humidity_percent    FLOAT      NULL,                 -- Relative humidity
   weather_main        STRING     NOT NULL,             -- e.g., Clear, Rain
   CONSTRAINT fk_time_weather
     FOREIGN KEY(date_id) REFERENCES ANALYTICS.DIM_TIME(date_id)
 );
+
+-- Member for sessions without a matched weather observation (UNKNOWN_WEATHER_ID)
+INSERT INTO ANALYTICS.DIM_WEATHER (weather_id, weather_main) VALUES (-1, 'Unknown');
@@ -1,8 +1,8 @@
 CREATE OR REPLACE TABLE ANALYTICS.FACT_CHARGING_SESSIONS (
   session_id              STRING        PRIMARY KEY,
   user_id                 INTEGER       NOT NULL,
-  station_id              STRING        NOT NULL,
-  vehicle_id              STRING        NOT NULL,
+  station_id              INTEGER       NOT NULL,
+  vehicle_id              INTEGER       NOT NULL,
   date_id                 INTEGER       NOT NULL,
   weather_id              INTEGER       NOT NULL,
   start_timestamp         TIMESTAMP_LTZ NOT NULL,
@@ -14,15 +14,22 @@ CREATE OR REPLACE TABLE ANALYTICS.FACT_CHARGING_SESSIONS (
   distance_driven_km      FLOAT         NULL,
   start_soc_percent       INTEGER       NOT NULL,
   end_soc_percent         INTEGER       NOT NULL,
+  city_id                 INTEGER       NULL,      -- Canonical city of the session (src/etl/cities.py)
+  charger_type            STRING        NULL,      -- Charger Type as recorded by the session
+  loaded_at               TIMESTAMP_LTZ NOT NULL DEFAULT CURRENT_TIMESTAMP(),  -- drives incremental rollups
   CONSTRAINT fk_user
     FOREIGN KEY(user_id) REFERENCES ANALYTICS.DIM_USER(user_id),
-  CONSTRAINT fk_station
-    FOREIGN KEY(station_id) REFERENCES ANALYTICS.DIM_STATION(station_id),
+  -- user_id, station_id and vehicle_id are surrogate keys, mapped to their natural
+  -- keys by ANALYTICS.DIM_KEY_MAP. station_id joins the DIM_STATION version whose
+  -- effective range covers start_timestamp
   CONSTRAINT fk_vehicle
     FOREIGN KEY(vehicle_id) REFERENCES ANALYTICS.DIM_VEHICLE(vehicle_id),
   CONSTRAINT fk_time
     FOREIGN KEY(date_id) REFERENCES ANALYTICS.DIM_TIME(date_id),
   CONSTRAINT fk_weather
     FOREIGN KEY(weather_id) REFERENCES ANALYTICS.DIM_WEATHER(weather_id)
-);
+)
+-- Matches the (date_id, station_id) order src/etl/facts.py writes rows in, so
+-- date-range and station predicates prune micro-partitions
+CLUSTER BY (date_id, station_id)
 COMMENT = 'Fact table capturing EV charging session details including user, station, vehicle, time, weather, energy consumed, duration, cost, and state of charge.';
\ No newline at end of file
@@ -0,0 +1,9 @@
+-- Surrogate keys assigned by the local key registry (src/etl/keys.py); rows are only ever appended
+CREATE TABLE IF NOT EXISTS ANALYTICS.DIM_KEY_MAP (
+  dimension     STRING        NOT NULL,              -- user, vehicle, station, city or weather
+  natural_key   STRING        NOT NULL,              -- Key as it appears in the source data
+  surrogate_key INTEGER       NOT NULL,              -- Stable integer key, unique per dimension
+  assigned_at   TIMESTAMP_LTZ NOT NULL DEFAULT CURRENT_TIMESTAMP(),
+  CONSTRAINT pk_key_map PRIMARY KEY (dimension, surrogate_key),
+  CONSTRAINT uq_key_map UNIQUE (dimension, natural_key)
+);
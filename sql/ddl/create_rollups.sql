@@ -0,0 +1,39 @@
+-- Pre-aggregated rollups of FACT_CHARGING_SESSIONS for the dashboards.
+-- Every measure is additive, so new facts are merged in by adding to the
+-- existing rows (see src/etl/rollups.py). period_start is the start of the
+-- rollup's time grain.
+
+-- 1. Station x hour
+CREATE TABLE IF NOT EXISTS ANALYTICS.AGG_STATION_HOUR (
+  station_id      INTEGER       NOT NULL,  -- Surrogate key, as in the fact table
+  city_id         INTEGER       NOT NULL,  -- The session's city; -1 when unknown
+  charger_type    STRING        NOT NULL,
+  period_start    TIMESTAMP_NTZ NOT NULL,  -- Hour the sessions started in
+  sessions        INTEGER       NOT NULL,
+  energy_kwh      FLOAT         NOT NULL,
+  cost_usd        FLOAT         NOT NULL,
+  duration_hours  FLOAT         NOT NULL,
+  CONSTRAINT pk_agg_station_hour PRIMARY KEY (station_id, city_id, charger_type, period_start)
+);
+
+-- 2. City x day
+CREATE TABLE IF NOT EXISTS ANALYTICS.AGG_CITY_DAY (
+  city_id         INTEGER       NOT NULL,  -- The session's city; -1 when unknown
+  period_start    TIMESTAMP_NTZ NOT NULL,  -- Day the sessions started on
+  sessions        INTEGER       NOT NULL,
+  energy_kwh      FLOAT         NOT NULL,
+  cost_usd        FLOAT         NOT NULL,
+  duration_hours  FLOAT         NOT NULL,
+  CONSTRAINT pk_agg_city_day PRIMARY KEY (city_id, period_start)
+);
+
+-- 3. Vehicle model x month
+CREATE TABLE IF NOT EXISTS ANALYTICS.AGG_VEHICLE_MONTH (
+  vehicle_id      INTEGER       NOT NULL,  -- Surrogate key, as in the fact table
+  period_start    TIMESTAMP_NTZ NOT NULL,  -- Month the sessions started in
+  sessions        INTEGER       NOT NULL,
+  energy_kwh      FLOAT         NOT NULL,
+  cost_usd        FLOAT         NOT NULL,
+  duration_hours  FLOAT         NOT NULL,
+  CONSTRAINT pk_agg_vehicle_month PRIMARY KEY (vehicle_id, period_start)
+);
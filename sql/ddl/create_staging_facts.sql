@@ -0,0 +1,32 @@
+-- Fact rows produced by src/etl/facts.py, staged per load and merged into
+-- ANALYTICS.FACT_CHARGING_SESSIONS by sql/dml/merge_facts.sql
+CREATE OR REPLACE TABLE STAGING.stg_fact_charging_sessions (
+  session_id              STRING        NOT NULL,
+  user_id                 INTEGER       NOT NULL,
+  station_id              INTEGER       NOT NULL,
+  vehicle_id              INTEGER       NOT NULL,
+  date_id                 INTEGER       NOT NULL,
+  weather_id              INTEGER       NOT NULL,
+  start_timestamp         TIMESTAMP_LTZ NOT NULL,
+  end_timestamp           TIMESTAMP_LTZ NOT NULL,
+  energy_consumed_kwh     FLOAT         NULL,
+  duration_hours          FLOAT         NOT NULL,
+  charging_rate_kw        FLOAT         NULL,
+  charging_cost_usd       FLOAT         NOT NULL,
+  distance_driven_km      FLOAT         NULL,
+  start_soc_percent       INTEGER       NOT NULL,
+  end_soc_percent         INTEGER       NOT NULL,
+  city_id                 INTEGER       NULL,
+  charger_type            STRING        NULL
+);
+
+-- Weather dimension rows produced alongside the facts, staged per load and
+-- merged into ANALYTICS.DIM_WEATHER by sql/dml/merge_dim_weather.sql
+CREATE OR REPLACE TABLE STAGING.stg_dim_weather (
+  weather_id              INTEGER       NOT NULL,
+  city_id                 INTEGER       NOT NULL,
+  date_id                 INTEGER       NOT NULL,
+  temperature_celsius     FLOAT         NULL,
+  humidity_percent        FLOAT         NULL,
+  weather_main            STRING        NULL
+);
@@ -0,0 +1,18 @@
+-- Station changes produced by src/etl/scd.py for each NREL snapshot
+CREATE OR REPLACE TABLE STAGING.stg_nrel_station_changes (
+  change_type        STRING        NOT NULL,  -- insert, update or close
+  station_id         STRING        NOT NULL,
+  station_name       STRING        NULL,
+  street_address     STRING        NULL,
+  city               STRING        NULL,
+  state              STRING        NULL,
+  zip                STRING        NULL,
+  country            STRING        NULL,
+  latitude           FLOAT         NULL,
+  longitude          FLOAT         NULL,
+  ev_connector_types STRING        NULL,
+  access_days_time   STRING        NULL,
+  station_type       STRING        NULL,
+  row_hash           STRING        NOT NULL,
+  effective_from     TIMESTAMP_NTZ NOT NULL
+);
@@ -0,0 +1,6 @@
+-- High-water marks of incremental jobs (e.g. the last fact load a rollup has absorbed)
+CREATE TABLE IF NOT EXISTS ANALYTICS.ETL_WATERMARKS (
+  name        STRING        NOT NULL PRIMARY KEY,  -- Job or table the mark belongs to
+  high_water  TIMESTAMP_LTZ NOT NULL,              -- Everything up to here has been processed
+  updated_at  TIMESTAMP_LTZ NOT NULL DEFAULT CURRENT_TIMESTAMP()
+);
@@ -0,0 +1,38 @@
+-- Apply STAGING.stg_nrel_station_changes to the SCD Type 2 DIM_STATION.
+-- Only changed stations are touched; unchanged ones never reach staging.
+-- Both statements are idempotent. If a crash stops the snapshot from being
+-- promoted after a commit, the next diff carries these changes again, and
+-- applying them twice must not close or duplicate the versions they opened.
+
+-- Close the current version of every updated or closed station
+UPDATE ANALYTICS.DIM_STATION d
+SET effective_to = c.effective_from,
+    is_current   = FALSE
+FROM STAGING.stg_nrel_station_changes c
+WHERE d.station_id = c.station_id
+  AND d.is_current
+  AND d.effective_from < c.effective_from
+  AND c.change_type IN ('update', 'close');
+
+-- Open a new current version for every new or updated station
+INSERT INTO ANALYTICS.DIM_STATION (
+  station_id, station_location, city, charger_type, network_operator, access_days_time,
+  row_hash, effective_from, effective_to, is_current
+)
+SELECT
+  station_id,
+  ARRAY_TO_STRING(ARRAY_CONSTRUCT_COMPACT(street_address, city, state), ', '),
+  city,
+  COALESCE(ev_connector_types, 'Unknown'),
+  NULL,
+  access_days_time,
+  row_hash,
+  effective_from,
+  NULL,
+  TRUE
+FROM STAGING.stg_nrel_station_changes c
+WHERE change_type IN ('insert', 'update')
+  AND NOT EXISTS (
+    SELECT 1 FROM ANALYTICS.DIM_STATION d
+    WHERE d.station_id = c.station_id AND d.effective_from = c.effective_from
+  );
@@ -0,0 +1,18 @@
+-- Insert the staged DIM_WEATHER rows whose weather_id is new, plus the
+-- UNKNOWN_WEATHER_ID member (-1) that facts without a matched observation use.
+-- weather_id is the registry key of (city_id, date_id), so a rerun or a later
+-- observation of the same hour keeps the first row.
+MERGE INTO ANALYTICS.DIM_WEATHER d
+USING (
+  SELECT weather_id, city_id, date_id, temperature_celsius, humidity_percent, weather_main
+  FROM STAGING.stg_dim_weather
+  QUALIFY ROW_NUMBER() OVER (PARTITION BY weather_id ORDER BY date_id) = 1
+  UNION ALL
+  SELECT -1, NULL, NULL, NULL, NULL, 'Unknown'
+) s
+ON d.weather_id = s.weather_id
+WHEN NOT MATCHED THEN INSERT (
+  weather_id, city_id, date_id, temperature_celsius, humidity_percent, weather_main
+) VALUES (
+  s.weather_id, s.city_id, s.date_id, s.temperature_celsius, s.humidity_percent, s.weather_main
+);
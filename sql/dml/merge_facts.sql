@@ -0,0 +1,26 @@
+-- Insert the staged fact rows whose session_id is not in the fact table yet.
+-- Every transform rewrites the full fact file, so a plain COPY would load each
+-- session again. Sessions are immutable: existing rows are left untouched, and
+-- their loaded_at keeps the incremental rollups from counting them twice.
+-- Rows go in sorted by the table's clustering key, so the new micro-partitions
+-- prune on date_id and station_id without waiting for automatic reclustering.
+INSERT INTO ANALYTICS.FACT_CHARGING_SESSIONS (
+  session_id, user_id, station_id, vehicle_id, date_id, weather_id,
+  start_timestamp, end_timestamp, energy_consumed_kwh, duration_hours,
+  charging_rate_kw, charging_cost_usd, distance_driven_km,
+  start_soc_percent, end_soc_percent, city_id, charger_type
+)
+SELECT
+  s.session_id, s.user_id, s.station_id, s.vehicle_id, s.date_id, s.weather_id,
+  s.start_timestamp, s.end_timestamp, s.energy_consumed_kwh, s.duration_hours,
+  s.charging_rate_kw, s.charging_cost_usd, s.distance_driven_km,
+  s.start_soc_percent, s.end_soc_percent, s.city_id, s.charger_type
+FROM (
+  SELECT *
+  FROM STAGING.stg_fact_charging_sessions
+  QUALIFY ROW_NUMBER() OVER (PARTITION BY session_id ORDER BY start_timestamp) = 1
+) s
+WHERE NOT EXISTS (
+  SELECT 1 FROM ANALYTICS.FACT_CHARGING_SESSIONS f WHERE f.session_id = s.session_id
+)
+ORDER BY s.date_id, s.station_id;
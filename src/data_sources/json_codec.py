@@ -0,0 +1,162 @@
+"""
+JSON codec and raw NDJSON file format.
+
+Encoding goes through orjson when it is installed and falls back to the
+standard library otherwise. Raw extracts are stored as newline-delimited JSON,
+one record per line, optionally gzip (.gz) or zstd (.zst) compressed. The first
+and last lines carry the extract's metadata as {"_metadata": {...}}; readers
+skip them when iterating records.
+
+Legacy pretty-printed .json extracts ({"metadata": ..., "<key>": [...]}) are
+still readable through iter_raw_records().
+"""
+
+import gzip
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+BACKEND = "orjson" if orjson else "json"
+METADATA_KEY = "_metadata"
+COMPRESSION_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def dumps(obj):
+    """Encode obj as compact JSON bytes."""
+    if orjson:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(data):
+    """Decode JSON from bytes or str."""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def resolve_compression(compression):
+    """Return a usable compression name, falling back to gzip when zstd is unavailable."""
+    compression = (compression or "none").lower()
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unknown compression {compression!r}; expected one of {list(COMPRESSION_SUFFIXES)}")
+    if compression == "zstd" and zstandard is None:
+        logger.warning("zstandard is not installed; writing gzip instead")
+        return "gzip"
+    return compression
+
+
+def raw_filename(prefix, compression="gzip", timestamp=None):
+    """Build the file name of a raw extract, e.g. nrel_stations_20240101_120000.ndjson.gz."""
+    timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"{prefix}_{timestamp}.ndjson{COMPRESSION_SUFFIXES[resolve_compression(compression)]}"
+
+
+def open_binary(path, mode):
+    """Open path for binary 'rb'/'wb' access, (de)compressing by file suffix."""
+    path = Path(path)
+    if path.suffix == ".gz":
+        # A fixed header mtime keeps identical content byte-identical on disk
+        return gzip.GzipFile(path, mode, mtime=0)
+    if path.suffix == ".zst":
+        if zstandard is None:
+            raise ImportError(f"zstandard is required to read {path}")
+        return zstandard.open(path, mode)
+    return open(path, mode)
+
+
+class NDJSONWriter:
+    """
+    Append records to a raw NDJSON file as they arrive.
+
+    The metadata given at open time is written as the first line; on close it
+    is written again, extended with the final record count, as the last line.
+    """
+
+    def __init__(self, path, metadata=None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.metadata = dict(metadata or {})
+        self.count = 0
+        self._file = open_binary(self.path, "wb")
+        self._write_line({METADATA_KEY: self.metadata})
+
+    def _write_line(self, obj):
+        self._file.write(dumps(obj) + b"\n")
+
+    def write(self, record):
+        self._write_line(record)
+        self.count += 1
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.metadata["record_count"] = self.count
+        self._write_line({METADATA_KEY: self.metadata})
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _is_metadata(obj):
+    return isinstance(obj, dict) and len(obj) == 1 and METADATA_KEY in obj
+
+
+def iter_ndjson(path):
+    """Stream the records of an NDJSON extract, skipping metadata lines."""
+    with open_binary(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            obj = loads(line)
+            if not _is_metadata(obj):
+                yield obj
+
+
+def read_metadata(path):
+    """Return the merged header/trailer metadata of an NDJSON extract."""
+    metadata = {}
+    with open_binary(path, "rb") as f:
+        for line in f:
+            if line.startswith(b'{"' + METADATA_KEY.encode()):
+                obj = loads(line)
+                if _is_metadata(obj):
+                    metadata.update(obj[METADATA_KEY])
+    return metadata
+
+
+def is_ndjson(path):
+    return ".ndjson" in Path(path).suffixes
+
+
+def iter_raw_records(path, key):
+    """
+    Stream records from a raw extract in either format. `key` names the list
+    holding the records in a legacy .json extract (e.g. 'fuel_stations').
+    """
+    if is_ndjson(path):
+        yield from iter_ndjson(path)
+        return
+    with open_binary(path, "rb") as f:
+        yield from loads(f.read())[key]
@@ -1,6 +1,4 @@
 import requests
-import json
-import time
 import logging
 from datetime import datetime
 from pathlib import Path
@@ -8,19 +6,33 @@ import sys
 
 # Add project root to path
 sys.path.append(str(Path(__file__).parent.parent.parent))
-from config.api_config import NREL_API_KEY, NREL_BASE_URL, REQUEST_TIMEOUT, MAX_RETRIES, RATE_LIMIT_DELAY
+sys.path.append(str(Path(__file__).parent.parent))
+from config.api_config import NREL_API_KEY, NREL_BASE_URL, REQUEST_TIMEOUT, MAX_RETRIES, NREL_RATE_LIMIT, RAW_COMPRESSION
+from data_sources.rate_limiter import RateLimiter
+from data_sources.raw_store import RawStore
+from etl.schema import NREL_CONTRACT, project, source_fields
+from etl.metrics import count, stage
+from etl.profiling import run_entry_point
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class NRELExtractor:
-    def __init__(self):
+    def __init__(self, project_fields=True):
+        """
+        Args:
+            project_fields (bool): Keep only the station fields the transform reads.
+                The stations API has no field selection, so the rest of the ~70
+                fields are dropped as each response is parsed.
+        """
+        self.fields = source_fields(NREL_CONTRACT) if project_fields else None
         self.api_key = NREL_API_KEY
         self.base_url = NREL_BASE_URL
         self.session = requests.Session()
+        self.limiter = RateLimiter(*NREL_RATE_LIMIT, name="NREL")
         
-    def extract_stations(self, fuel_type="ELEC", state="CA", limit=50):
+    def extract_stations(self, fuel_type="ELEC", state="CA", limit=50, offset=0):
         """
         Extract EV charging stations from NREL API
         
@@ -28,6 +40,7 @@ class NRELExtractor:
             fuel_type (str): Fuel type filter (ELEC for electric)
             state (str): State code filter
             limit (int): Maximum number of stations to retrieve
+            offset (int): Number of matching stations to skip, for paging
         """
         endpoint = f"{self.base_url}.json"
         
@@ -38,22 +51,27 @@ class NRELExtractor:
             'limit': limit,
             'format': 'json'
         }
+        if offset:
+            params['offset'] = offset
         
-        logger.info(f"Extracting NREL stations: fuel_type={fuel_type}, state={state}, limit={limit}")
+        logger.info(f"Extracting NREL stations: fuel_type={fuel_type}, state={state}, limit={limit}, offset={offset}")
         
         for attempt in range(MAX_RETRIES):
             try:
+                self.limiter.wait()
+                count("http_requests")
                 response = self.session.get(
                     endpoint,
                     params=params,
                     timeout=REQUEST_TIMEOUT
                 )
+                self.limiter.update(response)
                 response.raise_for_status()
                 
-                # Add delay for rate limiting
-                time.sleep(RATE_LIMIT_DELAY)
-                
                 data = response.json()
+                if self.fields:
+                    data['fuel_stations'] = [project(station, self.fields)
+                                             for station in data.get('fuel_stations', [])]
                 logger.info(f"Successfully extracted {len(data.get('fuel_stations', []))} stations")
                 
                 return data
@@ -63,55 +81,49 @@ class NRELExtractor:
                 if attempt == MAX_RETRIES - 1:
                     logger.error(f"Failed to extract NREL data after {MAX_RETRIES} attempts")
                     raise
-                time.sleep(2 ** attempt)  # Exponential backoff
+                self.limiter.backoff(attempt, e.response)
     
+    def open_writer(self, metadata=None, filename=None):
+        """Open an NDJSON writer that streams stations to a new partitioned raw file"""
+        return RawStore().open_writer("nrel_stations", metadata, RAW_COMPRESSION, filename=filename)
+
     def save_to_file(self, data, filename=None):
-        """Save extracted data to JSON file"""
-        if filename is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"nrel_stations_{timestamp}.json"
-        
-        output_path = Path("data/raw") / filename
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+        """Save extracted data to an NDJSON raw file"""
+        with self.open_writer(data.get('metadata'), filename) as writer:
+            writer.write_many(data.get('fuel_stations', []))
+        count("bytes_written", writer.path.stat().st_size)
         
-        with open(output_path, 'w') as f:
-            json.dump(data, f, indent=2)
-        
-        logger.info(f"Data saved to {output_path}")
-        return output_path
+        logger.info(f"Data saved to {writer.path}")
+        return writer.path
 
 def main():
     """Main extraction function"""
     try:
-        extractor = NRELExtractor()
-        
-        # Extract stations for multiple states
-        states = ["CA", "NY", "TX", "FL", "WA"]
-        all_stations = []
-        
-        for state in states:
-            logger.info(f"Processing state: {state}")
-            data = extractor.extract_stations(state=state, limit=100)
-            all_stations.extend(data.get('fuel_stations', []))
-            time.sleep(RATE_LIMIT_DELAY)
+        with stage("extract_nrel") as m:
+            extractor = NRELExtractor()
         
-        # Combine all data
-        combined_data = {
-            'metadata': {
+            # Extract stations for multiple states
+            states = ["CA", "NY", "TX", "FL", "WA"]
+            metadata = {
                 'extraction_date': datetime.now().isoformat(),
-                'total_stations': len(all_stations),
-                'states_processed': states
-            },
-            'fuel_stations': all_stations
-        }
+                'states_processed': states,
+                'fields': extractor.fields
+            }
+        
+            # Stream each state's stations to the raw file as it arrives
+            with extractor.open_writer(metadata) as writer:
+                for state in states:
+                    logger.info(f"Processing state: {state}")
+                    data = extractor.extract_stations(state=state, limit=100)
+                    writer.write_many(data.get('fuel_stations', []))
         
-        # Save to file
-        output_path = extractor.save_to_file(combined_data)
-        logger.info(f"Extraction complete. {len(all_stations)} stations saved to {output_path}")
+            m.rows_out = writer.count
+            m.add_file_written(writer.path)
+            logger.info(f"Extraction complete. {writer.count} stations saved to {writer.path}")
         
     except Exception as e:
         logger.error(f"Extraction failed: {e}")
         raise
 
 if __name__ == "__main__":
-    main()
+    run_entry_point(main, "nrel_api")
@@ -0,0 +1,157 @@
+"""
+Adaptive request pacing for the API extractors.
+
+RateLimiter spaces request starts by an interval it adjusts from each
+response:
+
+    quota headers      X-RateLimit-Remaining / -Limit (or RateLimit-*): run at
+                       min_interval while more than RESERVE_FRACTION of the
+                       quota is left, then spread what remains over the window
+    429 / 503          pause for Retry-After when given, otherwise double the
+                       interval, and fall back to the steady rate limit/window
+    no headers         ease back toward the steady rate after throttling
+
+Other failures (timeouts, 5xx) pause 2 ** attempt seconds through backoff().
+Time spent sleeping is added to the active stage as rate_limit_wait_seconds
+and throttled responses as rate_limited_responses.
+"""
+
+import logging
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from etl.metrics import count
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_STATUSES = (429, 503)
+# Share of the quota kept in reserve before pacing starts
+RESERVE_FRACTION = 0.1
+MIN_INTERVAL = 0.1
+MAX_WAIT = 300.0
+# Waiters re-check at least this often, so a faster pace learned by another
+# thread's response applies to requests already queued
+POLL_SECONDS = 0.25
+
+
+def _header(headers, *names):
+    lowered = {k.lower(): v for k, v in headers.items()}
+    for name in names:
+        value = lowered.get(name.lower())
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_after_seconds(value):
+    """Seconds to wait from a Retry-After header (delta seconds or HTTP date)."""
+    if value is None:
+        return None
+    seconds = _number(value)
+    if seconds is not None:
+        return max(0.0, seconds)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RateLimiter:
+    def __init__(self, limit, window, min_interval=MIN_INTERVAL, max_wait=MAX_WAIT, name="api"):
+        """
+        Args:
+            limit (int): Requests allowed per window when the API reports no quota
+            window (float): Length of the quota window in seconds
+            min_interval (float): Shortest spacing between request starts
+            max_wait (float): Longest single pause
+            name (str): Label used in log messages
+        """
+        self.limit = limit
+        self.window = window
+        self.min_interval = min_interval
+        self.max_wait = max_wait
+        self.name = name
+        self.interval = self.steady_interval
+        self.waited_seconds = 0.0
+        self.throttled = 0
+        self._last = None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def steady_interval(self):
+        return max(self.min_interval, self.window / self.limit)
+
+    def _ready_at(self):
+        if self._last is None:
+            return self._paused_until
+        return max(self._paused_until, self._last + self.interval)
+
+    def wait(self):
+        """Block until the next request may start."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                delay = self._ready_at() - now
+                if delay <= 0:
+                    self._last = now
+                    self.waited_seconds += waited
+                    break
+            step = min(delay, POLL_SECONDS)
+            time.sleep(step)
+            waited += step
+        if waited:
+            count("rate_limit_wait_seconds", waited)
+
+    def pause(self, seconds):
+        """Hold off the next request for at least `seconds` from now."""
+        seconds = min(seconds, self.max_wait)
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def update(self, response):
+        """Adjust the pace from a response's status and rate-limit headers."""
+        headers = response.headers
+        if response.status_code in THROTTLE_STATUSES:
+            retry_after = retry_after_seconds(_header(headers, "Retry-After"))
+            with self._lock:
+                self.throttled += 1
+                if retry_after is None:
+                    retry_after = max(self.interval * 2, self.steady_interval)
+                self.interval = max(self.interval, self.steady_interval)
+            count("rate_limited_responses")
+            logger.info(f"{self.name} throttled (HTTP {response.status_code}); waiting {retry_after:.1f}s")
+            self.pause(retry_after)
+            return
+
+        remaining = _number(_header(headers, "X-RateLimit-Remaining", "RateLimit-Remaining"))
+        limit = _number(_header(headers, "X-RateLimit-Limit", "RateLimit-Limit")) or self.limit
+        reset = _number(_header(headers, "RateLimit-Reset"))
+        with self._lock:
+            if remaining is None:
+                self.interval = max(self.steady_interval, self.interval / 2)
+            elif remaining > limit * RESERVE_FRACTION:
+                self.interval = self.min_interval
+            else:
+                window = reset if reset is not None else self.window
+                self.interval = min(self.max_wait, max(self.min_interval, window / max(remaining, 1)))
+
+    def backoff(self, attempt, response=None):
+        """Pause after a failed request; throttled responses were already scheduled by update()."""
+        if response is not None and response.status_code in THROTTLE_STATUSES:
+            return
+        self.pause(2 ** attempt)
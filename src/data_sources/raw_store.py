@@ -0,0 +1,252 @@
+"""
+Partitioned raw extract store with a manifest index.
+
+Raw extracts are written under source and extraction-date partitions:
+
+    data/raw/source=nrel_stations/date=2024-01-01/nrel_stations_20240101_120000.ndjson.gz
+    data/raw/source=weather_data/date=2024-01-01/weather_data_20240101_130000.ndjson.gz
+
+A file is written under a hidden .partial. name and renamed into place only
+when its extraction finishes; a failed one is deleted, so a partial file can
+never be indexed. Each finished file is appended to data/raw/manifest.sqlite with its source,
+extraction time, the time range of its records, record count, size and
+SHA-256. Downstream stages pick inputs with an indexed manifest query
+(latest(), files()) instead of listing directories.
+
+Files from before the manifest existed, flat in data/raw, are indexed by
+index_existing(), which also runs the first time a source is queried.
+
+    python src/data_sources/raw_store.py            # index unregistered files
+    python src/data_sources/raw_store.py --list weather_data
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from data_sources.json_codec import NDJSONWriter, iter_raw_records, raw_filename
+
+logger = logging.getLogger(__name__)
+
+RAW_DIR = Path("data/raw")
+MANIFEST_NAME = "manifest.sqlite"
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+# Per-record time field of each source; sources without one span their extraction time
+TIME_FIELDS = {"weather_data": "extraction_timestamp"}
+# Record list of legacy .json extracts
+LEGACY_KEYS = {"nrel_stations": "fuel_stations", "weather_data": "weather_data"}
+# Name prefix of an extract still being written
+PARTIAL_PREFIX = ".partial."
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS raw_files (
+    path TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    extracted_at TEXT NOT NULL,
+    min_time TEXT,
+    max_time TEXT,
+    record_count INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    registered_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS raw_files_source_time ON raw_files (source, extracted_at);
+"""
+COLUMNS = ["path", "source", "extracted_at", "min_time", "max_time", "record_count", "bytes", "sha256"]
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_raw_name(path):
+    """(source, extraction time) from a raw file name such as weather_data_20240101_120000.ndjson.gz."""
+    stem = Path(path).name.split(".")[0]
+    source, _, stamp = stem.rpartition("_")
+    source, _, day = source.rpartition("_")
+    try:
+        return source, datetime.strptime(f"{day}_{stamp}", TIMESTAMP_FORMAT)
+    except ValueError:
+        return None, None
+
+
+class RawWriter(NDJSONWriter):
+    """
+    NDJSONWriter that writes to a partial file, then renames it to `path` and
+    registers it in the store's manifest once closed without error.
+    """
+
+    def __init__(self, store, source, path, extracted_at, metadata=None):
+        path = Path(path)
+        self.final_path = path
+        super().__init__(path.with_name(PARTIAL_PREFIX + path.name), metadata)
+        self.store = store
+        self.source = source
+        self.extracted_at = extracted_at
+        self.time_field = TIME_FIELDS.get(source)
+        self.min_time = self.max_time = None
+
+    def write(self, record):
+        super().write(record)
+        if self.time_field:
+            value = record.get(self.time_field)
+            if value:
+                self.min_time = value if self.min_time is None else min(self.min_time, value)
+                self.max_time = value if self.max_time is None else max(self.max_time, value)
+
+    def close(self, register=True):
+        if self._file.closed:
+            return
+        super().close()
+        if not register:
+            self.path.unlink(missing_ok=True)
+            return
+        os.replace(self.path, self.final_path)
+        self.path = self.final_path
+        self.store.register(self.path, self.source, self.extracted_at, record_count=self.count,
+                            min_time=self.min_time, max_time=self.max_time)
+
+    def __exit__(self, exc_type, exc, tb):
+        # A failed extraction deletes its partial file instead of publishing it
+        self.close(register=exc_type is None)
+
+
+class RawStore:
+    def __init__(self, root=RAW_DIR):
+        self.root = Path(root)
+        self.manifest = self.root / MANIFEST_NAME
+        self._indexed = False
+
+    def _connect(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.manifest)
+        conn.executescript(SCHEMA)
+        return conn
+
+    def partition(self, source, extracted_at):
+        return self.root / f"source={source}" / f"date={extracted_at:%Y-%m-%d}"
+
+    def path_for(self, source, compression="gzip", extracted_at=None, filename=None):
+        """Partitioned path for a new extract of `source`."""
+        extracted_at = extracted_at or datetime.now()
+        name = filename or raw_filename(source, compression, extracted_at.strftime(TIMESTAMP_FORMAT))
+        return self.partition(source, extracted_at) / name
+
+    def open_writer(self, source, metadata=None, compression="gzip", extracted_at=None, filename=None):
+        """Open a RawWriter for a new partitioned extract of `source`."""
+        extracted_at = (extracted_at or datetime.now()).replace(microsecond=0)
+        return RawWriter(self, source, self.path_for(source, compression, extracted_at, filename),
+                         extracted_at, metadata)
+
+    def _relative(self, path):
+        path = Path(path).resolve()
+        try:
+            return path.relative_to(self.root.resolve()).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    def register(self, path, source, extracted_at, record_count=None, min_time=None, max_time=None):
+        """Append a finished raw file to the manifest; scans it when counts are not given."""
+        if record_count is None:
+            record_count = 0
+            time_field = TIME_FIELDS.get(source)
+            for rec in iter_raw_records(path, LEGACY_KEYS.get(source, source)):
+                record_count += 1
+                value = rec.get(time_field) if time_field else None
+                if value:
+                    min_time = value if min_time is None else min(min_time, value)
+                    max_time = value if max_time is None else max(max_time, value)
+        extracted = extracted_at.isoformat() if isinstance(extracted_at, datetime) else str(extracted_at)
+        row = (self._relative(path), source, extracted, min_time or extracted, max_time or extracted,
+               record_count, Path(path).stat().st_size, file_sha256(path), datetime.now().isoformat())
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR IGNORE INTO raw_files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+        finally:
+            conn.close()
+        logger.info(f"Registered {path} ({record_count} records) in {self.manifest}")
+
+    def index_existing(self):
+        """Register raw files not yet in the manifest (flat legacy files included); returns the count."""
+        conn = self._connect()
+        try:
+            known = {row[0] for row in conn.execute("SELECT path FROM raw_files")}
+        finally:
+            conn.close()
+        added = 0
+        for path in sorted(self.root.rglob("*")):
+            if (path.name == MANIFEST_NAME or path.name.startswith(PARTIAL_PREFIX) or not path.is_file()
+                    or self._relative(path) in known):
+                continue
+            source, extracted_at = parse_raw_name(path)
+            if source is None or not (".json" in path.suffixes or ".ndjson" in path.suffixes):
+                continue
+            self.register(path, source, extracted_at)
+            added += 1
+        self._indexed = True
+        return added
+
+    def _query(self, sql, params):
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def files(self, source, since=None, until=None):
+        """Manifest entries of `source` extracted in (since, until], oldest first."""
+        sql = f"SELECT {', '.join(COLUMNS)} FROM raw_files WHERE source = ?"
+        params = [source]
+        if since is not None:
+            sql += " AND extracted_at > ?"
+            params.append(since.isoformat() if isinstance(since, datetime) else since)
+        if until is not None:
+            sql += " AND extracted_at <= ?"
+            params.append(until.isoformat() if isinstance(until, datetime) else until)
+        return self._query(sql + " ORDER BY extracted_at", params)
+
+    def resolve(self, entry):
+        path = Path(entry["path"])
+        return path if path.is_absolute() else self.root / path
+
+    def latest(self, source):
+        """Path of the newest registered extract of `source`."""
+        sql = f"SELECT {', '.join(COLUMNS)} FROM raw_files WHERE source = ? ORDER BY extracted_at DESC LIMIT 1"
+        rows = self._query(sql, [source])
+        if not rows and not self._indexed and self.index_existing():
+            rows = self._query(sql, [source])
+        if not rows:
+            raise FileNotFoundError(f"No raw {source} extracts registered in {self.manifest}")
+        return self.resolve(rows[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index and list raw extracts")
+    parser.add_argument("--root", type=Path, default=RAW_DIR)
+    parser.add_argument("--list", metavar="SOURCE", help="list the registered extracts of SOURCE")
+    args = parser.parse_args()
+
+    store = RawStore(args.root)
+    if args.list:
+        for entry in store.files(args.list):
+            print(f"{entry['extracted_at']}  {entry['record_count']:>8}  {entry['path']}")
+        return 0
+    added = store.index_existing()
+    print(f"Registered {added} raw files in {store.manifest}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
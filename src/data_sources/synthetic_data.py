@@ -0,0 +1,253 @@
+import argparse
+import csv
+import logging
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+import sys
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+from data_sources.json_codec import NDJSONWriter
+from data_sources.raw_store import RawStore
+from etl.schema import SESSION_CONTRACT, source_fields
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+# Cardinalities mirror the Kaggle sample: a handful of cities, models and
+# charger types, one user per ~4 sessions and one station per ~3 sessions
+# (capped at the size of the real US network).
+CITIES = [
+    ("Los Angeles", "CA", 34.05, -118.24), ("San Francisco", "CA", 37.77, -122.42),
+    ("New York", "NY", 40.71, -74.01), ("Chicago", "IL", 41.88, -87.63),
+    ("Houston", "TX", 29.76, -95.37), ("Phoenix", "AZ", 33.45, -112.07),
+    ("Philadelphia", "PA", 39.95, -75.17), ("San Antonio", "TX", 29.42, -98.49),
+    ("San Diego", "CA", 32.72, -117.16), ("Dallas", "TX", 32.78, -96.80),
+    ("Austin", "TX", 30.27, -97.74),
+]
+SESSION_CITIES = ["Houston", "San Francisco", "Los Angeles", "Chicago", "New York"]
+VEHICLE_MODELS = {
+    "Tesla Model 3": 75.0, "Hyundai Kona": 64.0, "Nissan Leaf": 62.0,
+    "BMW i3": 42.2, "Chevy Bolt": 65.0,
+}
+CHARGER_TYPES = {"Level 1": 1.9, "Level 2": 11.0, "DC Fast Charger": 50.0}
+USER_TYPES = ["Commuter", "Casual Driver", "Long-Distance Traveler"]
+CONNECTORS = ["J1772", "J1772COMBO", "CHADEMO", "TESLA", "NEMA520"]
+NETWORKS = ["ChargePoint Network", "Blink Network", "SHELL_RECHARGE", "EVGO", "Tesla", "Non-Networked"]
+WEATHER = [("Clear", "clear sky"), ("Clouds", "scattered clouds"), ("Clouds", "overcast clouds"),
+           ("Rain", "light rain"), ("Mist", "mist"), ("Snow", "light snow")]
+
+MAX_STATIONS = 80_000
+SESSION_START = datetime(2024, 1, 1)
+
+
+def scale_counts(sessions):
+    """Return (users, stations, weather_records) for a given session count."""
+    users = max(sessions // 4, 1)
+    stations = min(max(sessions // 3, 1), MAX_STATIONS)
+    # Hourly observations for every city over the span the sessions cover
+    hours = max(sessions // 60, 24)
+    return users, stations, hours * len(CITIES)
+
+
+def _time_of_day(hour):
+    if 5 <= hour < 12:
+        return "Morning"
+    if 12 <= hour < 17:
+        return "Afternoon"
+    if 17 <= hour < 22:
+        return "Evening"
+    return "Night"
+
+
+def generate_sessions_csv(output_csv, sessions, seed=42, duplicate_rate=0.0):
+    """
+    Write `sessions` synthetic charging sessions in the Kaggle CSV layout.
+
+    Output is fully determined by (sessions, seed, duplicate_rate). With a
+    non-zero duplicate_rate that share of rows repeats an earlier
+    User ID + Charging Start Time pair, like the duplicates in the source data.
+    """
+    rng = random.Random(seed)
+    users, stations, _ = scale_counts(sessions)
+    models = list(VEHICLE_MODELS)
+    chargers = list(CHARGER_TYPES)
+    previous = None
+
+    with open(output_csv, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(source_fields(SESSION_CONTRACT))
+        for i in range(sessions):
+            if previous is not None and rng.random() < duplicate_rate:
+                writer.writerow(previous)
+                continue
+            start = SESSION_START + timedelta(minutes=i)
+            charger = rng.choice(chargers)
+            model = rng.choice(models)
+            capacity = VEHICLE_MODELS[model] * rng.uniform(0.9, 1.6)
+            rate = CHARGER_TYPES[charger] * rng.uniform(0.7, 1.3)
+            duration = rng.uniform(0.2, 4.0)
+            energy = min(rate * duration, capacity)
+            soc_start = rng.uniform(5, 60)
+            row = [
+                f"User_{rng.randint(1, users)}", model, capacity,
+                f"Station_{rng.randint(1, stations)}", rng.choice(SESSION_CITIES),
+                start.strftime("%Y-%m-%d %H:%M:%S"),
+                (start + timedelta(hours=duration)).strftime("%Y-%m-%d %H:%M:%S"),
+                energy, duration, rate, energy * rng.uniform(0.15, 0.5),
+                _time_of_day(start.hour), start.strftime("%A"),
+                soc_start, min(soc_start + rng.uniform(20, 80), 100.0),
+                rng.uniform(5, 400), rng.uniform(-10, 40), float(rng.randint(0, 8)),
+                charger, rng.choice(USER_TYPES),
+            ]
+            writer.writerow(row)
+            previous = row
+    logger.info(f"Generated {sessions} sessions in {output_csv}")
+    return Path(output_csv)
+
+
+def _station(rng, station_id):
+    city, state, lat, lon = rng.choice(CITIES)
+    return {
+        "access_code": rng.choice(["public", "private"]),
+        "access_days_time": rng.choice(["24 hours daily", "7am-7pm M-F", "Fleet use only"]),
+        "access_detail_code": None,
+        "cards_accepted": None,
+        "date_last_confirmed": "2024-01-15",
+        "expected_date": None,
+        "fuel_type_code": "ELEC",
+        "groups_with_access_code": "Public",
+        "id": station_id,
+        "maximum_vehicle_class": None,
+        "open_date": f"20{rng.randint(10, 23)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+        "owner_type_code": rng.choice(["P", "LG", "SG", None]),
+        "restricted_access": None,
+        "status_code": "E",
+        "facility_type": rng.choice(["PARKING_LOT", "HOTEL", "UTILITY", None]),
+        "station_name": f"Synthetic Station {station_id}",
+        "station_phone": None,
+        "updated_at": "2024-01-31T22:07:01Z",
+        "geocode_status": "GPS",
+        "latitude": lat + rng.uniform(-0.3, 0.3),
+        "longitude": lon + rng.uniform(-0.3, 0.3),
+        "city": city,
+        "country": "US",
+        "intersection_directions": None,
+        "plus4": None,
+        "state": state,
+        "street_address": f"{rng.randint(1, 9999)} Main St",
+        "zip": f"{rng.randint(10000, 99999)}",
+        "ev_connector_types": rng.sample(CONNECTORS, rng.randint(1, 3)),
+        "ev_dc_fast_num": rng.choice([None, 2, 4, 8]),
+        "ev_level1_evse_num": rng.choice([None, 1]),
+        "ev_level2_evse_num": rng.choice([None, 2, 4, 6]),
+        "ev_network": rng.choice(NETWORKS),
+        "ev_network_web": None,
+        "ev_other_evse": None,
+        "ev_pricing": None,
+        "ev_renewable_source": None,
+        "ev_workplace_charging": rng.random() < 0.2,
+        "station_type": rng.choice(["public", "private"]),
+    }
+
+
+def generate_nrel_json(output_json, stations, seed=42):
+    """Write an NREL-shaped raw NDJSON snapshot holding `stations` fuel stations."""
+    rng = random.Random(seed)
+    metadata = {"extraction_date": SESSION_START.isoformat(), "synthetic_seed": seed}
+    with NDJSONWriter(output_json, metadata) as writer:
+        for i in range(stations):
+            writer.write(_station(rng, i + 1))
+    logger.info(f"Generated {stations} NREL stations in {output_json}")
+    return Path(output_json)
+
+
+def generate_weather_json(output_json, records, seed=42):
+    """Write an OpenWeatherMap-shaped raw NDJSON extract of `records` hourly city observations."""
+    rng = random.Random(seed)
+    metadata = {"extraction_date": SESSION_START.isoformat(), "synthetic_seed": seed}
+    with NDJSONWriter(output_json, metadata) as writer:
+        for i in range(records):
+            city, state, lat, lon = CITIES[i % len(CITIES)]
+            observed = SESSION_START + timedelta(hours=i // len(CITIES))
+            main, desc = rng.choice(WEATHER)
+            temp = rng.uniform(-5, 38)
+            writer.write({
+                "coord": {"lon": lon, "lat": lat},
+                "weather": [{"id": 800, "main": main, "description": desc, "icon": "01d"}],
+                "base": "stations",
+                "main": {"temp": temp, "feels_like": temp - rng.uniform(0, 3),
+                         "pressure": rng.randint(995, 1035), "humidity": rng.randint(15, 100)},
+                "visibility": 10000,
+                "wind": {"speed": rng.uniform(0, 15), "deg": rng.randint(0, 359)},
+                "clouds": {"all": rng.randint(0, 100)},
+                "dt": int(observed.timestamp()),
+                "sys": {"country": "US"},
+                "name": city,
+                "cod": 200,
+                "extraction_timestamp": observed.isoformat(),
+            })
+    logger.info(f"Generated {records} weather records in {output_json}")
+    return Path(output_json)
+
+
+def generate_dataset(root, sessions, seed=42, duplicate_rate=0.0, compression="gzip"):
+    """
+    Lay out a full synthetic dataset under `root` using the project's
+    data/raw and data/external conventions. Returns the written paths.
+    """
+    root = Path(root)
+    raw = root / "data" / "raw"
+    external = root / "data" / "external"
+    raw.mkdir(parents=True, exist_ok=True)
+    external.mkdir(parents=True, exist_ok=True)
+    _, stations, weather_records = scale_counts(sessions)
+
+    sessions_csv = generate_sessions_csv(raw / "ev_charging_patterns.csv", sessions,
+                                         seed=seed, duplicate_rate=duplicate_rate)
+    external_csv = external / "ev_charging_patterns.csv"
+    if external_csv.exists() or external_csv.is_symlink():
+        external_csv.unlink()
+    external_csv.symlink_to(sessions_csv.resolve())
+
+    store = RawStore(raw)
+    paths = {"sessions": sessions_csv}
+    for key, source, generate, records in (("nrel", "nrel_stations", generate_nrel_json, stations),
+                                           ("weather", "weather_data", generate_weather_json, weather_records)):
+        path = store.path_for(source, compression, SESSION_START)
+        paths[key] = generate(path, records, seed=seed)
+        store.register(path, source, SESSION_START)
+    return paths
+
+
+def parse_scale(value):
+    """Parse a scale such as 20000, 1M or 100k into a row count."""
+    value = str(value).strip().lower()
+    multipliers = {"k": 1_000, "m": 1_000_000}
+    if value[-1] in multipliers:
+        return int(float(value[:-1]) * multipliers[value[-1]])
+    return int(value)
+
+
+def main():
+    """Generate a synthetic dataset from the command line"""
+    parser = argparse.ArgumentParser(description="Generate deterministic synthetic EV charging data")
+    parser.add_argument("--sessions", default="100k", help="session rows, e.g. 100k, 1M, 100M")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--duplicate-rate", type=float, default=0.0)
+    parser.add_argument("--compression", default="gzip", choices=["none", "gzip", "zstd"],
+                        help="compression of the raw NDJSON extracts")
+    parser.add_argument("--root", default=".", help="directory that receives data/raw and data/external")
+    args = parser.parse_args()
+
+    paths = generate_dataset(args.root, parse_scale(args.sessions), seed=args.seed,
+                             duplicate_rate=args.duplicate_rate, compression=args.compression)
+    for name, path in paths.items():
+        logger.info(f"{name}: {path}")
+
+
+if __name__ == "__main__":
+    main()
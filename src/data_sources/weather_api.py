@@ -1,6 +1,4 @@
 import requests
-import json
-import time
 import logging
 from datetime import datetime
 from pathlib import Path
@@ -8,7 +6,12 @@ import sys
 
 # Add project root to path
 sys.path.append(str(Path(__file__).parent.parent.parent))
-from config.api_config import OPENWEATHER_API_KEY, OPENWEATHER_BASE_URL, REQUEST_TIMEOUT, MAX_RETRIES, RATE_LIMIT_DELAY
+sys.path.append(str(Path(__file__).parent.parent))
+from config.api_config import OPENWEATHER_API_KEY, OPENWEATHER_BASE_URL, REQUEST_TIMEOUT, MAX_RETRIES, OPENWEATHER_RATE_LIMIT, RAW_COMPRESSION, WEATHER_CITIES
+from data_sources.rate_limiter import RateLimiter
+from data_sources.raw_store import RawStore
+from etl.metrics import count, stage
+from etl.profiling import run_entry_point
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -19,13 +22,15 @@ class WeatherExtractor:
         self.api_key = OPENWEATHER_API_KEY
         self.base_url = OPENWEATHER_BASE_URL
         self.session = requests.Session()
+        self.limiter = RateLimiter(*OPENWEATHER_RATE_LIMIT, name="OpenWeather")
     
-    def extract_current_weather(self, cities):
+    def extract_current_weather(self, cities, sink=None):
         """
         Extract current weather for specified cities
         
         Args:
             cities (list): List of city names or coordinates
+            sink (callable): Optional callback receiving each record as it arrives
         """
         weather_data = []
         
@@ -41,19 +46,23 @@ class WeatherExtractor:
             
             for attempt in range(MAX_RETRIES):
                 try:
+                    self.limiter.wait()
+                    count("http_requests")
                     response = self.session.get(
                         endpoint,
                         params=params,
                         timeout=REQUEST_TIMEOUT
                     )
+                    self.limiter.update(response)
                     response.raise_for_status()
                     
                     data = response.json()
                     data['extraction_timestamp'] = datetime.now().isoformat()
                     weather_data.append(data)
+                    if sink is not None:
+                        sink(data)
                     
                     logger.info(f"Successfully extracted weather for {city}")
-                    time.sleep(RATE_LIMIT_DELAY)
                     break
                     
                 except requests.exceptions.RequestException as e:
@@ -61,64 +70,49 @@ class WeatherExtractor:
                     if attempt == MAX_RETRIES - 1:
                         logger.error(f"Failed to extract weather for {city}")
                     else:
-                        time.sleep(2 ** attempt)
+                        self.limiter.backoff(attempt, e.response)
         
         return weather_data
     
+    def open_writer(self, metadata=None, filename=None):
+        """Open an NDJSON writer that streams weather records to a new partitioned raw file"""
+        return RawStore().open_writer("weather_data", metadata, RAW_COMPRESSION, filename=filename)
+
     def save_to_file(self, data, filename=None):
-        """Save extracted data to JSON file"""
-        if filename is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"weather_data_{timestamp}.json"
-        
-        output_path = Path("data/raw") / filename
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(output_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        """Save extracted data ({'metadata', 'weather_data'}) to an NDJSON raw file"""
+        with self.open_writer(data.get('metadata'), filename) as writer:
+            writer.write_many(data.get('weather_data', []))
+        count("bytes_written", writer.path.stat().st_size)
         
-        logger.info(f"Weather data saved to {output_path}")
-        return output_path
+        logger.info(f"Weather data saved to {writer.path}")
+        return writer.path
 
 def main():
     """Main extraction function"""
     try:
-        extractor = WeatherExtractor()
+        with stage("extract_weather") as m:
+            extractor = WeatherExtractor()
         
-        # Major cities for weather data
-        cities = [
-            "Los Angeles,CA,US",
-            "New York,NY,US", 
-            "Chicago,IL,US",
-            "Houston,TX,US",
-            "Phoenix,AZ,US",
-            "Philadelphia,PA,US",
-            "San Antonio,TX,US",
-            "San Diego,CA,US",
-            "Dallas,TX,US",
-            "Austin,TX,US"
-        ]
+            # Major cities for weather data
+            cities = WEATHER_CITIES
         
-        # Extract weather data
-        weather_data = extractor.extract_current_weather(cities)
-        
-        # Combine with metadata
-        combined_data = {
-            'metadata': {
+            metadata = {
                 'extraction_date': datetime.now().isoformat(),
-                'total_cities': len(cities),
-                'successful_extractions': len(weather_data)
-            },
-            'weather_data': weather_data
-        }
+                'total_cities': len(cities)
+            }
+        
+            # Extract weather data, streaming each city's record to the raw file
+            with extractor.open_writer(metadata) as writer:
+                extractor.extract_current_weather(cities, sink=writer.write)
+                writer.metadata['successful_extractions'] = writer.count
         
-        # Save to file
-        output_path = extractor.save_to_file(combined_data)
-        logger.info(f"Weather extraction complete. {len(weather_data)} cities saved to {output_path}")
+            m.rows_out = writer.count
+            m.add_file_written(writer.path)
+            logger.info(f"Weather extraction complete. {writer.count} cities saved to {writer.path}")
         
     except Exception as e:
         logger.error(f"Weather extraction failed: {e}")
         raise
 
 if __name__ == "__main__":
-    main()
+    run_entry_point(main, "weather_api")
@@ -0,0 +1,193 @@
+"""
+Result cache for repeated dashboard queries.
+
+Results are keyed by the normalized SQL text and its parameters and kept in
+two tiers: a small in-memory LRU and an on-disk Parquet directory evicted
+least-recently-used by total size. The disk tier needs pyarrow; without it
+only the memory tier is used.
+
+Every entry records the load watermarks (ANALYTICS.ETL_WATERMARKS) of the
+tables its query reads. When load.py or a rollup refresh records a new load of
+one of them, the entry no longer matches and is recomputed. Watermarks are
+re-read at most once per `check_interval` seconds.
+
+A query is only cached when every table it reads is schema-qualified and has a
+watermark. Otherwise (an unqualified name, a CTE, TABLE(...), a table no load
+records) nothing would ever invalidate it, so it always runs uncached.
+
+    from database.query_cache import fetch_cached
+    columns, rows = fetch_cached(conn, sql, params)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from database.snowflake_connector import fetch_all
+from database.sql_text import normalize_sql, referenced_tables
+from database.watermarks import all_watermarks
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(os.getenv("EVDW_QUERY_CACHE_DIR", "data/cache/queries"))
+MEMORY_ENTRIES = 256
+DISK_BYTES = 512 * 1024 * 1024
+CHECK_INTERVAL = 60.0
+METADATA_KEY = b"evdw_query_cache"
+
+
+def cache_key(sql, params=None):
+    payload = json.dumps([normalize_sql(sql), params], sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def cacheable_tables(sql):
+    """
+    SCHEMA.TABLE names a query reads (a database prefix is dropped), or None
+    when it reads no table or one that is not schema-qualified.
+    """
+    tables = referenced_tables(sql)
+    if not tables or any("." not in table for table in tables):
+        return None
+    return sorted({".".join(table.split(".")[-2:]) for table in tables})
+
+
+class QueryCache:
+    def __init__(self, cache_dir=CACHE_DIR, memory_entries=MEMORY_ENTRIES, disk_bytes=DISK_BYTES,
+                 check_interval=CHECK_INTERVAL):
+        self.cache_dir = Path(cache_dir)
+        self.memory_entries = memory_entries
+        self.disk_bytes = disk_bytes if pa is not None else 0
+        self.check_interval = check_interval
+        self.hits = self.misses = self.uncached = 0
+        self._memory = OrderedDict()
+        self._watermarks = {}
+        self._checked_at = None
+
+    def watermarks(self, conn, tables):
+        """Current load watermarks of tables, as strings so they compare and serialize alike."""
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.check_interval:
+            cs = conn.cursor()
+            try:
+                self._watermarks = {name: str(value) for name, value in all_watermarks(cs).items()}
+            finally:
+                cs.close()
+            self._checked_at = now
+        return {table: self._watermarks.get(table) for table in tables}
+
+    def _disk_path(self, key):
+        return self.cache_dir / f"{key}.parquet"
+
+    def _read_disk(self, key):
+        path = self._disk_path(key)
+        if not self.disk_bytes or not path.exists():
+            return None
+        try:
+            table = pq.read_table(path)
+        except Exception as e:
+            logger.warning(f"Dropping unreadable cache file {path}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)  # mark as recently used for eviction
+        entry = json.loads(table.schema.metadata[METADATA_KEY])
+        entry["rows"] = list(zip(*(column.to_pylist() for column in table.columns)))
+        return entry
+
+    def _write_disk(self, key, entry):
+        if not self.disk_bytes:
+            return
+        meta = {k: v for k, v in entry.items() if k != "rows"}
+        try:
+            arrays = [pa.array(list(values)) for values in zip(*entry["rows"])] if entry["rows"] else \
+                [pa.array([], pa.null()) for _ in entry["columns"]]
+            table = pa.Table.from_arrays(arrays, names=entry["columns"])
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            logger.info(f"Result not cached on disk: {e}")
+            return
+        table = table.replace_schema_metadata({METADATA_KEY: json.dumps(meta)})
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self._disk_path(key).with_suffix(".tmp")
+        pq.write_table(table, tmp)
+        os.replace(tmp, self._disk_path(key))
+        self._evict_disk()
+
+    def _evict_disk(self):
+        files = sorted(self.cache_dir.glob("*.parquet"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in files)
+        for path in files:
+            if total <= self.disk_bytes:
+                break
+            total -= path.stat().st_size
+            path.unlink(missing_ok=True)
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key, watermarks):
+        """Cached entry for key if it was computed against these watermarks, else None."""
+        entry = self._memory.get(key)
+        if entry is None:
+            entry = self._read_disk(key)
+            if entry is not None:
+                self._remember(key, entry)
+        else:
+            self._memory.move_to_end(key)
+        if entry is None or entry["watermarks"] != watermarks:
+            return None
+        return entry
+
+    def put(self, key, entry):
+        self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def fetch(self, conn, sql, params=None):
+        """Return (columns, rows) for a read-only query, from cache when still valid."""
+        tables = cacheable_tables(sql)
+        watermarks = self.watermarks(conn, tables) if tables else {}
+        if not tables or None in watermarks.values():
+            self.uncached += 1
+            logger.debug(f"Not caching a query without a watermark for every table it reads: {tables}")
+            return fetch_all(conn, sql, params)
+
+        key = cache_key(sql, params)
+        entry = self.get(key, watermarks)
+        if entry is not None:
+            self.hits += 1
+            return entry["columns"], entry["rows"]
+
+        self.misses += 1
+        columns, rows = fetch_all(conn, sql, params)
+        self.put(key, {"columns": columns, "rows": rows, "tables": tables, "watermarks": watermarks})
+        return columns, rows
+
+    def clear(self):
+        self._memory.clear()
+        for path in self.cache_dir.glob("*.parquet"):
+            path.unlink(missing_ok=True)
+
+
+_default_cache = None
+
+
+def fetch_cached(conn, sql, params=None):
+    """fetch_all() through the process-wide QueryCache."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = QueryCache()
+    return _default_cache.fetch(conn, sql, params)
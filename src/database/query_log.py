@@ -0,0 +1,247 @@
+"""
+Telemetry for every statement sent to Snowflake.
+
+get_connection() wraps its connection so each cursor.execute() appends a
+record to logs/queries.jsonl:
+
+    run_id, stage, sfqid, fingerprint, kind, sql, started_at,
+    elapsed_seconds, rowcount, status, error
+
+`fingerprint` hashes the normalized statement with literals masked, so the
+same COPY or MERGE groups across runs. `stage` is the metrics stage the
+statement ran in.
+
+Warehouse-side stats come from INFORMATION_SCHEMA.QUERY_HISTORY. Query
+history lags execution, so they are added later by enrich(), as records of
+kind "history" keyed by sfqid. read_queries() merges them into the statement
+records.
+
+    python src/database/query_log.py                  # slowest fingerprints of the last run
+    python src/database/query_log.py --enrich --run 20240101T120000-4242
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from database.sql_text import fingerprint, normalize_sql
+from etl.metrics import METRICS_DIR, current_stage, run_id
+
+QUERY_LOG = METRICS_DIR / "queries.jsonl"
+# Longest statement text kept per record; the fingerprint identifies the rest
+SQL_CHARS = 500
+HISTORY_COLUMNS = [
+    "query_id", "total_elapsed_time", "compilation_time", "execution_time", "queued_overload_time",
+    "bytes_scanned", "rows_produced", "partitions_scanned", "partitions_total",
+    "warehouse_name", "warehouse_size",
+]
+HISTORY_BATCH = 500
+
+_lock = threading.Lock()
+
+
+def write_query_records(records, path=None):
+    path = Path(path or QUERY_LOG)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _lock:
+        with open(path, 'a') as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + "\n")
+
+
+def record_statement(sql, sfqid, started_at, elapsed, rowcount=None, error=None, path=None):
+    normalized = normalize_sql(sql)
+    write_query_records([{
+        "run_id": run_id(),
+        "stage": current_stage(),
+        "sfqid": sfqid,
+        "fingerprint": fingerprint(sql),
+        "kind": normalized.split(" ", 1)[0],
+        "sql": normalized[:SQL_CHARS],
+        "started_at": started_at,
+        "elapsed_seconds": round(elapsed, 6),
+        "rowcount": rowcount,
+        "status": "error" if error else "ok",
+        "error": str(error) if error else None,
+    }], path)
+
+
+class TracedCursor:
+    """Cursor proxy that logs each execute(); everything else goes to the real cursor."""
+
+    def __init__(self, cursor, path=None):
+        self._cursor = cursor
+        self._path = path
+
+    def execute(self, command, params=None, *args, **kwargs):
+        # UTC with its offset, so enrich() bounds query history correctly in any session time zone
+        started_at = datetime.now(timezone.utc).isoformat()
+        start = time.perf_counter()
+        try:
+            result = self._cursor.execute(command, params, *args, **kwargs)
+        except Exception as e:
+            record_statement(command, getattr(e, "sfqid", None), started_at, time.perf_counter() - start,
+                             error=e, path=self._path)
+            raise
+        record_statement(command, getattr(self._cursor, "sfqid", None), started_at,
+                         time.perf_counter() - start, getattr(self._cursor, "rowcount", None),
+                         path=self._path)
+        # Snowflake returns the cursor itself; keep callers on the proxy
+        return self if result is self._cursor else result
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+
+class TracedConnection:
+    """Connection proxy whose cursors are TracedCursors."""
+
+    def __init__(self, conn, path=None):
+        self._conn = conn
+        self._path = path
+
+    def cursor(self, *args, **kwargs):
+        return TracedCursor(self._conn.cursor(*args, **kwargs), self._path)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+
+def read_queries(run=None, path=None):
+    """Statement records of one run (default: the current one), with any history stats merged in."""
+    run = run or run_id()
+    path = Path(path or QUERY_LOG)
+    if not path.exists():
+        return []
+    records, history = [], {}
+    with open(path) as f:
+        for record in map(json.loads, f):
+            if record.get("kind") == "history":
+                history[record["sfqid"]] = record["history"]
+            elif record.get("run_id") == run:
+                records.append(record)
+    for record in records:
+        if record["sfqid"] in history:
+            record["history"] = history[record["sfqid"]]
+    return records
+
+
+def enrich(conn, run=None, path=None):
+    """
+    Fetch query history for a run's statements that have none yet and append
+    it to the log; returns how many were enriched. Needs a database in use.
+    """
+    records = read_queries(run, path)
+    pending = [r for r in records if r["sfqid"] and "history" not in r]
+    if not pending:
+        return 0
+    since = min(r["started_at"] for r in pending)
+    found = []
+    cs = conn.cursor()
+    try:
+        for i in range(0, len(pending), HISTORY_BATCH):
+            ids = [r["sfqid"] for r in pending[i:i + HISTORY_BATCH]]
+            cs.execute(
+                f"""
+                SELECT {', '.join(HISTORY_COLUMNS)}
+                FROM TABLE(INFORMATION_SCHEMA.QUERY_HISTORY(
+                    END_TIME_RANGE_START => %s::TIMESTAMP_TZ, RESULT_LIMIT => 10000))
+                WHERE query_id IN ({', '.join(['%s'] * len(ids))})
+                """,
+                [since] + ids,
+            )
+            for row in cs.fetchall():
+                stats = dict(zip(HISTORY_COLUMNS, row))
+                found.append({"kind": "history", "sfqid": stats.pop("query_id"), "history": stats})
+    finally:
+        cs.close()
+    write_query_records(found, path)
+    return len(found)
+
+
+def summarize(records):
+    """Per-fingerprint totals, slowest total first."""
+    groups = defaultdict(list)
+    for record in records:
+        groups[record["fingerprint"]].append(record)
+    summary = []
+    for fp, group in groups.items():
+        elapsed = sorted(r["elapsed_seconds"] for r in group)
+        summary.append({
+            "fingerprint": fp,
+            "kind": group[0]["kind"],
+            "stage": group[0]["stage"],
+            "count": len(group),
+            "errors": sum(1 for r in group if r["status"] == "error"),
+            "total_seconds": round(sum(elapsed), 3),
+            "max_seconds": round(elapsed[-1], 3),
+            "bytes_scanned": sum((r.get("history") or {}).get("bytes_scanned") or 0 for r in group),
+            "sql": group[0]["sql"][:80],
+        })
+    return sorted(summary, key=lambda s: s["total_seconds"], reverse=True)
+
+
+def last_run(path=None):
+    """Run ID of the newest statement in the log."""
+    path = Path(path or QUERY_LOG)
+    if not path.exists():
+        return None
+    latest = None
+    with open(path) as f:
+        for record in map(json.loads, f):
+            if record.get("kind") != "history":
+                latest = record["run_id"]
+    return latest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize the Snowflake statements of a run")
+    parser.add_argument("--run", help="run ID (default: the newest run in the log)")
+    parser.add_argument("--enrich", action="store_true", help="add warehouse query-history stats first")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    run = args.run or last_run()
+    if run is None:
+        print(f"No statements logged in {QUERY_LOG}")
+        return 0
+    if args.enrich:
+        from database.snowflake_connector import get_connection
+        conn = get_connection()
+        try:
+            conn.cursor().execute("USE DATABASE EV_CHARGING_DW")
+            print(f"Enriched {enrich(conn, run)} statements from query history")
+        finally:
+            conn.close()
+
+    print(f"Run {run}")
+    for s in summarize(read_queries(run))[:args.top]:
+        print(f"{s['total_seconds']:>9.3f}s  x{s['count']:<4} max {s['max_seconds']:.3f}s  "
+              f"{s['bytes_scanned']:>12}B  {s['stage'] or '-':<22} {s['fingerprint']}  {s['sql']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
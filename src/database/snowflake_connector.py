@@ -1,29 +1,111 @@
 import os
-import snowflake.connector
-from dotenv import load_dotenv
+import sys
+from pathlib import Path
 
-load_dotenv()
+sys.path.append(str(Path(__file__).parent.parent))
+from database.query_log import TracedConnection
+
+# Rows per Arrow batch handed to callers; Snowflake's own result chunks are re-sliced to this
+FETCH_BATCH_ROWS = int(os.getenv("EVDW_FETCH_BATCH_ROWS", "100000"))
 
-ACCOUNT  = os.getenv('SNOWFLAKE_ACCOUNT')
-USER     = os.getenv('SNOWFLAKE_USER')
-PASSWORD = os.getenv('SNOWFLAKE_PASSWORD')
-ROLE     = os.getenv('SNOWFLAKE_ROLE', 'SYSADMIN')
 
 def get_connection():
-    return snowflake.connector.connect(
-        user=USER,
-        password=PASSWORD,
-        account=ACCOUNT,
-        role=ROLE,
+    # Imported here so modules that only need the helpers below stay cheap to import
+    import snowflake.connector
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    # Every statement on the connection is logged with its query ID (database/query_log.py)
+    return TracedConnection(snowflake.connector.connect(
+        user=os.getenv('SNOWFLAKE_USER'),
+        password=os.getenv('SNOWFLAKE_PASSWORD'),
+        account=os.getenv('SNOWFLAKE_ACCOUNT'),
+        role=os.getenv('SNOWFLAKE_ROLE', 'SYSADMIN'),
         client_session_keep_alive=True
-    )
+    ))
 
 
 def execute_queries(conn, queries):
+    """Run statements in order and commit; returns their Snowflake query IDs."""
     cs = conn.cursor()
+    sfqids = []
     try:
         for q in queries:
             cs.execute(q)
+            sfqids.append(getattr(cs, "sfqid", None))
         conn.commit()
     finally:
         cs.close()
+    return sfqids
+
+
+def read_sql_statements(path):
+    """Split a .sql file into statements, dropping comment-only chunks."""
+    statements = []
+    for chunk in Path(path).read_text(encoding="utf-8").split(";"):
+        code = "\n".join(line for line in chunk.splitlines() if not line.strip().startswith("--"))
+        if code.strip():
+            statements.append(chunk.strip())
+    return statements
+
+
+def fetch_all(conn, sql, params=None):
+    """Run a query and return (column names, rows as tuples)."""
+    cs = conn.cursor()
+    try:
+        cs.execute(sql, params)
+        columns = [col[0] for col in cs.description or []]
+        return columns, [tuple(row) for row in cs.fetchall()]
+    finally:
+        cs.close()
+
+
+def iter_arrow_batches(conn, sql, params=None, batch_size=FETCH_BATCH_ROWS):
+    """
+    Stream a query result as pyarrow RecordBatches of at most batch_size rows.
+    Batches are zero-copy slices of the result chunks Snowflake downloads, so
+    only about one chunk is held in memory at a time.
+    """
+    cs = conn.cursor()
+    try:
+        cs.execute(sql, params)
+        for table in cs.fetch_arrow_batches():
+            yield from table.to_batches(max_chunksize=batch_size)
+    finally:
+        cs.close()
+
+
+def iter_pandas_batches(conn, sql, params=None, batch_size=FETCH_BATCH_ROWS):
+    """Stream a query result as pandas DataFrames of at most batch_size rows."""
+    for batch in iter_arrow_batches(conn, sql, params, batch_size):
+        yield batch.to_pandas()
+
+
+def fetch_to_parquet(conn, sql, path, params=None, batch_size=FETCH_BATCH_ROWS, compression="zstd"):
+    """
+    Spill a query result to a local Parquet file batch by batch and return the
+    row count. Nothing is written when the result is empty.
+    """
+    import pyarrow.parquet as pq
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rows = 0
+    writer = None
+    try:
+        for batch in iter_arrow_batches(conn, sql, params, batch_size):
+            if writer is None:
+                writer = pq.ParquetWriter(path, batch.schema, compression=compression)
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def iter_parquet_batches(path, batch_size=FETCH_BATCH_ROWS, columns=None):
+    """Read a spilled result back as memory-mapped RecordBatches."""
+    import pyarrow.parquet as pq
+
+    yield from pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=batch_size, columns=columns)
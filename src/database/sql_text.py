@@ -0,0 +1,50 @@
+"""
+Helpers for reasoning about SQL text without a parser.
+"""
+
+import hashlib
+import re
+
+_TOKEN = re.compile(r"""
+    '(?:[^']|'')*'         # string literal, kept verbatim
+  | "(?:[^"]|"")*"         # quoted identifier, kept verbatim
+  | --[^\n]*               # line comment
+  | /\*.*?\*/              # block comment
+  | \s+
+  | [^'"\s/-]+ | .
+""", re.VERBOSE | re.DOTALL)
+
+# String and numeric literals, masked out of fingerprints
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN|INTO|UPDATE|USING)\s+([A-Z_][\w$]*(?:\.[A-Z_][\w$]*){0,2})", re.IGNORECASE)
+
+
+def normalize_sql(sql):
+    """
+    Canonical form of a statement: comments dropped, whitespace collapsed,
+    everything outside literals upper-cased, trailing semicolon removed.
+    """
+    out = []
+    for token in _TOKEN.findall(sql):
+        if token.startswith(("--", "/*")) or token.isspace():
+            if out and out[-1] != " ":
+                out.append(" ")
+        elif token.startswith(("'", '"')):
+            out.append(token)
+        else:
+            out.append(token.upper())
+    return "".join(out).strip().rstrip(";").strip()
+
+
+def referenced_tables(sql):
+    """Upper-cased table names a statement reads from or writes to."""
+    return sorted({name.upper() for name in _TABLE_REF.findall(normalize_sql(sql))})
+
+
+def fingerprint(sql):
+    """
+    Short hash of a statement's normalized text with literals masked, so runs
+    of the same query with different values share one fingerprint.
+    """
+    return hashlib.sha1(_LITERAL.sub("?", normalize_sql(sql)).encode("utf-8")).hexdigest()[:16]
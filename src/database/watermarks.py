@@ -0,0 +1,50 @@
+"""
+Load watermarks kept in ANALYTICS.ETL_WATERMARKS.
+
+A watermark is a named high-water timestamp: everything at or before it has
+been processed by the job (or loaded into the table) it is named after. Table
+watermarks use the upper-cased qualified table name, e.g. ANALYTICS.DIM_STATION.
+"""
+
+WATERMARK_TABLE = "ANALYTICS.ETL_WATERMARKS"
+
+
+def get_watermark(cs, name):
+    """Return the high-water mark for name, or None if it was never set."""
+    cs.execute(f"SELECT high_water FROM {WATERMARK_TABLE} WHERE name = %(name)s", {"name": name})
+    row = cs.fetchone()
+    return row[0] if row else None
+
+
+def set_watermark(cs, name, high_water):
+    cs.execute(
+        f"""
+        MERGE INTO {WATERMARK_TABLE} w
+        USING (SELECT %(name)s AS name, %(high_water)s::TIMESTAMP_LTZ AS high_water) n
+        ON w.name = n.name
+        WHEN MATCHED THEN UPDATE SET w.high_water = n.high_water, w.updated_at = CURRENT_TIMESTAMP()
+        WHEN NOT MATCHED THEN INSERT (name, high_water) VALUES (n.name, n.high_water)
+        """,
+        {"name": name, "high_water": high_water},
+    )
+
+
+def record_load(cs, tables):
+    """Mark tables as loaded now; cached results that read them become stale."""
+    for table in tables:
+        cs.execute(
+            f"""
+            MERGE INTO {WATERMARK_TABLE} w
+            USING (SELECT %(name)s AS name) n
+            ON w.name = n.name
+            WHEN MATCHED THEN UPDATE SET w.high_water = CURRENT_TIMESTAMP(), w.updated_at = CURRENT_TIMESTAMP()
+            WHEN NOT MATCHED THEN INSERT (name, high_water) VALUES (n.name, CURRENT_TIMESTAMP())
+            """,
+            {"name": table.upper()},
+        )
+
+
+def all_watermarks(cs):
+    """Every watermark as {name: high_water}."""
+    cs.execute(f"SELECT name, high_water FROM {WATERMARK_TABLE}")
+    return {name: high_water for name, high_water in cs.fetchall()}
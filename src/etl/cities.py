@@ -0,0 +1,252 @@
+"""
+Canonical city index shared by the session, station and weather transforms.
+
+The same city arrives as "Houston" in sessions, "Houston,TX,US" in weather
+queries, "Houston" in weather responses and city="Houston", state="TX" in
+NREL. Each spelling is reduced to an upper-cased name with accents,
+punctuation and leading abbreviations (St., Ft., Mt.) normalized, and
+ALIASES are applied. A state is taken from the spelling or the state column
+when there is one; "US" and other trailing parts are ignored.
+
+Canonical cities are (name, state) pairs with an ID from the key registry's
+city dimension. A spelling without a state resolves to the only city of
+that name. When several states have one, it goes to the state with the most
+NREL stations.
+
+The index is built once per NREL snapshot from the weather query list and
+the stations' city/state pairs, and cached in data/state/city_index.json.
+Transforms map whole columns at a time with ids(). Each distinct spelling
+is normalized once, and every row after that is a dictionary hit.
+
+    python src/etl/cities.py                 # rebuild from the latest NREL extract
+    python src/etl/cities.py --resolve "Ft. Worth, Texas"
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import unicodedata
+from collections import Counter
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+sys.path.append(str(Path(__file__).parent.parent))
+from config.api_config import WEATHER_CITIES
+from data_sources.json_codec import iter_raw_records
+from etl.keys import KEYS_DIR, KeyRegistries
+from etl.metrics import stage
+
+CITY_INDEX = Path("data/state/city_index.json")
+CHUNK_ROWS = 10_000
+# Leading abbreviations spelled out, as NREL and OpenWeather disagree on them
+ABBREVIATIONS = {"ST": "SAINT", "STE": "SAINTE", "FT": "FORT", "MT": "MOUNT", "PT": "PORT"}
+ALIASES = {
+    "NYC": "NEW YORK", "NEW YORK CITY": "NEW YORK", "MANHATTAN": "NEW YORK",
+    "LA": "LOS ANGELES", "SF": "SAN FRANCISCO", "PHILLY": "PHILADELPHIA",
+    "WASHINGTON DC": "WASHINGTON", "WASHINGTON D C": "WASHINGTON",
+}
+STATES = {
+    "ALABAMA": "AL", "ALASKA": "AK", "ARIZONA": "AZ", "ARKANSAS": "AR", "CALIFORNIA": "CA",
+    "COLORADO": "CO", "CONNECTICUT": "CT", "DELAWARE": "DE", "DISTRICT OF COLUMBIA": "DC",
+    "FLORIDA": "FL", "GEORGIA": "GA", "HAWAII": "HI", "IDAHO": "ID", "ILLINOIS": "IL",
+    "INDIANA": "IN", "IOWA": "IA", "KANSAS": "KS", "KENTUCKY": "KY", "LOUISIANA": "LA",
+    "MAINE": "ME", "MARYLAND": "MD", "MASSACHUSETTS": "MA", "MICHIGAN": "MI", "MINNESOTA": "MN",
+    "MISSISSIPPI": "MS", "MISSOURI": "MO", "MONTANA": "MT", "NEBRASKA": "NE", "NEVADA": "NV",
+    "NEW HAMPSHIRE": "NH", "NEW JERSEY": "NJ", "NEW MEXICO": "NM", "NEW YORK": "NY",
+    "NORTH CAROLINA": "NC", "NORTH DAKOTA": "ND", "OHIO": "OH", "OKLAHOMA": "OK", "OREGON": "OR",
+    "PENNSYLVANIA": "PA", "RHODE ISLAND": "RI", "SOUTH CAROLINA": "SC", "SOUTH DAKOTA": "SD",
+    "TENNESSEE": "TN", "TEXAS": "TX", "UTAH": "UT", "VERMONT": "VT", "VIRGINIA": "VA",
+    "WASHINGTON": "WA", "WEST VIRGINIA": "WV", "WISCONSIN": "WI", "WYOMING": "WY",
+}
+STATE_CODES = set(STATES.values())
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def _fold(text):
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return " ".join(_PUNCTUATION.sub(" ", text).upper().split())
+
+
+def normalize_state(value):
+    """Two-letter code of a state code or name, or None."""
+    folded = _fold(value or "")
+    if folded in STATE_CODES:
+        return folded
+    return STATES.get(folded)
+
+
+def normalize_city(value):
+    """Canonical spelling of a bare city name."""
+    words = _fold(value or "").split()
+    if words and words[0] in ABBREVIATIONS:
+        words[0] = ABBREVIATIONS[words[0]]
+    name = " ".join(words)
+    return ALIASES.get(name, name)
+
+
+def parse_city(value, state=None):
+    """(name, state or None) of 'Houston', 'Houston,TX,US' or 'Houston, Texas'."""
+    name, *rest = (value or "").split(",")
+    state = normalize_state(state)
+    for part in rest:
+        if state is None:
+            state = normalize_state(part)
+    return normalize_city(name), state
+
+
+class CityIndex:
+    def __init__(self, cities=None, source=None):
+        """
+        Args:
+            cities (dict): "NAME|ST" -> {"id", "name", "state", "stations"}
+            source (str): Signature of the NREL extract the index was built from
+        """
+        self.cities = cities or {}
+        self.source = source
+        self._by_name = {}
+        for key, entry in self.cities.items():
+            self._by_name.setdefault(key.split("|")[0], {})[entry["state"]] = entry
+        self._memo = {}
+
+    def __len__(self):
+        return len(self.cities)
+
+    @classmethod
+    def load(cls, path=CITY_INDEX):
+        """The cached index, or an empty one (every lookup None) if none was built."""
+        path = Path(path)
+        if not path.exists():
+            return cls()
+        return cls(**json.loads(path.read_text(encoding="utf-8")))
+
+    def save(self, path=CITY_INDEX):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}")
+        tmp.write_text(json.dumps({"cities": self.cities, "source": self.source}, indent=1), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def add(self, city, state, stations=0):
+        """Register a (city, state) spelling; returns its key, or None without a name or state."""
+        name, state = parse_city(city, state)
+        city = city or ""
+        if not name or not state:
+            return None
+        key = f"{name}|{state}"
+        entry = self.cities.get(key)
+        if entry is None:
+            entry = self.cities[key] = {"id": None, "name": city.split(",")[0].strip(), "state": state,
+                                        "stations": 0}
+            self._by_name.setdefault(name, {})[state] = entry
+            self._memo.clear()
+        entry["stations"] = stations
+        return key
+
+    def resolve(self, city, state=None):
+        """Canonical city ID of one raw spelling, or None."""
+        name, state = parse_city(city, state)
+        candidates = self._by_name.get(name)
+        if not candidates:
+            return None
+        if state is not None:
+            entry = candidates.get(state)
+        elif len(candidates) == 1:
+            entry = next(iter(candidates.values()))
+        else:
+            entry = max(candidates.values(), key=lambda e: (e["stations"], e["state"]))
+        return entry["id"] if entry else None
+
+    def ids(self, cities, states=None):
+        """Canonical city IDs of a column of raw city strings (and optional state column)."""
+        pairs = list(zip(cities, states)) if states is not None else [(city, None) for city in cities]
+        memo = self._memo
+        for pair in set(pairs).difference(memo):
+            memo[pair] = self.resolve(*pair)
+        return [memo[pair] for pair in pairs]
+
+
+def with_city_ids(rows, index, city_field, state_field=None, chunk_rows=CHUNK_ROWS):
+    """Pass rows through with city_id set, looked up a column per chunk."""
+    chunk = []
+
+    def flush():
+        states = [row.get(state_field) for row in chunk] if state_field else None
+        for row, city_id in zip(chunk, index.ids([row.get(city_field) for row in chunk], states)):
+            row["city_id"] = city_id
+        return chunk
+
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            yield from flush()
+            chunk = []
+    if chunk:
+        yield from flush()
+
+
+def _signature(path):
+    st = Path(path).stat()
+    return f"{Path(path).as_posix()}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def build_city_index(raw_nrel=None, path=CITY_INDEX, keys_root=KEYS_DIR, seeds=WEATHER_CITIES):
+    """
+    The cached index, rebuilt when raw_nrel differs from the extract it was
+    built from. Cities are never dropped, so their IDs stay valid.
+    """
+    index = CityIndex.load(path)
+    source = _signature(raw_nrel) if raw_nrel else None
+    if index.cities and index.source == source:
+        return index
+
+    with stage("build_city_index") as m:
+        stations, spellings = Counter(), {}
+        if raw_nrel:
+            m.add_file_read(raw_nrel)
+            for rec in iter_raw_records(raw_nrel, "fuel_stations"):
+                m.rows_in += 1
+                key = parse_city(rec.get("city"), rec.get("state"))
+                stations[key] += 1
+                spellings.setdefault(key, (rec.get("city"), rec.get("state")))
+        for query in seeds:
+            spellings.setdefault(parse_city(query), (query, None))
+        for key, (city, state) in spellings.items():
+            index.add(city, state, stations[key])
+
+        new = [key for key, entry in index.cities.items() if entry["id"] is None]
+        if new:
+            with KeyRegistries(keys_root) as registries:
+                for key, city_id in zip(new, registries["city"].assign(new)):
+                    index.cities[key]["id"] = city_id
+        m.rows_out = len(index)
+        m.extra["new_cities"] = len(new)
+    index.source = source
+    index.save(path)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the canonical city index")
+    parser.add_argument("--nrel", type=Path, help="raw NREL extract (default: the latest registered)")
+    parser.add_argument("--resolve", metavar="CITY", nargs="+", help="print the city IDs of raw spellings")
+    args = parser.parse_args()
+
+    if args.resolve:
+        index = CityIndex.load()
+        for city in args.resolve:
+            print(f"{index.resolve(city)}\t{city}")
+        return 0
+    raw_nrel = args.nrel
+    if raw_nrel is None:
+        from data_sources.raw_store import RawStore
+        raw_nrel = RawStore().latest("nrel_stations")
+    index = build_city_index(raw_nrel)
+    print(f"{len(index)} canonical cities in {CITY_INDEX}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
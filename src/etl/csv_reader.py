@@ -0,0 +1,124 @@
+"""
+Shared CSV reader for the raw and staged session files.
+
+With pyarrow installed, files are memory-mapped and parsed by pyarrow.csv's
+multithreaded columnar reader, so a parse uses every core and reads straight
+from the OS page cache. Columnar consumers stream record batches and never
+hold more than a few blocks. Whole-table consumers (pandas) get the parsed
+table with the column types pandas.read_csv would give: numbers become int64
+or float64 and everything else, timestamps included, stays text. Tables are
+not cached; each call parses the file again.
+
+Row-wise consumers that want dicts (the session transform) use the csv
+module: turning Arrow batches back into Python dicts costs more than the
+parallel parse saves (the read_rows_* stages of benchmarks/bench_etl.py).
+
+Without pyarrow every helper falls back to the csv module.
+"""
+
+import csv
+import os
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = pc = pacsv = None
+
+HAVE_ARROW = pacsv is not None
+# Bytes handed to each parser thread; larger blocks mean fewer, bigger batches
+BLOCK_SIZE = int(os.getenv("EVDW_CSV_BLOCK_SIZE", str(16 * 1024 * 1024)))
+# Tried in order on each column read without as_strings, as pandas.read_csv infers
+NUMERIC_TYPES = ("int64", "float64")
+
+
+def csv_header(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return next(csv.reader(f), [])
+
+
+def _read_options():
+    return pacsv.ReadOptions(use_threads=True, block_size=BLOCK_SIZE)
+
+
+def _parse_options(newlines_in_values):
+    # Quoted multi-line values (e.g. NREL access hours) need the slower chunker
+    return pacsv.ParseOptions(newlines_in_values=newlines_in_values)
+
+
+def _convert_options(path, columns, empty_is_null=False):
+    # Every column is read as text; read_csv_table types the numeric ones itself
+    names = list(columns) if columns else csv_header(path)
+    return pacsv.ConvertOptions(
+        include_columns=list(columns) if columns else None,
+        include_missing_columns=bool(columns),
+        column_types={name: pa.string() for name in names},
+        strings_can_be_null=empty_is_null,
+    )
+
+
+def _numeric_columns(table):
+    """Cast each text column to the first of NUMERIC_TYPES every value parses as."""
+    for i, name in enumerate(table.column_names):
+        for type_name in NUMERIC_TYPES:
+            try:
+                table = table.set_column(i, name, pc.cast(table.column(i), type_name))
+                break
+            except pa.ArrowInvalid:
+                continue
+    return table
+
+
+def iter_csv_batches(path, columns=None, newlines_in_values=False):
+    """Stream a CSV as pyarrow RecordBatches of source text from a memory map."""
+    with pa.memory_map(str(path), "r") as source:
+        reader = pacsv.open_csv(source, read_options=_read_options(),
+                                parse_options=_parse_options(newlines_in_values),
+                                convert_options=_convert_options(path, columns))
+        yield from reader
+
+
+def read_csv_table(path, columns=None, as_strings=False, newlines_in_values=False):
+    """
+    Parse a CSV into a pyarrow Table from a memory map, on all cores.
+
+    as_strings keeps every value as the exact source text. Otherwise empty
+    values are nulls and columns whose every value is a number become int64 or
+    float64, as in pandas.read_csv; the rest, timestamps included, stay text.
+    Columns listed but absent from the file come back as nulls.
+    """
+    if not HAVE_ARROW:
+        raise ImportError("pyarrow is required for read_csv_table")
+    with pa.memory_map(str(Path(path)), "r") as source:
+        table = pacsv.read_csv(source, read_options=_read_options(),
+                               parse_options=_parse_options(newlines_in_values),
+                               convert_options=_convert_options(path, columns, empty_is_null=not as_strings))
+    return table if as_strings else _numeric_columns(table)
+
+
+def iter_csv_rows(path, columns=None):
+    """Yield rows as {column: source text} dicts ('' for missing values), through the csv module."""
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            yield {k: row.get(k, "") for k in columns} if columns else row
+
+
+def count_csv_rows(path):
+    """Number of data rows in a CSV (quoted values may span lines)."""
+    if not HAVE_ARROW:
+        with open(path, newline='', encoding='utf-8') as f:
+            return sum(1 for _ in csv.DictReader(f))
+    header = csv_header(path)
+    if not header:
+        return 0
+    return sum(batch.num_rows for batch in iter_csv_batches(path, header[:1], newlines_in_values=True))
+
+
+def read_csv_frame(path):
+    """Load a CSV as a pandas DataFrame through the shared Arrow parse."""
+    if not HAVE_ARROW:
+        import pandas as pd
+        return pd.read_csv(path)
+    return read_csv_table(path).to_pandas()
@@ -1,14 +1,21 @@
-import pandas as pd
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+from etl.csv_reader import count_csv_rows, csv_header
+from etl.metrics import stage
 
 def validate_csv_not_empty(csv_path):
-    df = pd.read_csv(csv_path)
-    if df.empty:
-        raise ValueError(f"{csv_path} is empty")
-    print(f"{csv_path}: {len(df)} records validated")
+    with stage("validate_csv_not_empty", file=Path(csv_path).name) as m:
+        m.add_file_read(csv_path)
+        m.rows_in = count_csv_rows(csv_path)
+        if not m.rows_in:
+            raise ValueError(f"{csv_path} is empty")
+    print(f"{csv_path}: {m.rows_in} records validated")
 
 def validate_columns(csv_path, expected_columns):
-    df = pd.read_csv(csv_path, nrows=0)
-    missing = set(expected_columns) - set(df.columns)
-    if missing:
-        raise ValueError(f"{csv_path} missing columns: {missing}")
+    with stage("validate_columns", file=Path(csv_path).name):
+        missing = set(expected_columns) - set(csv_header(csv_path))
+        if missing:
+            raise ValueError(f"{csv_path} missing columns: {missing}")
     print(f"{csv_path}: all expected columns present")
@@ -0,0 +1,214 @@
+"""
+Streaming de-duplication of charging sessions on their composite key.
+
+Sessions are unique on User ID + Charging Start Time (the session_id of
+FACT_CHARGING_SESSIONS). KeyDeduplicator remembers each key as a 64-bit hash.
+Hashes live in an in-memory set until it reaches `max_memory_keys`; the set is
+then spilled to an on-disk SQLite table and a Bloom filter, so memory stays
+bounded however large the input is. A key that misses the Bloom filter is new
+without touching disk; only Bloom hits are confirmed against SQLite. The filter
+is sized for `expected_keys` (estimated from the input size by the callers) at
+a 1% false-positive rate: about 9.6 bits per key, 120 MB at 100M keys.
+
+With 64-bit hashes the chance of two distinct keys colliding stays below 1e-3
+even at 100M sessions; such a collision would drop one genuine row.
+"""
+
+import csv
+import hashlib
+import math
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+
+SESSION_KEY = ("User ID", "Charging Start Time")
+# A set entry costs about 60 bytes (int object plus hash slot), so ~60 MB here
+DEFAULT_MAX_MEMORY_KEYS = 1_000_000
+DEFAULT_EXPECTED_KEYS = 10_000_000
+BLOOM_FPR = 0.01
+# Lower bound of a raw or transformed session's CSV size, for expected_keys()
+SESSION_ROW_BYTES = 250
+
+
+def key_hash(parts):
+    """Signed 64-bit hash of a composite key (signed so SQLite can store it)."""
+    digest = hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def expected_keys(paths, row_bytes=SESSION_ROW_BYTES):
+    """Upper estimate of the rows in CSV files, from their size."""
+    return max(1, sum(os.path.getsize(p) for p in paths) // row_bytes)
+
+
+def bloom_parameters(expected, fpr=BLOOM_FPR):
+    """(size_bytes, hashes) of the smallest Bloom filter holding `expected` keys at false-positive rate fpr."""
+    bits = math.ceil(-expected * math.log(fpr) / math.log(2) ** 2)
+    return math.ceil(bits / 8), max(1, round(bits / expected * math.log(2)))
+
+
+class BloomFilter:
+    def __init__(self, size_bytes, hashes):
+        self.bits = bytearray(size_bytes)
+        self.size = size_bytes * 8
+        self.hashes = hashes
+
+    def _positions(self, h):
+        # Double hashing on the two 32-bit halves of the key hash
+        h &= 0xFFFFFFFFFFFFFFFF
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, h):
+        for pos in self._positions(h):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, h):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(h))
+
+
+class KeyDeduplicator:
+    """Check-and-remember set of composite keys with bounded memory."""
+
+    def __init__(self, max_memory_keys=DEFAULT_MAX_MEMORY_KEYS, spill_dir=None,
+                 expected_keys=DEFAULT_EXPECTED_KEYS, bloom_bytes=None):
+        self.max_memory_keys = max_memory_keys
+        self.spill_dir = spill_dir
+        self.expected_keys = expected_keys
+        # Overrides the filter size bloom_parameters() picks for expected_keys
+        self.bloom_bytes = bloom_bytes
+        self.unique = 0
+        self.duplicates = 0
+        self._memory = set()
+        self._db = None
+        self._db_path = None
+        self._bloom = None
+
+    def _on_disk(self, h):
+        if self._db is None or h not in self._bloom:
+            return False
+        return self._db.execute("SELECT 1 FROM seen WHERE h = ?", (h,)).fetchone() is not None
+
+    def _spill(self):
+        if self._db is None:
+            fd, self._db_path = tempfile.mkstemp(prefix="dedup_", suffix=".sqlite", dir=self.spill_dir)
+            os.close(fd)
+            self._db = sqlite3.connect(self._db_path)
+            self._db.execute("PRAGMA journal_mode = OFF")
+            self._db.execute("PRAGMA synchronous = OFF")
+            self._db.execute("CREATE TABLE seen (h INTEGER PRIMARY KEY) WITHOUT ROWID")
+            # An underestimate still gets a filter sized for the keys already seen
+            size, hashes = bloom_parameters(max(self.expected_keys, self.unique))
+            self._bloom = BloomFilter(self.bloom_bytes or size, hashes)
+        self._db.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((h,) for h in self._memory))
+        self._db.commit()
+        for h in self._memory:
+            self._bloom.add(h)
+        self._memory.clear()
+
+    def is_duplicate(self, parts):
+        """Return True if the key was seen before; otherwise remember it."""
+        h = key_hash(parts)
+        if h in self._memory or self._on_disk(h):
+            self.duplicates += 1
+            return True
+        self._memory.add(h)
+        self.unique += 1
+        if len(self._memory) >= self.max_memory_keys:
+            self._spill()
+        return False
+
+    @property
+    def spilled(self):
+        return self._db is not None
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            os.unlink(self._db_path)
+            self._db = None
+        self._memory.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def dedup_rows(rows, deduplicator, key_fields=SESSION_KEY, on_duplicate=None):
+    """
+    Yield dict rows whose key has not been seen yet. Repeats are passed to
+    on_duplicate (e.g. a quarantine writer's writerow) instead of being yielded.
+    """
+    for row in rows:
+        if deduplicator.is_duplicate([row[f] for f in key_fields]):
+            if on_duplicate is not None:
+                on_duplicate(row)
+            continue
+        yield row
+
+
+def open_quarantine(quarantine_csv, fieldnames):
+    """Open a CSV writer for quarantined rows; returns (file, writer)."""
+    Path(quarantine_csv).parent.mkdir(parents=True, exist_ok=True)
+    f = open(quarantine_csv, 'w', newline='', encoding='utf-8')
+    writer = csv.DictWriter(f, fieldnames=fieldnames)
+    writer.writeheader()
+    return f, writer
+
+
+def dedup_csv(input_csvs, output_csvs, key_fields=SESSION_KEY, quarantine_csv=None, **options):
+    """
+    De-duplicate CSV files against one shared key set, in order.
+
+    With a single output path every input is merged into it (header written
+    once); otherwise each input is rewritten to the matching output path, which
+    may be the input itself. Returns (rows_written, duplicates).
+    """
+    merge = len(output_csvs) == 1
+    if not merge and len(output_csvs) != len(input_csvs):
+        raise ValueError("output_csvs must hold one path or one path per input")
+    written = 0
+    quarantine_file = quarantine_writer = None
+
+    def rows_of(src, deduplicator):
+        nonlocal quarantine_file, quarantine_writer
+        with open(src, newline='', encoding='utf-8') as infile:
+            reader = csv.DictReader(infile)
+            if quarantine_csv and quarantine_writer is None:
+                quarantine_file, quarantine_writer = open_quarantine(quarantine_csv, reader.fieldnames)
+            on_duplicate = quarantine_writer.writerow if quarantine_writer else None
+            yield reader.fieldnames
+            yield from dedup_rows(reader, deduplicator, key_fields, on_duplicate)
+
+    def write(dst, sources, deduplicator):
+        nonlocal written
+        dst = Path(dst)
+        # Write beside the target and swap in, so a file can be deduplicated in place
+        tmp = dst.with_name(f".{dst.name}.dedup")
+        writer = None
+        with open(tmp, 'w', newline='', encoding='utf-8') as out:
+            for src in sources:
+                rows = rows_of(src, deduplicator)
+                fieldnames = next(rows)
+                if writer is None:
+                    writer = csv.DictWriter(out, fieldnames=fieldnames)
+                    writer.writeheader()
+                for row in rows:
+                    writer.writerow(row)
+                    written += 1
+        os.replace(tmp, dst)
+
+    with KeyDeduplicator(**options) as deduplicator:
+        try:
+            if merge:
+                write(output_csvs[0], input_csvs, deduplicator)
+            else:
+                for src, dst in zip(input_csvs, output_csvs):
+                    write(dst, [src], deduplicator)
+        finally:
+            if quarantine_file is not None:
+                quarantine_file.close()
+        return written, deduplicator.duplicates
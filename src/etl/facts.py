@@ -0,0 +1,358 @@
+"""
+Build FACT_CHARGING_SESSIONS rows from the transformed sessions.
+
+Rows are written in clustering order, (date_id, station_id), to match the
+table's CLUSTER BY key. Snowflake fills micro-partitions in insert order, and
+the load's insert of new sessions (sql/dml/merge_facts.sql) keeps that order
+with ORDER BY date_id, station_id, so date-range and station filters can prune
+most partitions from the first load on, without waiting for automatic
+reclustering. The sort is external: sorted
+runs of at most `run_rows` rows are spilled to temporary CSVs and merged, so
+memory stays bounded for any input size.
+
+The build is a chain of chunk generators, each holding one chunk of
+`chunk_rows` rows at a time:
+
+    read -> fact rows -> key registration -> weather attach -> validate -> sort -> write
+
+user_id, vehicle_id and station_id are surrogate keys from the key registry
+(etl/keys.py): each row's natural keys (User ID, Vehicle Model, Charging
+Station ID) are assigned keys a chunk at a time and replaced by them, and
+ANALYTICS.DIM_KEY_MAP maps them back. The hourly weather observations are
+registered in the weather dimension by (city_id, date_id) and written to
+dim_weather.csv as DIM_WEATHER rows; each session takes the key of its city
+and hour, or the UNKNOWN_WEATHER_ID member. Rows missing a NOT NULL fact
+column are dropped and counted.
+
+`memory_mb` is a hard ceiling on the process's private (non file-backed)
+memory: the sort runs get half of it, and the build stops with MemoryError
+rather than swapping if the ceiling is crossed. The registries are memory-
+mapped files, so their pages do not count against it.
+
+    python src/etl/facts.py --chunk-rows 10000 --memory-mb 256
+"""
+
+import argparse
+import csv
+import heapq
+import os
+import sys
+import tempfile
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from etl.keys import KeyRegistries
+from etl.metrics import stage
+from etl.profiling import run_entry_point
+
+PROCESSED_DIR = Path("data/processed")
+
+FACT_FIELDS = [
+    "session_id", "user_id", "station_id", "vehicle_id", "date_id", "weather_id",
+    "start_timestamp", "end_timestamp", "energy_consumed_kwh", "duration_hours",
+    "charging_rate_kw", "charging_cost_usd", "distance_driven_km",
+    "start_soc_percent", "end_soc_percent",
+    # The session's own city and charger, which the rollups group by. Last, so
+    # the staging COPY still matches tables that added them later by position
+    "city_id", "charger_type",
+]
+# Columns FACT_CHARGING_SESSIONS declares NOT NULL
+REQUIRED_FIELDS = [
+    "session_id", "user_id", "station_id", "vehicle_id", "date_id", "weather_id",
+    "start_timestamp", "end_timestamp", "duration_hours", "charging_cost_usd",
+    "start_soc_percent", "end_soc_percent",
+]
+CLUSTER_KEY = ("date_id", "station_id")
+SORT_RUN_ROWS = 250_000
+# Registry dimension of each natural key column, replaced by its surrogate key
+FACT_KEYS = {"user": "user_id", "vehicle": "vehicle_id", "station": "station_id"}
+WEATHER_DIM_FIELDS = ["weather_id", "city_id", "date_id", "temperature_celsius", "humidity_percent",
+                      "weather_main"]
+CHUNK_ROWS = 10_000
+MEMORY_MB = 512
+# Generous in-memory size of one fact row dict, for sizing sort runs
+FACT_ROW_BYTES = 2_000
+# DIM_WEATHER member for sessions without a matched weather record (sql/dml/merge_dim_weather.sql)
+UNKNOWN_WEATHER_ID = -1
+
+
+def date_id(ts):
+    """DIM_TIME key of a timestamp: YYYYMMDDHH."""
+    return int(ts.strftime("%Y%m%d%H"))
+
+
+def _soc(value):
+    return round(float(value)) if value else ""
+
+
+def fact_row(session):
+    """Map one transformed session row to a fact row, still holding natural keys."""
+    start = datetime.fromisoformat(session["Charging Start Time"])
+    return {
+        "session_id": f"{session['User ID']}-{start:%Y%m%dT%H%M%S}",
+        "user_id": session["User ID"],
+        "station_id": session["Charging Station ID"],
+        "vehicle_id": session["Vehicle Model"],
+        "date_id": date_id(start),
+        "weather_id": UNKNOWN_WEATHER_ID,
+        "start_timestamp": session["Charging Start Time"],
+        "end_timestamp": session["Charging End Time"],
+        "energy_consumed_kwh": session["Energy Consumed (kWh)"],
+        "duration_hours": session["Charging Duration (hours)"],
+        "charging_rate_kw": session["Charging Rate (kW)"],
+        "charging_cost_usd": session["Charging Cost (USD)"],
+        "distance_driven_km": session["Distance Driven (since last charge) (km)"],
+        "start_soc_percent": _soc(session["State of Charge (Start %)"]),
+        "end_soc_percent": _soc(session["State of Charge (End %)"]),
+        "city_id": session.get("city_id") or "",
+        "charger_type": session.get("Charger Type") or "",
+    }
+
+
+def weather_key(city_id, date_id):
+    """Natural key of an hourly city observation in the weather dimension."""
+    return f"{city_id}|{date_id}"
+
+
+def cluster_sort_key(row):
+    # Spilled rows come back as strings; compare both keys as numbers either way
+    return int(row["date_id"]), int(row["station_id"])
+
+
+def _write_run(rows, tmp_dir):
+    rows.sort(key=cluster_sort_key)
+    fd, path = tempfile.mkstemp(prefix="facts_run_", suffix=".csv", dir=tmp_dir)
+    with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=FACT_FIELDS)
+        writer.writerows(rows)
+    return path
+
+
+def _read_run(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f, fieldnames=FACT_FIELDS)
+
+
+def sorted_by_cluster_key(rows, run_rows=SORT_RUN_ROWS, tmp_dir=None):
+    """Yield rows in (date_id, station_id) order, holding at most run_rows in memory."""
+    run, runs = [], []
+    try:
+        for row in rows:
+            run.append(row)
+            if len(run) >= run_rows:
+                runs.append(_write_run(run, tmp_dir))
+                run = []
+        if not runs:
+            run.sort(key=cluster_sort_key)
+            yield from run
+            return
+        if run:
+            runs.append(_write_run(run, tmp_dir))
+            run = []
+        yield from heapq.merge(*(_read_run(path) for path in runs), key=cluster_sort_key)
+    finally:
+        for path in runs:
+            os.unlink(path)
+
+
+class MemoryCeiling:
+    """Raises MemoryError once the process's private memory passes `limit_mb`."""
+
+    def __init__(self, limit_mb=MEMORY_MB):
+        self.limit = limit_mb * 2 ** 20
+        self.peak = 0
+
+    @staticmethod
+    def private_bytes():
+        # resident minus file-backed pages (Linux); 0 where /proc is unavailable
+        try:
+            with open("/proc/self/statm") as f:
+                _, resident, shared = map(int, f.read().split()[:3])
+        except OSError:
+            return 0
+        return (resident - shared) * os.sysconf("SC_PAGE_SIZE")
+
+    def check(self):
+        used = self.private_bytes()
+        self.peak = max(self.peak, used)
+        if used > self.limit:
+            raise MemoryError(f"fact build is using {used / 2 ** 20:.0f} MB, over its "
+                              f"{self.limit / 2 ** 20:.0f} MB ceiling; lower chunk_rows or raise memory_mb")
+
+    def sort_run_rows(self, run_rows=SORT_RUN_ROWS):
+        """Rows a sort run may hold: at most half the ceiling."""
+        return max(1, min(run_rows, self.limit // 2 // FACT_ROW_BYTES))
+
+
+def read_chunks(csv_path, chunk_rows=CHUNK_ROWS):
+    """Lists of at most chunk_rows rows of a CSV."""
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        chunk = []
+        for row in csv.DictReader(f):
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def fact_chunks(chunks, rejected):
+    """Map session chunks to fact row chunks; sessions that do not parse are counted in rejected."""
+    for chunk in chunks:
+        rows = []
+        for session in chunk:
+            try:
+                rows.append(fact_row(session))
+            except (KeyError, ValueError, TypeError):
+                rejected["unparseable"] += 1
+        yield rows
+
+
+def register_keys(chunks, registries):
+    """Pass chunks through with their FACT_KEYS natural keys replaced by registry surrogate keys."""
+    for chunk in chunks:
+        for dimension, field in FACT_KEYS.items():
+            for row, key_id in zip(chunk, registries[dimension].assign([r[field] for r in chunk])):
+                row[field] = key_id
+        yield chunk
+
+
+def register_weather(weather_csv, registries, chunk_rows=CHUNK_ROWS, dim_writer=None):
+    """
+    Register the (city_id, date_id) of every weather observation, writing a
+    DIM_WEATHER row for each to dim_writer if given; returns how many were read.
+    """
+    rows = 0
+    for chunk in read_chunks(weather_csv, chunk_rows):
+        rows += len(chunk)
+        observed = []
+        for r in chunk:
+            if r.get("city_id") and r.get("extraction_timestamp"):
+                observed.append((r, date_id(datetime.fromisoformat(r["extraction_timestamp"]))))
+        ids = registries["weather"].assign([weather_key(r["city_id"], hour) for r, hour in observed])
+        if dim_writer is not None:
+            dim_writer.writerows(
+                {"weather_id": weather_id, "city_id": r["city_id"], "date_id": hour,
+                 "temperature_celsius": r.get("temp_celsius"), "humidity_percent": r.get("humidity"),
+                 "weather_main": r.get("weather_main")}
+                for (r, hour), weather_id in zip(observed, ids))
+    return rows
+
+
+def attach_weather(chunks, registries=None, counter=None):
+    """
+    Set each row's weather_id to its city and hour's weather key, or leave it
+    UNKNOWN_WEATHER_ID. Matches are counted in counter["weather_matched"].
+    """
+    for chunk in chunks:
+        city_ids = [row["city_id"] for row in chunk]
+        if registries is None:
+            yield chunk
+            continue
+        found = registries["weather"].lookup(
+            [weather_key(city_id, row["date_id"]) for city_id, row in zip(city_ids, chunk)])
+        for city_id, row, weather_id in zip(city_ids, chunk, found):
+            if city_id and weather_id is not None:
+                row["weather_id"] = weather_id
+                if counter is not None:
+                    counter["weather_matched"] += 1
+        yield chunk
+
+
+def validate(chunks, rejected):
+    """Drop rows missing a REQUIRED_FIELDS value, counting them per field in rejected."""
+    for chunk in chunks:
+        rows = []
+        for row in chunk:
+            missing = next((field for field in REQUIRED_FIELDS if row.get(field) in (None, "")), None)
+            if missing is None:
+                rows.append(row)
+            else:
+                rejected[f"missing_{missing}"] += 1
+        yield rows
+
+
+def _rows(chunks, ceiling):
+    for chunk in chunks:
+        ceiling.check()
+        yield from chunk
+
+
+def build_fact_sessions(sessions_csv, output_csv, cluster=True, run_rows=SORT_RUN_ROWS, keys=None,
+                        weather_csv=None, chunk_rows=CHUNK_ROWS, memory_mb=MEMORY_MB, weather_dim_csv=None):
+    """
+    Write fact rows for every transformed session, in clustering order unless
+    cluster is False. sessions_csv may be one file or a list of shard files.
+
+    `keys` is the KeyRegistries the surrogate keys come from (default: the one
+    under data/state/keys). weather_csv, the transformed weather, supplies
+    weather_id; its DIM_WEATHER rows go to weather_dim_csv when given.
+    """
+    if keys is None:
+        with KeyRegistries() as keys:
+            return build_fact_sessions(sessions_csv, output_csv, cluster, run_rows, keys, weather_csv,
+                                       chunk_rows, memory_mb, weather_dim_csv)
+    ceiling = MemoryCeiling(memory_mb)
+    rejected, matched = Counter(), Counter()
+    with stage("build_fact_sessions") as m:
+        session_files = [sessions_csv] if isinstance(sessions_csv, (str, Path)) else list(sessions_csv)
+        for path in session_files:
+            m.add_file_read(path)
+        if weather_csv is not None and Path(weather_csv).exists():
+            m.add_file_read(weather_csv)
+            with open(weather_dim_csv or os.devnull, 'w', newline='', encoding='utf-8') as dim_file:
+                dim_writer = csv.DictWriter(dim_file, fieldnames=WEATHER_DIM_FIELDS)
+                dim_writer.writeheader()
+                m.extra["weather_rows"] = register_weather(weather_csv, keys, chunk_rows, dim_writer)
+            if weather_dim_csv:
+                m.add_file_written(weather_dim_csv)
+
+        def counted(chunks):
+            for chunk in chunks:
+                m.rows_in += len(chunk)
+                yield chunk
+
+        chunks = fact_chunks(counted(chunk for path in session_files for chunk in read_chunks(path, chunk_rows)),
+                             rejected)
+        chunks = register_keys(chunks, keys)
+        chunks = attach_weather(chunks, keys if weather_csv is not None else None, matched)
+        rows = _rows(validate(chunks, rejected), ceiling)
+        if cluster:
+            rows = sorted_by_cluster_key(rows, ceiling.sort_run_rows(run_rows),
+                                         tmp_dir=Path(output_csv).parent)
+        with open(output_csv, 'w', newline='', encoding='utf-8') as outfile:
+            writer = csv.DictWriter(outfile, fieldnames=FACT_FIELDS)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                m.rows_out += 1
+        ceiling.check()
+        m.extra["rows_rejected"] = dict(rejected)
+        m.extra["weather_matched"] = matched["weather_matched"]
+        m.extra["peak_private_mb"] = round(ceiling.peak / 2 ** 20, 1)
+        m.add_file_written(output_csv)
+        return m.rows_out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build fact rows from the transformed sessions")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="rows per pipeline chunk")
+    parser.add_argument("--memory-mb", type=int, default=MEMORY_MB,
+                        help="hard ceiling on the build's private memory, in MB")
+    args = parser.parse_args(argv)
+
+    sessions_csv = PROCESSED_DIR / "ev_sessions_transformed.csv"
+    weather_csv = PROCESSED_DIR / "weather_transformed.csv"
+    output_csv = PROCESSED_DIR / "fact_charging_sessions.csv"
+    with KeyRegistries() as keys:
+        rows = build_fact_sessions(sessions_csv, output_csv, keys=keys, weather_csv=weather_csv,
+                                   chunk_rows=args.chunk_rows, memory_mb=args.memory_mb,
+                                   weather_dim_csv=PROCESSED_DIR / "dim_weather.csv")
+    print(f"Fact rows written to {output_csv} ({rows} rows, clustered by {', '.join(CLUSTER_KEY)})")
+
+
+if __name__ == "__main__":
+    run_entry_point(main, "facts")
@@ -0,0 +1,337 @@
+"""
+Persistent surrogate key registry.
+
+Maps natural keys (a user ID, a vehicle model, a station ID, a city, a
+city's hourly weather observation) to integer surrogate keys that stay
+stable across runs. Keys are assigned in order of first appearance, starting
+at 1, and never change or get reused.
+
+Each dimension is three memory-mapped files under data/state/keys:
+
+    <dimension>.keys     natural keys as UTF-8, appended back to back
+    <dimension>.offsets  uint64 end offset of each key in .keys; entry i - 1 is key i
+    <dimension>.index    open-addressing hash table of (64-bit hash, key) slots,
+                         after a (count, capacity) header
+
+A lookup hashes the natural key and probes the table, so it costs O(1)
+whatever the registry size. Only the pages it touches are read. A batch
+appends its new keys, then writes their offsets and slots, and stores the
+new count in the header last. A batch cut short by a crash is therefore
+ignored on the next open. One process writes a registry at a time.
+
+New keys reach ANALYTICS.DIM_KEY_MAP through sync_keys(), which load.py runs
+in its load transaction; dimensions with no keys since the last sync are
+not queried at all.
+
+    python src/etl/keys.py                 # key counts per dimension
+    python src/etl/keys.py --show vehicle
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+KEYS_DIR = Path("data/state/keys")
+DIMENSIONS = ("user", "vehicle", "station", "city", "weather")
+KEY_MAP_TABLE = "ANALYTICS.DIM_KEY_MAP"
+SYNC_STATE = "synced.json"
+INITIAL_CAPACITY = 1024
+# Index slots used before the table doubles
+MAX_LOAD = 0.5
+HEADER = 2
+SYNC_BATCH = 10_000
+
+
+def _hash(key_bytes):
+    return int.from_bytes(hashlib.blake2b(key_bytes, digest_size=8).digest(), "little")
+
+
+class _Array:
+    """A file of uint64 values, memory-mapped and grown by doubling."""
+
+    def __init__(self, path, length):
+        self.path = path
+        self._mm = self.values = None
+        self.resize(max(length, os.path.getsize(path) // 8 if path.exists() else 0))
+
+    def __len__(self):
+        return len(self.values)
+
+    def resize(self, length):
+        self.close()
+        with open(self.path, 'a+b') as f:
+            if os.path.getsize(self.path) < length * 8:
+                f.truncate(length * 8)
+        with open(self.path, 'r+b') as f:
+            self._mm = mmap.mmap(f.fileno(), length * 8)
+        self.values = memoryview(self._mm).cast('Q')
+
+    def flush(self):
+        self._mm.flush()
+
+    def close(self):
+        if self._mm is not None:
+            self.values.release()
+            self._mm.close()
+            self._mm = self.values = None
+
+
+class KeyRegistry:
+    def __init__(self, dimension, root=KEYS_DIR):
+        self.dimension = dimension
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        base = self.root / dimension
+        self._keys_path = base.with_suffix(".keys")
+        self._index = _Array(base.with_suffix(".index"), HEADER + 2 * INITIAL_CAPACITY)
+        if self._index.values[1] == 0:
+            self._index.values[1] = INITIAL_CAPACITY
+        self.count = self._index.values[0]
+        self._offsets = _Array(base.with_suffix(".offsets"), max(self.count, INITIAL_CAPACITY))
+        # Drop key bytes a crashed batch appended past the last committed key
+        end = self._offsets.values[self.count - 1] if self.count else 0
+        with open(self._keys_path, 'a+b') as f:
+            if os.path.getsize(self._keys_path) != end:
+                f.truncate(end)
+        self._keys_file = open(self._keys_path, 'r+b')
+        self._keys_mm = None
+        self._remap_keys()
+
+    @property
+    def capacity(self):
+        return self._index.values[1]
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._keys_mm is not None:
+            self._keys_mm.close()
+            self._keys_mm = None
+        self._keys_file.close()
+        self._index.close()
+        self._offsets.close()
+
+    def _remap_keys(self):
+        if self._keys_mm is not None:
+            self._keys_mm.close()
+        size = os.path.getsize(self._keys_path)
+        self._keys_mm = mmap.mmap(self._keys_file.fileno(), size, access=mmap.ACCESS_READ) if size else None
+
+    def _key_bytes(self, key_id):
+        offsets = self._offsets.values
+        start = offsets[key_id - 2] if key_id > 1 else 0
+        return self._keys_mm[start:offsets[key_id - 1]]
+
+    def _probe(self, key_bytes, h):
+        """Surrogate key of key_bytes, or None when it is unassigned."""
+        index, mask = self._index.values, self.capacity - 1
+        slot = h & mask
+        while True:
+            key_id = index[HEADER + 2 * slot + 1]
+            # Slots past the count belong to a batch that never committed
+            if key_id == 0 or key_id > self.count:
+                return None
+            if index[HEADER + 2 * slot] == h and self._key_bytes(key_id) == key_bytes:
+                return key_id
+            slot = (slot + 1) & mask
+
+    def _insert(self, key_id, h):
+        index, mask = self._index.values, self.capacity - 1
+        slot = h & mask
+        while 0 < index[HEADER + 2 * slot + 1] <= self.count and index[HEADER + 2 * slot + 1] != key_id:
+            slot = (slot + 1) & mask
+        index[HEADER + 2 * slot] = h
+        index[HEADER + 2 * slot + 1] = key_id
+
+    def _grow_index(self, needed):
+        capacity = self.capacity
+        while needed > capacity * MAX_LOAD:
+            capacity *= 2
+        if capacity == self.capacity:
+            return
+        # Rehash into a fresh file, then swap it in
+        old_path = self._index.path
+        tmp_path = old_path.with_suffix(".index.tmp")
+        tmp_path.unlink(missing_ok=True)
+        new = _Array(tmp_path, HEADER + 2 * capacity)
+        new.values[0], new.values[1] = self.count, capacity
+        self._index.close()
+        self._index = new
+        for key_id in range(1, self.count + 1):
+            self._insert(key_id, _hash(self._key_bytes(key_id)))
+        new.flush()
+        new.close()
+        os.replace(new.path, old_path)
+        self._index = _Array(old_path, HEADER + 2 * capacity)
+
+    def lookup(self, keys):
+        """Surrogate keys of natural keys, None where one was never assigned."""
+        result = []
+        for key in keys:
+            key_bytes = str(key).encode("utf-8")
+            result.append(self._probe(key_bytes, _hash(key_bytes)))
+        return result
+
+    def assign(self, keys):
+        """Surrogate keys of natural keys, giving new ones the next integers in order of appearance."""
+        found = {}
+        new = {}
+        for key in keys:
+            key_bytes = str(key).encode("utf-8")
+            if key_bytes in found or key_bytes in new:
+                continue
+            h = _hash(key_bytes)
+            key_id = self._probe(key_bytes, h)
+            if key_id is None:
+                new[key_bytes] = h
+            else:
+                found[key_bytes] = key_id
+        if new:
+            self._append(new, found)
+        return [found[str(key).encode("utf-8")] for key in keys]
+
+    def _append(self, new, found):
+        count = self.count
+        self._grow_index(count + len(new))
+        if count + len(new) > len(self._offsets):
+            size = len(self._offsets)
+            while count + len(new) > size:
+                size *= 2
+            self._offsets.resize(size)
+
+        end = self._offsets.values[count - 1] if count else 0
+        self._keys_file.seek(end)
+        self._keys_file.write(b"".join(new))
+        self._keys_file.flush()
+        offsets = self._offsets.values
+        for key_id, (key_bytes, h) in enumerate(new.items(), count + 1):
+            end += len(key_bytes)
+            offsets[key_id - 1] = end
+            # Probe as if the batch were committed so its own slots are not reused
+            self.count = key_id
+            self._insert(key_id, h)
+            found[key_bytes] = key_id
+        self._offsets.flush()
+        self._index.values[0] = self.count
+        self._index.flush()
+        self._remap_keys()
+
+    def key(self, key_id):
+        """Natural key of a surrogate key."""
+        if not 1 <= key_id <= self.count:
+            raise KeyError(key_id)
+        return self._key_bytes(key_id).decode("utf-8")
+
+    def since(self, count):
+        """(surrogate key, natural key) pairs assigned after the first `count` keys."""
+        for key_id in range(count + 1, self.count + 1):
+            yield key_id, self._key_bytes(key_id).decode("utf-8")
+
+
+class KeyRegistries:
+    """One KeyRegistry per dimension, opened on first use."""
+
+    def __init__(self, root=KEYS_DIR):
+        self.root = Path(root)
+        self._open = {}
+
+    def __getitem__(self, dimension):
+        if dimension not in DIMENSIONS:
+            raise KeyError(f"unknown dimension {dimension!r}; expected one of {DIMENSIONS}")
+        if dimension not in self._open:
+            self._open[dimension] = KeyRegistry(dimension, self.root)
+        return self._open[dimension]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for registry in self._open.values():
+            registry.close()
+        self._open.clear()
+
+    def _sync_state(self):
+        path = self.root / SYNC_STATE
+        return json.loads(path.read_text()) if path.exists() else {}
+
+    def unsynced(self):
+        """{dimension: keys assigned since the last sync}, for dimensions that have any."""
+        synced = self._sync_state()
+        counts = {}
+        for dimension in DIMENSIONS:
+            if (self.root / f"{dimension}.index").exists():
+                pending = len(self[dimension]) - synced.get(dimension, 0)
+                if pending > 0:
+                    counts[dimension] = pending
+        return counts
+
+    def sync_keys(self, cs):
+        """
+        Insert keys the warehouse lacks into DIM_KEY_MAP on cursor cs, without
+        committing. Returns {dimension: key count} to pass to mark_synced()
+        once the transaction commits.
+        """
+        counts = {}
+        for dimension in self.unsynced():
+            registry = self[dimension]
+            # The warehouse's own high-water keeps a retried sync from inserting twice
+            cs.execute(f"SELECT COALESCE(MAX(surrogate_key), 0) FROM {KEY_MAP_TABLE} WHERE dimension = %s",
+                       (dimension,))
+            loaded = cs.fetchone()[0]
+            rows = [(dimension, key, key_id) for key_id, key in registry.since(loaded)]
+            for i in range(0, len(rows), SYNC_BATCH):
+                cs.executemany(
+                    f"INSERT INTO {KEY_MAP_TABLE} (dimension, natural_key, surrogate_key) VALUES (%s, %s, %s)",
+                    rows[i:i + SYNC_BATCH])
+            print(f"{KEY_MAP_TABLE}: {len(rows)} new {dimension} keys")
+            counts[dimension] = len(registry)
+        return counts
+
+    def mark_synced(self, counts):
+        if not counts:
+            return
+        path = self.root / SYNC_STATE
+        state = self._sync_state()
+        state.update(counts)
+        tmp = path.with_name(f".{SYNC_STATE}.{os.getpid()}")
+        tmp.write_text(json.dumps(state, indent=2))
+        os.replace(tmp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the surrogate key registry")
+    parser.add_argument("--root", type=Path, default=KEYS_DIR)
+    parser.add_argument("--show", metavar="DIMENSION", help="print every key of DIMENSION")
+    args = parser.parse_args()
+
+    with KeyRegistries(args.root) as registries:
+        if args.show:
+            for key_id, key in registries[args.show].since(0):
+                print(f"{key_id:>10}  {key}")
+            return 0
+        unsynced = registries.unsynced()
+        for dimension in DIMENSIONS:
+            if (args.root / f"{dimension}.index").exists():
+                print(f"{dimension:<8} {len(registries[dimension]):>10} keys, "
+                      f"{unsynced.get(dimension, 0)} not yet in {KEY_MAP_TABLE}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
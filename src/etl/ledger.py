@@ -0,0 +1,141 @@
+"""
+Ledger of the files the pipeline has transformed and loaded.
+
+Each raw extract is recorded per source with its checksum and transform batch
+once its rows are in the staging output, and stamped again once load.py has
+copied that batch into Snowflake. Incremental transforms ask the ledger which
+manifest entries are still pending, so a run only touches files it has not
+seen. A file whose
+checksum changed is pending again.
+
+    ledger = Ledger()
+    new = ledger.pending("weather_data", RawStore().files("weather_data"))
+
+LoadManifest keeps, in the same database, the checksum and load status of each
+processed CSV load.py last sent to Snowflake, so unchanged files skip PUT and
+COPY on the next run.
+"""
+
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+LEDGER_PATH = Path("data/state/ledger.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS processed_files (
+    source TEXT NOT NULL,
+    path TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    batch TEXT NOT NULL,
+    records INTEGER NOT NULL,
+    transformed_at TEXT NOT NULL,
+    loaded_at TEXT,
+    PRIMARY KEY (source, path, sha256)
+);
+CREATE INDEX IF NOT EXISTS processed_files_unloaded ON processed_files (source, loaded_at);
+CREATE TABLE IF NOT EXISTS loaded_outputs (
+    name TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+# loaded_outputs.status: 'put' once the file is on the stage, 'loaded' once its COPY committed
+PUT = "put"
+LOADED = "loaded"
+
+
+def _connect(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class Ledger:
+    def __init__(self, path=LEDGER_PATH):
+        self.path = Path(path)
+
+    def _connect(self):
+        return _connect(self.path)
+
+    def has_entries(self, source):
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT 1 FROM processed_files WHERE source = ? LIMIT 1",
+                                (source,)).fetchone() is not None
+        finally:
+            conn.close()
+
+    def pending(self, source, entries):
+        """The manifest entries (dicts with path and sha256) not yet transformed for source."""
+        conn = self._connect()
+        try:
+            done = set(conn.execute("SELECT path, sha256 FROM processed_files WHERE source = ?", (source,)))
+        finally:
+            conn.close()
+        return [e for e in entries if (e["path"], e["sha256"]) not in done]
+
+    def mark_transformed(self, source, entries, batch, records):
+        """Record entries as transformed in `batch`; records maps path -> records read."""
+        now = datetime.now().isoformat()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO processed_files VALUES (?, ?, ?, ?, ?, ?, NULL)",
+                    [(source, e["path"], e["sha256"], batch, records.get(e["path"], 0), now) for e in entries])
+        finally:
+            conn.close()
+
+    def unloaded(self, source):
+        """Paths transformed for source but not yet loaded."""
+        conn = self._connect()
+        try:
+            return [row[0] for row in conn.execute(
+                "SELECT path FROM processed_files WHERE source = ? AND loaded_at IS NULL ORDER BY path",
+                (source,))]
+        finally:
+            conn.close()
+
+    def mark_loaded(self, source, batches=None):
+        """Stamp the transformed, unloaded files of source (of `batches` if given) as loaded; returns how many."""
+        sql = "UPDATE processed_files SET loaded_at = ? WHERE source = ? AND loaded_at IS NULL"
+        params = [datetime.now().isoformat(), source]
+        if batches is not None:
+            sql += f" AND batch IN ({', '.join('?' * len(batches))})"
+            params += list(batches)
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(sql, params)
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+
+class LoadManifest:
+    def __init__(self, path=LEDGER_PATH):
+        self.path = Path(path)
+
+    def status(self, name, sha256):
+        """Load status of output `name` if its last recorded checksum is sha256, else None."""
+        conn = _connect(self.path)
+        try:
+            row = conn.execute("SELECT sha256, status FROM loaded_outputs WHERE name = ?", (name,)).fetchone()
+        finally:
+            conn.close()
+        return row[1] if row and row[0] == sha256 else None
+
+    def mark(self, name, path, sha256, status):
+        conn = _connect(self.path)
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO loaded_outputs VALUES (?, ?, ?, ?, ?, ?)",
+                             (name, str(path), sha256, Path(path).stat().st_size, status,
+                              datetime.now().isoformat()))
+        finally:
+            conn.close()
@@ -1,68 +1,254 @@
+import argparse
 from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
-from database.snowflake_connector import get_connection
+from database.snowflake_connector import get_connection, read_sql_statements
+from database.watermarks import record_load
+from data_sources.raw_store import file_sha256
+from etl.metrics import stage
+from etl.profiling import run_entry_point
+from etl.keys import KeyRegistries
+from etl.ledger import LOADED, PUT, Ledger, LoadManifest
+from etl.scd import commit_snapshot
 
 RAW_STAGE = '@RAW_DATA.EXT_STAGE'
 PROCESSED   = Path('data/processed')
+# A name may cover several files through a glob pattern
 FILES = {
     'ev_sessions':   PROCESSED / 'ev_sessions_transformed.csv',
     'nrel_stations': PROCESSED / 'nrel_stations_transformed.csv',
-    'weather_data':  PROCESSED / 'weather_transformed.csv'
+    # One file per incremental weather batch not yet loaded; STG_WEATHER accumulates them
+    'weather_data':  PROCESSED / 'weather_increment_*.csv',
+    'nrel_station_changes': PROCESSED / 'nrel_station_changes.csv',
+    'dim_weather': PROCESSED / 'dim_weather.csv',
+    'fact_charging_sessions': PROCESSED / 'fact_charging_sessions.csv'
 }
+# Tables each file's COPY changes; their watermarks invalidate cached query results
+LOADED_TABLES = {
+    'ev_sessions': ['STAGING.STG_EV_SESSIONS'],
+    'nrel_stations': ['STAGING.STG_NREL_STATIONS'],
+    'weather_data': ['STAGING.STG_WEATHER'],
+    'nrel_station_changes': ['STAGING.STG_NREL_STATION_CHANGES', 'ANALYTICS.DIM_STATION'],
+    'dim_weather': ['STAGING.STG_DIM_WEATHER', 'ANALYTICS.DIM_WEATHER'],
+    'fact_charging_sessions': ['STAGING.STG_FACT_CHARGING_SESSIONS', 'ANALYTICS.FACT_CHARGING_SESSIONS'],
+}
+# {files} is the quoted list of staged file names
+COPY_COMMANDS = {
+    'ev_sessions': """
+        COPY INTO STAGING.stg_ev_sessions
+        FROM {stage} FILES = ({files})
+        FILE_FORMAT = (TYPE = CSV FIELD_OPTIONALLY_ENCLOSED_BY='"' SKIP_HEADER=1)
+        ON_ERROR = 'CONTINUE'
+        """,
+    'nrel_stations': """
+        COPY INTO STAGING.stg_nrel_stations
+        FROM {stage} FILES = ({files})
+        FILE_FORMAT = (TYPE = CSV FIELD_OPTIONALLY_ENCLOSED_BY='"' SKIP_HEADER=1)
+        ON_ERROR = 'CONTINUE'
+        """,
+    'weather_data': """
+        COPY INTO STAGING.stg_weather
+        FROM {stage} FILES = ({files})
+        FILE_FORMAT = (TYPE = CSV FIELD_OPTIONALLY_ENCLOSED_BY='"' SKIP_HEADER=1)
+        ON_ERROR = 'CONTINUE'
+        """,
+    'nrel_station_changes': """
+        COPY INTO STAGING.stg_nrel_station_changes
+        FROM {stage} FILES = ({files})
+        FILE_FORMAT = (TYPE = CSV FIELD_OPTIONALLY_ENCLOSED_BY='"' SKIP_HEADER=1)
+        ON_ERROR = 'ABORT_STATEMENT'
+        """,
+    # Like the fact file below, rewritten in full by every fact build and merged
+    # by MERGE_DIM_WEATHER
+    'dim_weather': """
+        COPY INTO STAGING.stg_dim_weather
+        FROM {stage} FILES = ({files})
+        FILE_FORMAT = (TYPE = CSV FIELD_OPTIONALLY_ENCLOSED_BY='"' SKIP_HEADER=1)
+        ON_ERROR = 'CONTINUE'
+        FORCE = TRUE
+        """,
+    # The fact file holds every session and MERGE_FACTS inserts only the new
+    # ones. The staging table is truncated per load, so the file is always
+    # copied in full, even when load history has seen the same content before.
+    'fact_charging_sessions': """
+        COPY INTO STAGING.stg_fact_charging_sessions
+        FROM {stage} FILES = ({files})
+        FILE_FORMAT = (TYPE = CSV FIELD_OPTIONALLY_ENCLOSED_BY='"' SKIP_HEADER=1)
+        ON_ERROR = 'CONTINUE'
+        FORCE = TRUE
+        """,
+}
+APPLY_STATION_CHANGES = Path(__file__).parent.parent.parent / 'sql' / 'dml' / 'apply_station_changes.sql'
+MERGE_DIM_WEATHER = Path(__file__).parent.parent.parent / 'sql' / 'dml' / 'merge_dim_weather.sql'
+MERGE_FACTS = Path(__file__).parent.parent.parent / 'sql' / 'dml' / 'merge_facts.sql'
+
+def _rows_loaded(cs):
+    """Sum rows_loaded over the per-file result rows a COPY INTO returns."""
+    columns = [col[0].lower() for col in cs.description or []]
+    if "rows_loaded" not in columns:
+        return 0
+    idx = columns.index("rows_loaded")
+    return sum(row[idx] or 0 for row in cs.fetchall())
+
+def staged_files():
+    """The staging files present now, as {name: [paths]}."""
+    return {name: sorted(pattern.parent.glob(pattern.name)) for name, pattern in FILES.items()}
 
-def main():
+def increment_batch(path):
+    """Transform batch ID of a weather increment file (weather_increment_<batch>.csv)."""
+    return Path(path).stem.rpartition('_')[2]
+
+def plan_load(manifest, force=False, files=None, checksum=file_sha256, verbose=True):
+    """
+    Files to COPY, as {name: [(path, sha256, put), ...]}; put is False when the
+    file already sits on the stage. `files` defaults to staged_files().
+    A file whose checksum matches its last committed load is skipped entirely.
+    """
+    plan = {}
+    for name, paths in (staged_files() if files is None else files).items():
+        if not paths and verbose:
+            print(f"Skipping {name}: {FILES[name]} not found (nothing new to load)")
+        for path in paths:
+            digest = checksum(path)
+            status = None if force else manifest.status(path.name, digest)
+            if status == LOADED:
+                if verbose:
+                    print(f"Skipping {path.name}: unchanged since its last load")
+                continue
+            plan.setdefault(name, []).append((path, digest, status != PUT))
+    return plan
+
+def connect():
+    """Snowflake connection with the warehouse context the load runs in."""
     conn = get_connection()
     cs = conn.cursor()
-    
     try:
-        # Set database and schema context first
         cs.execute("USE DATABASE EV_CHARGING_DW")
         cs.execute("USE SCHEMA RAW_DATA")
         cs.execute("USE WAREHOUSE EV_DEV_WH")
-        
+    finally:
+        cs.close()
+    return conn
+
+def load_plan(conn, plan, manifest, force=False):
+    """
+    PUT a plan, then COPY it in one explicit transaction and record it as
+    loaded. Returns {name: rows loaded}. The caller rolls back on error.
+
+    Files are marked PUT once staged and LOADED after the commit. A crash in
+    between leaves them PUT, so the next run copies them again without an
+    upload; Snowflake's COPY load history skips a file it already loaded under
+    the same name and content, so those rows are not loaded twice.
+    """
+    keys = KeyRegistries()
+    cs = conn.cursor()
+    try:
         # PUT files into stage
-        for name, path in FILES.items():
-            put_cmd = f"PUT file://{path.absolute()} {RAW_STAGE}/{path.name} OVERWRITE = TRUE"
-            print(f"Executing: {put_cmd}")
-            cs.execute(put_cmd)
-        
+        for name, files in plan.items():
+            for path, checksum, put in files:
+                if not put:
+                    continue
+                put_cmd = f"PUT file://{path.absolute()} {RAW_STAGE}/{path.name} OVERWRITE = TRUE"
+                print(f"Executing: {put_cmd}")
+                with stage("load_put", file=path.name) as m:
+                    m.add_file_read(path)
+                    cs.execute(put_cmd)
+                manifest.mark(path.name, path, checksum, PUT)
+
+        # The connection autocommits; everything from here to the commit is one
+        # transaction, so a failure rolls the TRUNCATE and COPYs back together
+        cs.execute("BEGIN")
+
+        # The change set only holds this snapshot's diff, never earlier ones
+        if 'nrel_station_changes' in plan:
+            cs.execute("TRUNCATE TABLE STAGING.stg_nrel_station_changes")
+        if 'dim_weather' in plan:
+            cs.execute("TRUNCATE TABLE STAGING.stg_dim_weather")
+        if 'fact_charging_sessions' in plan:
+            cs.execute("TRUNCATE TABLE STAGING.stg_fact_charging_sessions")
+
         # COPY INTO staging tables
-        copy_commands = [
-            f"""
-            COPY INTO STAGING.stg_ev_sessions
-            FROM {RAW_STAGE}/ev_sessions_transformed.csv
-            FILE_FORMAT = (TYPE = CSV FIELD_OPTIONALLY_ENCLOSED_BY='"' SKIP_HEADER=1)
-            ON_ERROR = 'CONTINUE'
-            """,
-            f"""
-            COPY INTO STAGING.stg_nrel_stations  
-            FROM {RAW_STAGE}/nrel_stations_transformed.csv
-            FILE_FORMAT = (TYPE = CSV FIELD_OPTIONALLY_ENCLOSED_BY='"' SKIP_HEADER=1)
-            ON_ERROR = 'CONTINUE'
-            """,
-            f"""
-            COPY INTO STAGING.stg_weather
-            FROM {RAW_STAGE}/weather_transformed.csv
-            FILE_FORMAT = (TYPE = CSV FIELD_OPTIONALLY_ENCLOSED_BY='"' SKIP_HEADER=1)
-            ON_ERROR = 'CONTINUE'
-            """
-        ]
-        
-        for cmd in copy_commands:
+        rows = {}
+        for name, cmd in COPY_COMMANDS.items():
+            if name not in plan:
+                continue
+            files = ", ".join(f"'{path.name}'" for path, _, _ in plan[name])
+            cmd = cmd.format(stage=RAW_STAGE, files=files)
+            if force and "FORCE" not in cmd:
+                cmd += "FORCE = TRUE\n"
             print(f"Executing COPY command...")
-            cs.execute(cmd)
-            
+            with stage("load_copy", table=name, files=len(plan[name])) as m:
+                cs.execute(cmd)
+                m.rows_out = _rows_loaded(cs)
+                m.extra["sfqid"] = cs.sfqid
+            rows[name] = m.rows_out
+            print(f"{name}: {m.rows_out} rows loaded (query {cs.sfqid})")
+
+        # Close and open DIM_STATION versions for the changed stations only
+        if 'nrel_station_changes' in plan:
+            with stage("apply_station_changes"):
+                for statement in read_sql_statements(APPLY_STATION_CHANGES):
+                    cs.execute(statement)
+
+        # New weather keys, and the unknown member, before the facts that reference them
+        if 'dim_weather' in plan or 'fact_charging_sessions' in plan:
+            with stage("merge_dim_weather"):
+                for statement in read_sql_statements(MERGE_DIM_WEATHER):
+                    cs.execute(statement)
+
+        # Only sessions the fact table lacks are inserted; loaded_at is left to its default
+        if 'fact_charging_sessions' in plan:
+            with stage("merge_facts") as m:
+                for statement in read_sql_statements(MERGE_FACTS):
+                    cs.execute(statement)
+                m.rows_out = cs.rowcount or 0
+            print(f"ANALYTICS.FACT_CHARGING_SESSIONS: {m.rows_out} new sessions")
+
+        record_load(cs, [table for name in plan for table in LOADED_TABLES[name]])
+        # New surrogate keys land in the same transaction as the facts that use them
+        synced = keys.sync_keys(cs)
         conn.commit()
+        keys.mark_synced(synced)
+    finally:
+        cs.close()
+        keys.close()
+
+    # Promote the snapshot first: a crash before the files are marked LOADED
+    # only copies the same change set again, which the SQL applies idempotently
+    if 'nrel_station_changes' in plan:
+        commit_snapshot()
+    for files in plan.values():
+        for path, checksum, _ in files:
+            manifest.mark(path.name, path, checksum, LOADED)
+    if 'weather_data' in plan:
+        increments = [path for path, _, _ in plan['weather_data']]
+        Ledger().mark_loaded('weather_data', [increment_batch(path) for path in increments])
+        for path in increments:
+            path.unlink()
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PUT and COPY staging CSVs into Snowflake")
+    parser.add_argument("--force", action="store_true",
+                        help="reload every file even if it is unchanged since its last load")
+    args = parser.parse_args(argv)
+
+    manifest = LoadManifest()
+    plan = plan_load(manifest, args.force)
+    if not plan:
+        print("Nothing to load: every staging file is unchanged since its last load")
+        return
+
+    conn = connect()
+    try:
+        load_plan(conn, plan, manifest, force=args.force)
         print("Data loaded into Snowflake STAGING schema successfully!")
-        
     except Exception as e:
         print(f"Error during load: {e}")
         conn.rollback()
         raise
     finally:
-        cs.close()
         conn.close()
 
 if __name__ == '__main__':
-    main()
+    run_entry_point(main, 'load')
@@ -0,0 +1,192 @@
+"""
+Per-stage run metrics.
+
+Wrap a unit of work in `stage()` to record wall time, CPU time, rows in/out,
+bytes read/written, peak memory and HTTP request counts. Each finished stage is
+appended to logs/metrics.jsonl and the current run is rendered to
+logs/metrics.prom in OpenMetrics text format for the monitoring scraper.
+
+    with stage("transform_weather") as m:
+        m.rows_in = ...
+        m.add_file_read(raw_json)
+
+Code running inside a stage it did not open (e.g. an extractor's retry loop)
+can bump the active stage with `count("http_requests")`.
+"""
+
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+METRICS_DIR = Path(os.getenv("EVDW_METRICS_DIR", "logs"))
+COUNTERS = ("rows_in", "rows_out", "bytes_read", "bytes_written", "http_requests")
+
+_lock = threading.Lock()
+_active = []
+_records = []
+
+
+def run_id():
+    """
+    Identifier shared by every stage of one pipeline run. Exported through the
+    environment so worker processes and child scripts report under the same ID.
+    """
+    value = os.environ.get("EVDW_RUN_ID")
+    if not value:
+        value = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        os.environ["EVDW_RUN_ID"] = value
+    return value
+
+
+def _peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class StageMetrics:
+    def __init__(self, name, labels=None):
+        self.name = name
+        self.labels = labels or {}
+        self.rows_in = 0
+        self.rows_out = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.http_requests = 0
+        self.extra = {}
+
+    def add_file_read(self, path):
+        self.bytes_read += os.path.getsize(path)
+
+    def add_file_written(self, path):
+        self.bytes_written += os.path.getsize(path)
+
+    def as_record(self, status, started_at, wall, cpu):
+        record = {
+            "run_id": run_id(),
+            "stage": self.name,
+            "labels": self.labels,
+            "status": status,
+            "started_at": started_at,
+            "wall_seconds": round(wall, 6),
+            "cpu_seconds": round(cpu, 6),
+            "peak_rss_bytes": _peak_rss_bytes(),
+        }
+        record.update({name: getattr(self, name) for name in COUNTERS})
+        record["rows_per_sec"] = round(self.rows_out / wall, 1) if wall > 0 else None
+        record.update(self.extra)
+        return record
+
+
+@contextmanager
+def stage(name, **labels):
+    """Record metrics for the enclosed block under `name`."""
+    metrics = StageMetrics(name, {k: str(v) for k, v in labels.items()})
+    started_at = datetime.now().isoformat()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    _active.append(metrics)
+    status = "error"
+    try:
+        yield metrics
+        status = "ok"
+    finally:
+        _active.remove(metrics)
+        record = metrics.as_record(status, started_at,
+                                   time.perf_counter() - wall_start,
+                                   time.process_time() - cpu_start)
+        try:
+            write_record(record)
+        except OSError as e:
+            logger.warning(f"Could not write metrics for {name}: {e}")
+
+
+def count(field, n=1):
+    """Add n to a counter on the innermost active stage; no-op outside a stage."""
+    if not _active:
+        return
+    with _lock:
+        metrics = _active[-1]
+        if field in COUNTERS:
+            setattr(metrics, field, getattr(metrics, field) + n)
+        else:
+            metrics.extra[field] = metrics.extra.get(field, 0) + n
+
+
+def current_stage():
+    """Name of the innermost active stage, or None outside a stage."""
+    with _lock:
+        return _active[-1].name if _active else None
+
+
+def write_record(record):
+    METRICS_DIR.mkdir(parents=True, exist_ok=True)
+    with _lock:
+        _records.append(record)
+        with open(METRICS_DIR / "metrics.jsonl", 'a') as f:
+            f.write(json.dumps(record) + "\n")
+        write_openmetrics(_records)
+    logger.debug(f"Stage {record['stage']} finished in {record['wall_seconds']}s")
+
+
+def read_run_records(run=None):
+    """Read every record of one run (default: the current one) from metrics.jsonl."""
+    run = run or run_id()
+    path = METRICS_DIR / "metrics.jsonl"
+    if not path.exists():
+        return []
+    with open(path) as f:
+        return [r for r in map(json.loads, f) if r.get("run_id") == run]
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(record):
+    labels = {"stage": record["stage"], **record.get("labels", {})}
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def write_openmetrics(records):
+    """Render records in OpenMetrics text format to metrics.prom (atomically)."""
+    gauges = {
+        "wall_seconds": "Stage wall-clock time in seconds",
+        "cpu_seconds": "Stage CPU time in seconds",
+        "peak_rss_bytes": "Peak resident set size of the process at stage end",
+        "rows_in": "Rows read by the stage",
+        "rows_out": "Rows written by the stage",
+        "bytes_read": "Bytes read by the stage",
+        "bytes_written": "Bytes written by the stage",
+        "http_requests": "HTTP requests issued by the stage",
+    }
+    # Last record wins per stage + label set
+    latest = {}
+    for record in records:
+        latest[_labels(record)] = record
+
+    lines = ["# TYPE evdw_run_info gauge",
+             f'evdw_run_info{{run_id="{run_id()}"}} 1']
+    for field, help_text in gauges.items():
+        lines.append(f"# TYPE evdw_stage_{field} gauge")
+        lines.append(f"# HELP evdw_stage_{field} {help_text}")
+        for labels, record in latest.items():
+            lines.append(f"evdw_stage_{field}{labels} {record.get(field, 0)}")
+    lines.append("# TYPE evdw_stage_success gauge")
+    for labels, record in latest.items():
+        lines.append(f"evdw_stage_success{labels} {1 if record['status'] == 'ok' else 0}")
+    lines.append("# EOF")
+
+    path = METRICS_DIR / "metrics.prom"
+    tmp = path.with_name(f".metrics.prom.{os.getpid()}")
+    tmp.write_text("\n".join(lines) + "\n")
+    os.replace(tmp, path)
@@ -0,0 +1,215 @@
+"""
+Micro-batch loader.
+
+Watches data/processed by polling and loads staging files into Snowflake as
+they change, so new weather increments and station changes reach staging
+within minutes instead of at the next load.py run:
+
+    python src/etl/microbatch.py --interval 15 --max-wait 120 --max-mb 64
+    python src/etl/microbatch.py --once     # load what is ready, then exit
+
+Each poll plans the load the way load.py does, so files unchanged since
+their last load are skipped. A file is queued once its size and mtime held
+still for a whole poll, which keeps files that are still being written out of
+a batch. The queue is flushed, oldest first, when it holds --max-mb or
+--max-files, or when its oldest file has waited --max-wait seconds.
+
+Backpressure: a batch carries at most --max-mb / --max-files. The loader
+keeps flushing without sleeping while a full batch is queued. A failed batch
+stays queued and is retried after a doubling backoff, capped at
+--max-backoff.
+
+Exactly-once bookkeeping is load.load_plan's. Files are marked PUT and then
+LOADED after the commit. Weather increments are stamped in the ledger by
+batch and removed. Snowflake skips a file it already loaded under the same
+name and content.
+"""
+
+import argparse
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from data_sources.raw_store import file_sha256
+from etl import load
+from etl.ledger import LoadManifest
+from etl.metrics import stage
+from etl.profiling import run_entry_point
+
+INTERVAL = 15.0
+MAX_WAIT = 120.0
+MAX_BYTES = 64 * 1024 * 1024
+MAX_FILES = 50
+MAX_BACKOFF = 300.0
+
+Queued = namedtuple("Queued", "name path checksum put size queued_at")
+
+
+class MicroBatchLoader:
+    def __init__(self, manifest=None, loader=None, interval=INTERVAL, max_wait=MAX_WAIT,
+                 max_bytes=MAX_BYTES, max_files=MAX_FILES, max_backoff=MAX_BACKOFF):
+        """
+        Args:
+            manifest (LoadManifest): Load status of the staging files
+            loader (callable): Loads a plan; defaults to load.load_plan on a Snowflake connection
+            interval (float): Seconds between polls
+            max_wait (float): Longest a queued file waits for its batch to fill
+            max_bytes (int): Size that flushes a batch, and the most one batch carries
+            max_files (int): Files that flush a batch, and the most one batch carries
+            max_backoff (float): Longest pause after failed batches
+        """
+        self.manifest = manifest or LoadManifest()
+        self.loader = loader or self._load_snowflake
+        self.interval = interval
+        self.max_wait = max_wait
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.max_backoff = max_backoff
+        self.queue = {}
+        self.failures = 0
+        self.batches = 0
+        self._stats = {}
+        self._checksums = {}
+        self._conn = None
+
+    def _checksum(self, path):
+        # Hash a file once per version rather than on every poll
+        st = path.stat()
+        key = (path, st.st_size, st.st_mtime_ns)
+        if key not in self._checksums:
+            self._checksums = {k: v for k, v in self._checksums.items() if k[0] != path}
+            self._checksums[key] = file_sha256(path)
+        return self._checksums[key]
+
+    def poll(self, now, settle=True):
+        """Queue the planned files that held still since the previous poll; returns the queue size."""
+        stats, stable = {}, {}
+        for name, paths in load.staged_files().items():
+            for path in paths:
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                stats[path] = (st.st_size, st.st_mtime_ns)
+                if not settle or self._stats.get(path) == stats[path]:
+                    stable.setdefault(name, []).append(path)
+        self._stats = stats
+
+        planned = set()
+        for name, files in load.plan_load(self.manifest, files=stable, checksum=self._checksum,
+                                          verbose=False).items():
+            for path, checksum, put in files:
+                planned.add(path)
+                queued = self.queue.get(path)
+                if queued is None or queued.checksum != checksum:
+                    self.queue[path] = Queued(name, path, checksum, put, stats[path][0], now)
+        # Files that changed again, vanished or were loaded elsewhere leave the queue
+        for path in set(self.queue) - planned:
+            del self.queue[path]
+        return len(self.queue)
+
+    def due(self, now):
+        if not self.queue:
+            return False
+        queued = self.queue.values()
+        return (sum(q.size for q in queued) >= self.max_bytes or len(self.queue) >= self.max_files
+                or now - min(q.queued_at for q in queued) >= self.max_wait)
+
+    def next_batch(self):
+        """The oldest queued files, up to max_bytes and max_files."""
+        batch, size = [], 0
+        for queued in sorted(self.queue.values(), key=lambda q: (q.queued_at, str(q.path))):
+            if batch and (size + queued.size > self.max_bytes or len(batch) >= self.max_files):
+                break
+            batch.append(queued)
+            size += queued.size
+        return batch
+
+    def flush(self):
+        """Load the next batch; returns True if it committed."""
+        batch = self.next_batch()
+        plan = {}
+        for queued in batch:
+            plan.setdefault(queued.name, []).append((queued.path, queued.checksum, queued.put))
+        try:
+            with stage("microbatch_load", files=len(batch)) as m:
+                m.extra["bytes"] = sum(q.size for q in batch)
+                m.extra["queued_files"] = len(self.queue)
+                self.loader(plan)
+        except Exception as e:
+            self.failures += 1
+            print(f"Micro-batch of {len(batch)} files failed ({e}); retrying in {self.backoff():.0f}s")
+            return False
+        self.failures = 0
+        self.batches += 1
+        for queued in batch:
+            del self.queue[queued.path]
+        print(f"Micro-batch {self.batches}: loaded {len(batch)} files "
+              f"({', '.join(sorted(plan))}); {len(self.queue)} still queued")
+        return True
+
+    def backoff(self):
+        return min(self.max_backoff, self.interval * 2 ** self.failures)
+
+    def _load_snowflake(self, plan):
+        if self._conn is None:
+            self._conn = load.connect()
+        try:
+            load.load_plan(self._conn, plan, self.manifest)
+        except Exception:
+            # Start the retry on a fresh connection
+            conn, self._conn = self._conn, None
+            try:
+                conn.rollback()
+                conn.close()
+            except Exception:
+                pass
+            raise
+
+    def run(self, once=False):
+        """Poll and flush until interrupted; with once, load what is ready and return."""
+        try:
+            while True:
+                now = time.monotonic()
+                self.poll(now, settle=not once)
+                while self.queue and (once or self.due(now)):
+                    if not self.flush():
+                        break
+                    now = time.monotonic()
+                if once:
+                    return 0 if not self.queue else 1
+                time.sleep(self.backoff() if self.failures else self.interval)
+        finally:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load new staging files into Snowflake in micro-batches")
+    parser.add_argument("--interval", type=float, default=INTERVAL, help="seconds between polls")
+    parser.add_argument("--max-wait", type=float, default=MAX_WAIT,
+                        help="longest a file waits for its batch to fill, in seconds")
+    parser.add_argument("--max-mb", type=float, default=MAX_BYTES / 2 ** 20, help="batch size bound in MB")
+    parser.add_argument("--max-files", type=int, default=MAX_FILES, help="batch file-count bound")
+    parser.add_argument("--max-backoff", type=float, default=MAX_BACKOFF,
+                        help="longest pause after failed batches, in seconds")
+    parser.add_argument("--once", action="store_true", help="load the files present now and exit")
+    args = parser.parse_args(argv)
+
+    batcher = MicroBatchLoader(interval=args.interval, max_wait=args.max_wait,
+                               max_bytes=int(args.max_mb * 2 ** 20), max_files=args.max_files,
+                               max_backoff=args.max_backoff)
+    print(f"Watching {load.PROCESSED} every {args.interval:g}s (Ctrl-C to stop)" if not args.once
+          else f"Loading the staging files in {load.PROCESSED}")
+    try:
+        return batcher.run(once=args.once)
+    except KeyboardInterrupt:
+        print(f"Stopped after {batcher.batches} micro-batches; {len(batcher.queue)} files still queued")
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_entry_point(main, 'microbatch'))
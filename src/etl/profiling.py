@@ -0,0 +1,121 @@
+"""
+Opt-in profiling for pipeline entry points.
+
+Set EVDW_PROFILE (or pass --profile[=MODES] to any entry point) to wrap the run
+in cProfile and/or tracemalloc. MODES is a comma-separated list of `cpu` and
+`mem`; a bare flag or EVDW_PROFILE=1 enables both. Profiles are written to
+logs/profiles/<entry point>_<run id>.prof and .snapshot, and the hottest
+functions and allocation sites are summarized in the log.
+
+    python src/etl/transform.py --profile=cpu
+    EVDW_PROFILE=mem python src/etl/load.py
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from etl.metrics import run_id
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = Path(os.getenv("EVDW_PROFILE_DIR", "logs/profiles"))
+ALL_MODES = ("cpu", "mem")
+TOP_N = 15
+TRACEMALLOC_FRAMES = 10
+
+
+def parse_modes(value):
+    """Turn '1', 'all', 'cpu', 'cpu,mem' ... into a set of profiling modes."""
+    if value is None:
+        return set()
+    value = value.strip().lower()
+    if value in ("", "0", "false", "no", "off"):
+        return set()
+    if value in ("1", "true", "yes", "on", "all"):
+        return set(ALL_MODES)
+    modes = {m.strip() for m in value.split(",") if m.strip()}
+    unknown = modes - set(ALL_MODES)
+    if unknown:
+        raise ValueError(f"Unknown profiling modes: {sorted(unknown)} (expected {ALL_MODES})")
+    return modes
+
+
+def pop_profile_flag(argv):
+    """
+    Remove --profile / --profile=MODES from argv in place so the entry point's
+    own argument parsing never sees it. Returns the requested modes or None.
+    """
+    for i, arg in enumerate(argv[1:], start=1):
+        if arg == "--profile":
+            del argv[i]
+            return set(ALL_MODES)
+        if arg.startswith("--profile="):
+            del argv[i]
+            return parse_modes(arg.split("=", 1)[1])
+    return None
+
+
+def _log_cpu_summary(profiler, name):
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats("cumulative").print_stats(TOP_N)
+    logger.info(f"[{name}] top {TOP_N} functions by cumulative time:\n{out.getvalue()}")
+
+
+def _log_mem_summary(snapshot, name):
+    stats = snapshot.statistics("lineno")
+    lines = [f"  {stat.size / 1024:10.1f} KiB in {stat.count:>8} blocks  {stat.traceback[0]}"
+             for stat in stats[:TOP_N]]
+    current, peak = tracemalloc.get_traced_memory()
+    logger.info(f"[{name}] traced memory current={current / 1024**2:.1f} MiB "
+                f"peak={peak / 1024**2:.1f} MiB; top {TOP_N} allocation sites:\n" + "\n".join(lines))
+
+
+def run_profiled(func, name, modes, *args, **kwargs):
+    """Call func(*args, **kwargs) under the requested profilers and return its result."""
+    if not modes:
+        return func(*args, **kwargs)
+
+    if not logging.getLogger().handlers:
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    stem = PROFILE_DIR / f"{name}_{run_id()}"
+
+    profiler = cProfile.Profile() if "cpu" in modes else None
+    if "mem" in modes:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    if profiler:
+        profiler.enable()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(f"{stem}.prof")
+            logger.info(f"[{name}] CPU profile written to {stem}.prof")
+            _log_cpu_summary(profiler, name)
+        if "mem" in modes:
+            snapshot = tracemalloc.take_snapshot()
+            snapshot.dump(f"{stem}.snapshot")
+            logger.info(f"[{name}] allocation snapshot written to {stem}.snapshot")
+            _log_mem_summary(snapshot, name)
+            tracemalloc.stop()
+
+
+def run_entry_point(main, name, argv=None):
+    """
+    Run an entry point's main() honoring --profile and EVDW_PROFILE.
+    The CLI flag wins over the environment variable.
+    """
+    argv = sys.argv if argv is None else argv
+    modes = pop_profile_flag(argv)
+    if modes is None:
+        modes = parse_modes(os.getenv("EVDW_PROFILE"))
+    return run_profiled(main, name, modes)
@@ -0,0 +1,175 @@
+"""
+Incrementally maintained rollups of FACT_CHARGING_SESSIONS.
+
+Each rollup pre-aggregates the additive session measures at one set of
+dimensions and one time grain (tables in sql/ddl/create_rollups.sql). A
+refresh aggregates only facts loaded since the `rollups` watermark and MERGEs
+them into the existing rows by adding the measures, then advances the
+watermark, all in one transaction.
+
+rollup_query() routes a dashboard aggregate to the smallest rollup that can
+answer it, re-aggregating to the requested grain, and falls back to the fact
+table when no rollup covers the requested dimensions.
+
+    python src/etl/rollups.py
+"""
+
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from database.snowflake_connector import get_connection
+from database.watermarks import get_watermark, record_load, set_watermark
+from etl.metrics import stage
+from etl.profiling import run_entry_point
+
+FACT_TABLE = "ANALYTICS.FACT_CHARGING_SESSIONS"
+WATERMARK = "rollups"
+EPOCH = "1970-01-01 00:00:00"
+
+# Time grains from finest to coarsest; a rollup can answer any coarser grain
+GRAINS = ("hour", "day", "month")
+
+Rollup = namedtuple("Rollup", ["name", "table", "dimensions", "grain"])
+
+ROLLUPS = [
+    Rollup("station_hour", "ANALYTICS.AGG_STATION_HOUR", ("station_id", "city_id", "charger_type"), "hour"),
+    Rollup("city_day", "ANALYTICS.AGG_CITY_DAY", ("city_id",), "day"),
+    Rollup("vehicle_month", "ANALYTICS.AGG_VEHICLE_MONTH", ("vehicle_id",), "month"),
+]
+
+# City for sessions the city index could not resolve
+UNKNOWN_CITY_ID = -1
+
+# How each dimension and measure is derived from the facts. City and charger
+# come from the session itself: the Kaggle station IDs never match the NREL
+# station IDs in DIM_STATION.
+DIMENSION_SOURCES = {
+    "station_id": "f.station_id",
+    "city_id": f"COALESCE(f.city_id, {UNKNOWN_CITY_ID})",
+    "charger_type": "COALESCE(f.charger_type, 'Unknown')",
+    "vehicle_id": "f.vehicle_id",
+}
+MEASURE_SOURCES = {
+    "sessions": "COUNT(*)",
+    "energy_kwh": "COALESCE(SUM(f.energy_consumed_kwh), 0)",
+    "cost_usd": "COALESCE(SUM(f.charging_cost_usd), 0)",
+    "duration_hours": "COALESCE(SUM(f.duration_hours), 0)",
+}
+MEASURES = tuple(MEASURE_SOURCES)
+
+
+def merge_sql(rollup):
+    """MERGE adding facts loaded in (%(since)s, %(until)s] into the rollup."""
+    keys = list(rollup.dimensions) + ["period_start"]
+    select = [f"{DIMENSION_SOURCES[d]} AS {d}" for d in rollup.dimensions]
+    select.append(f"DATE_TRUNC('{rollup.grain}', f.start_timestamp)::TIMESTAMP_NTZ AS period_start")
+    select += [f"{MEASURE_SOURCES[m]} AS {m}" for m in MEASURES]
+    columns = keys + list(MEASURES)
+    return f"""
+MERGE INTO {rollup.table} t
+USING (
+    SELECT {", ".join(select)}
+    FROM {FACT_TABLE} f
+    WHERE f.loaded_at > %(since)s AND f.loaded_at <= %(until)s
+    GROUP BY ALL
+) n
+ON {" AND ".join(f"t.{k} = n.{k}" for k in keys)}
+WHEN MATCHED THEN UPDATE SET {", ".join(f"t.{m} = t.{m} + n.{m}" for m in MEASURES)}
+WHEN NOT MATCHED THEN INSERT ({", ".join(columns)}) VALUES ({", ".join(f"n.{c}" for c in columns)})
+"""
+
+
+def refresh_rollups(conn):
+    """Merge facts loaded since the last refresh into every rollup. Returns the new watermark."""
+    cs = conn.cursor()
+    try:
+        since = get_watermark(cs, WATERMARK)
+        cs.execute(f"SELECT MAX(loaded_at) FROM {FACT_TABLE}")
+        # Bounding the window keeps facts landing mid-refresh for the next run
+        until = cs.fetchone()[0]
+        if until is None or (since is not None and until <= since):
+            print("Rollups are up to date")
+            return since
+        since = since or EPOCH
+
+        cs.execute("BEGIN")
+        for rollup in ROLLUPS:
+            with stage("rollup_merge", rollup=rollup.name) as m:
+                cs.execute(merge_sql(rollup), {"since": since, "until": until})
+                m.rows_out = cs.rowcount or 0
+            print(f"{rollup.table}: {m.rows_out} rows merged")
+        set_watermark(cs, WATERMARK, until)
+        record_load(cs, [rollup.table for rollup in ROLLUPS])
+        conn.commit()
+        return until
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cs.close()
+
+
+def choose_rollup(dimensions, grain=None):
+    """
+    Smallest rollup holding every requested dimension at the requested grain
+    or finer (grain None aggregates over all time). None if only the fact
+    table can answer.
+    """
+    wanted = GRAINS.index(grain) if grain else len(GRAINS)
+    candidates = [r for r in ROLLUPS
+                  if set(dimensions) <= set(r.dimensions) and GRAINS.index(r.grain) <= wanted]
+    # Coarser grain and fewer dimensions mean fewer rows to scan
+    return min(candidates, key=lambda r: (-GRAINS.index(r.grain), len(r.dimensions)), default=None)
+
+
+def rollup_query(dimensions, grain=None, measures=MEASURES, filters=None):
+    """
+    Build (sql, params) aggregating measures by dimensions (and period_start at
+    grain), served from the smallest rollup that can answer it. filters maps
+    dimensions to required values.
+    """
+    filters = filters or {}
+    needed = list(dimensions) + [d for d in filters if d not in dimensions]
+    unknown = set(needed) - set(DIMENSION_SOURCES)
+    if unknown or set(measures) - set(MEASURES):
+        raise ValueError(f"Unknown dimensions or measures: {sorted(unknown | (set(measures) - set(MEASURES)))}")
+
+    rollup = choose_rollup(needed, grain)
+    if rollup:
+        source = f"{rollup.table} r"
+        dims = {d: f"r.{d}" for d in needed}
+        time_column = "r.period_start"
+        aggregates = [f"SUM(r.{m}) AS {m}" for m in measures]
+    else:
+        source = f"{FACT_TABLE} f"
+        dims = {d: DIMENSION_SOURCES[d] for d in needed}
+        time_column = "f.start_timestamp"
+        aggregates = [f"{MEASURE_SOURCES[m]} AS {m}" for m in measures]
+
+    select = [f"{dims[d]} AS {d}" for d in dimensions]
+    if grain:
+        select.append(f"DATE_TRUNC('{grain}', {time_column})::TIMESTAMP_NTZ AS period_start")
+    sql = f"SELECT {', '.join(select + aggregates)}\nFROM {source}"
+    if filters:
+        sql += "\nWHERE " + " AND ".join(f"{dims[d]} = %({d})s" for d in filters)
+    if select:
+        sql += "\nGROUP BY ALL\nORDER BY " + ", ".join(str(i + 1) for i in range(len(select)))
+    return sql, dict(filters)
+
+
+def main():
+    conn = get_connection()
+    try:
+        cs = conn.cursor()
+        cs.execute("USE DATABASE EV_CHARGING_DW")
+        cs.execute("USE WAREHOUSE EV_DEV_WH")
+        cs.close()
+        refresh_rollups(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    run_entry_point(main, "rollups")
@@ -0,0 +1,130 @@
+"""
+Snapshot diffing for the NREL station dimension (SCD Type 2).
+
+Every NREL extract is a full dump. Instead of reloading it, each transformed
+snapshot is compared with the previous one by station id using a hash-diff of
+the tracked columns, and only the changes are written out:
+
+    insert  station id not seen before
+    update  tracked columns changed since the previous snapshot
+    close   station id missing from the current snapshot
+
+The previous snapshot is kept as a small id -> row_hash index under data/state.
+A diff writes the next index beside it; load.py promotes it with
+commit_snapshot() once the changes are merged into DIM_STATION, so a failed
+load is diffed again on the next run.
+"""
+
+import csv
+import hashlib
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from etl.metrics import stage
+
+STATE_DIR = Path("data/state")
+SNAPSHOT_INDEX = STATE_DIR / "nrel_station_hashes.csv"
+
+KEY_FIELD = "station_id"
+TRACKED_FIELDS = [
+    "station_name", "street_address", "city", "state", "zip", "country",
+    "latitude", "longitude", "ev_connector_types", "access_days_time", "station_type"
+]
+CHANGE_FIELDS = ["change_type", KEY_FIELD] + TRACKED_FIELDS + ["row_hash", "effective_from"]
+
+
+def row_hash(row, fields=TRACKED_FIELDS):
+    """Hash-diff of the tracked columns of a station row."""
+    return hashlib.md5("\x1f".join(row.get(f) or "" for f in fields).encode("utf-8")).hexdigest()
+
+
+def snapshot_time(raw_path):
+    """Extraction time embedded in a raw file name (prefix_YYYYmmdd_HHMMSS.*), else now."""
+    stamp = "_".join(Path(raw_path).name.split(".")[0].split("_")[-2:])
+    try:
+        return datetime.strptime(stamp, "%Y%m%d_%H%M%S")
+    except ValueError:
+        return datetime.now().replace(microsecond=0)
+
+
+def pending_index(index_path):
+    index_path = Path(index_path)
+    return index_path.with_name(f"{index_path.stem}.next{index_path.suffix}")
+
+
+def load_index(index_path):
+    """Read an id -> row_hash index; an empty dict when there is no previous snapshot."""
+    if not Path(index_path).exists():
+        return {}
+    with open(index_path, newline='', encoding='utf-8') as f:
+        return {row[KEY_FIELD]: row["row_hash"] for row in csv.DictReader(f)}
+
+
+def diff_snapshot(rows, previous):
+    """
+    Yield (change_type, row, row_hash) for station rows against the previous
+    id -> row_hash index; unchanged stations come through as "unchanged".
+    Closures carry only the station id. `previous` is consumed: ids still left
+    in it at the end are the closed stations.
+    """
+    seen = set()
+    for row in rows:
+        station_id = row[KEY_FIELD]
+        if station_id in seen:
+            # NREL occasionally repeats a station across state queries
+            continue
+        seen.add(station_id)
+        h = row_hash(row)
+        old = previous.pop(station_id, None)
+        if old is None:
+            yield "insert", row, h
+        else:
+            yield ("update" if old != h else "unchanged"), row, h
+    for station_id, h in previous.items():
+        yield "close", {KEY_FIELD: station_id}, h
+
+
+def write_station_changes(current_csv, changes_csv, index_path=SNAPSHOT_INDEX, effective_from=None):
+    """
+    Diff a transformed NREL snapshot against the last committed one, write the
+    changes to changes_csv and the next index beside index_path.
+    Returns {change_type: count}.
+    """
+    effective_from = (effective_from or datetime.now().replace(microsecond=0)).isoformat()
+    counts = {"insert": 0, "update": 0, "close": 0, "unchanged": 0}
+    next_index = pending_index(index_path)
+    next_index.parent.mkdir(parents=True, exist_ok=True)
+
+    with stage("diff_nrel_stations") as m, \
+            open(current_csv, newline='', encoding='utf-8') as infile, \
+            open(changes_csv, 'w', newline='', encoding='utf-8') as changes_file, \
+            open(next_index, 'w', newline='', encoding='utf-8') as index_file:
+        m.add_file_read(current_csv)
+        changes = csv.DictWriter(changes_file, fieldnames=CHANGE_FIELDS, extrasaction="ignore")
+        changes.writeheader()
+        index = csv.writer(index_file)
+        index.writerow([KEY_FIELD, "row_hash"])
+
+        for change_type, row, h in diff_snapshot(csv.DictReader(infile), load_index(index_path)):
+            counts[change_type] += 1
+            if change_type != "close":
+                index.writerow([row[KEY_FIELD], h])
+            if change_type != "unchanged":
+                changes.writerow({**row, "change_type": change_type, "row_hash": h,
+                                  "effective_from": effective_from})
+        m.rows_in = counts["insert"] + counts["update"] + counts["unchanged"]
+        m.rows_out = counts["insert"] + counts["update"] + counts["close"]
+        m.extra.update(counts)
+        changes_file.flush()
+        m.add_file_written(changes_csv)
+    return counts
+
+
+def commit_snapshot(index_path=SNAPSHOT_INDEX):
+    """Make the last diffed snapshot the baseline for the next diff."""
+    next_index = pending_index(index_path)
+    if next_index.exists():
+        os.replace(next_index, index_path)
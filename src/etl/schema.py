@@ -0,0 +1,265 @@
+"""
+Typed schema contracts for the staging CSVs.
+
+Each contract lists a staging file's columns with a type, the number of
+decimal places kept, and whether nulls are allowed. ContractWriter applies a
+contract to rows as they are written:
+
+    string     passed through; '' is written as empty
+    integer    parsed as a decimal number and rounded (half to even) to a whole
+               number; values outside int64 are rejected
+    decimal    parsed as a decimal number and rounded (half to even) to `scale`
+               places
+    timestamp  parsed as ISO 8601 and written as YYYY-MM-DDTHH:MM:SS
+
+A column's `source` names the raw field it is read from when that differs
+from the column name (NREL's `id` becomes `station_id`); DERIVED marks a
+column the transform computes, such as city_id. source_fields() lists the raw
+fields a contract reads, which the extractors use to drop the rest at ingest.
+
+Values that do not parse are written as empty and counted as rejected values.
+A row whose non-nullable column ends up empty is dropped and counted as a
+rejected row.
+
+Numbers are rounded from their decimal text, never through a float, so
+"2.675" at scale 2 is 2.68 on both paths. With pyarrow installed, rows are
+conformed in batches with vectorized pyarrow.compute casts. A column that fails
+the vectorized cast is redone value by value with the same rules the
+pure-Python fallback uses, so both paths produce the same values.
+"""
+
+import csv
+from collections import Counter, namedtuple
+from datetime import datetime
+from decimal import ROUND_HALF_EVEN, Decimal, InvalidOperation
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = pc = pacsv = None
+
+Column = namedtuple("Column", ["name", "type", "scale", "nullable", "source"], defaults=(None, True, None))
+
+# `source` of a column computed by the transform rather than read
+DERIVED = ""
+# Total digits of a decimal column, as in Snowflake's NUMBER(18, scale)
+DECIMAL_PRECISION = 18
+# Scale numbers are parsed at before rounding; longer fractions take the per-value path
+PARSE_SCALE = 20
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+BATCH_ROWS = 50_000
+
+SESSION_CONTRACT = [
+    Column("User ID", "string", nullable=False),
+    Column("Vehicle Model", "string"),
+    Column("Battery Capacity (kWh)", "decimal", 2),
+    Column("Charging Station ID", "string", nullable=False),
+    Column("Charging Station Location", "string"),
+    Column("Charging Start Time", "timestamp", nullable=False),
+    Column("Charging End Time", "timestamp", nullable=False),
+    Column("Energy Consumed (kWh)", "decimal", 3),
+    Column("Charging Duration (hours)", "decimal", 4),
+    Column("Charging Rate (kW)", "decimal", 2),
+    Column("Charging Cost (USD)", "decimal", 2),
+    Column("Time of Day", "string"),
+    Column("Day of Week", "string"),
+    Column("State of Charge (Start %)", "decimal", 1),
+    Column("State of Charge (End %)", "decimal", 1),
+    Column("Distance Driven (since last charge) (km)", "decimal", 2),
+    Column("Temperature (°C)", "decimal", 1),
+    Column("Vehicle Age (years)", "decimal", 1),
+    Column("Charger Type", "string"),
+    Column("User Type", "string"),
+    # Canonical city of Charging Station Location (etl/cities.py)
+    Column("city_id", "integer", source=DERIVED),
+]
+
+NREL_CONTRACT = [
+    Column("station_id", "integer", nullable=False, source="id"),
+    Column("station_name", "string"),
+    Column("street_address", "string"),
+    Column("city", "string"),
+    Column("state", "string"),
+    Column("zip", "string"),
+    Column("country", "string"),
+    Column("latitude", "decimal", 6),
+    Column("longitude", "decimal", 6),
+    Column("ev_connector_types", "string"),
+    Column("access_days_time", "string"),
+    Column("station_type", "string"),
+    Column("city_id", "integer", source=DERIVED),
+]
+
+WEATHER_CONTRACT = [
+    Column("extraction_timestamp", "timestamp", nullable=False),
+    Column("city", "string", nullable=False),
+    Column("weather_main", "string"),
+    Column("weather_description", "string"),
+    Column("temp_celsius", "decimal", 1),
+    Column("humidity", "integer"),
+    Column("wind_speed", "decimal", 2),
+    Column("city_id", "integer", source=DERIVED),
+]
+
+
+def field_names(contract):
+    return [column.name for column in contract]
+
+
+def source_fields(contract):
+    """Raw record fields a contract is read from."""
+    return [column.source or column.name for column in contract if column.source != DERIVED]
+
+
+def project(record, fields):
+    """Keep only `fields` of a raw record."""
+    return {field: record[field] for field in fields if field in record}
+
+
+def convert_value(value, column):
+    """Conform one value; returns None when it is empty or does not parse."""
+    if value is None or value == "":
+        return None
+    if column.type == "string":
+        return str(value)
+    try:
+        if column.type == "timestamp":
+            return datetime.fromisoformat(str(value)).strftime(TIMESTAMP_FORMAT)
+        number = Decimal(str(value))
+        if not number.is_finite():
+            return None
+        if column.type == "integer":
+            number = int(number.quantize(Decimal(1), rounding=ROUND_HALF_EVEN))
+            return number if INT64_MIN <= number <= INT64_MAX else None
+        number = number.quantize(Decimal(1).scaleb(-column.scale), rounding=ROUND_HALF_EVEN)
+        if abs(number) >= 10 ** (DECIMAL_PRECISION - column.scale):
+            return None
+        # Decimal keeps -0.00; Arrow decimals have no negative zero
+        return number.copy_abs() if number.is_zero() else number
+    except (ValueError, InvalidOperation):
+        return None
+
+
+def _arrow_type(column):
+    if column.type == "integer":
+        return pa.int64()
+    if column.type == "decimal":
+        return pa.decimal128(DECIMAL_PRECISION, column.scale)
+    return pa.string()
+
+
+def _vector_cast(arr, column):
+    if column.type == "timestamp":
+        # Parse at microsecond precision, then drop the fraction like strftime does
+        seconds = pc.cast(pc.cast(arr, pa.timestamp("us")), pa.timestamp("s"), safe=False)
+        return pc.strftime(seconds, format=TIMESTAMP_FORMAT)
+    # Exact decimals, not floats, so rounding matches Decimal.quantize
+    numbers = pc.cast(arr, pa.decimal128(38, PARSE_SCALE))
+    scale = 0 if column.type == "integer" else column.scale
+    return pc.cast(pc.round(numbers, scale, round_mode="half_to_even"), _arrow_type(column))
+
+
+def conform_array(values, column):
+    """Conform a column of raw values; returns (pyarrow array, rejected value count)."""
+    raw = [None if v is None or v == "" else str(v) for v in values]
+    arr = pa.array(raw, pa.string())
+    if column.type == "string":
+        return arr, 0
+    try:
+        converted = _vector_cast(arr, column)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        converted = pa.array([convert_value(v, column) for v in raw], _arrow_type(column))
+    return converted, converted.null_count - arr.null_count
+
+
+class ContractWriter:
+    """CSV writer that conforms rows to a schema contract; tracks rejects."""
+
+    def __init__(self, path, contract, batch_rows=BATCH_ROWS):
+        self.path = path
+        self.contract = contract
+        self.fieldnames = field_names(contract)
+        self.batch_rows = batch_rows
+        self.rows_written = 0
+        self.rows_rejected = 0
+        self.rejected_values = Counter()
+        self._batch = []
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        if pa is None:
+            self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+            self._writer.writeheader()
+        else:
+            self._writer = None
+            self._schema = pa.schema([(c.name, _arrow_type(c)) for c in contract])
+            csv.writer(self._file).writerow(self.fieldnames)
+
+    def write(self, row):
+        if pa is None:
+            self._write_row(row)
+            return
+        self._batch.append(row)
+        if len(self._batch) >= self.batch_rows:
+            self._flush()
+
+    def write_many(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def _write_row(self, row):
+        out = {}
+        for column in self.contract:
+            raw = row.get(column.name)
+            value = convert_value(raw, column)
+            if value is None and raw not in (None, ""):
+                self.rejected_values[column.name] += 1
+            if value is None and not column.nullable:
+                self.rows_rejected += 1
+                return
+            out[column.name] = value
+        self._writer.writerow(out)
+        self.rows_written += 1
+
+    def _flush(self):
+        if not self._batch:
+            return
+        arrays = []
+        keep = None
+        for column in self.contract:
+            arr, rejected = conform_array([row.get(column.name) for row in self._batch], column)
+            if rejected:
+                self.rejected_values[column.name] += rejected
+            if not column.nullable and arr.null_count:
+                valid = pc.is_valid(arr)
+                keep = valid if keep is None else pc.and_(keep, valid)
+            arrays.append(arr)
+        table = pa.Table.from_arrays(arrays, schema=self._schema)
+        if keep is not None:
+            table = table.filter(keep)
+            self.rows_rejected += len(self._batch) - table.num_rows
+        self._batch = []
+        if table.num_rows:
+            self._file.flush()
+            pacsv.write_csv(table, self._file.buffer,
+                            pacsv.WriteOptions(include_header=False, quoting_style="needed"))
+            self.rows_written += table.num_rows
+
+    def close(self):
+        if self._file.closed:
+            return
+        if pa is not None:
+            self._flush()
+        self._file.close()
+
+    def record(self, metrics):
+        """Copy reject counts onto a stage's metrics."""
+        metrics.extra["rejected_rows"] = self.rows_rejected
+        metrics.extra["rejected_values"] = sum(self.rejected_values.values())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
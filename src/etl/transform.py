@@ -1,114 +1,416 @@
+import argparse
 import csv
-import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+from data_sources.json_codec import iter_raw_records
+from data_sources.raw_store import RawStore
+from etl.cities import CityIndex, build_city_index, with_city_ids
+from etl.csv_reader import iter_csv_rows
+from etl.dedup import KeyDeduplicator, SESSION_KEY, dedup_csv, dedup_rows, expected_keys, open_quarantine
+from etl.facts import build_fact_sessions
+from etl.keys import KeyRegistries
+from etl.ledger import Ledger
+from etl.metrics import read_run_records, run_id, stage, write_openmetrics
+from etl.profiling import run_entry_point
+from etl.schema import (
+    NREL_CONTRACT, SESSION_CONTRACT, WEATHER_CONTRACT, ContractWriter, field_names,
+)
+from etl.scd import snapshot_time, write_station_changes
 
 RAW_DIR = Path("data/raw")
 PROCESSED_DIR = Path("data/processed")
-PROCESSED_DIR.mkdir(exist_ok=True)
-
-def transform_ev_sessions(raw_csv, output_csv):
-    """Normalize EV sessions CSV for staging."""
-    with open(raw_csv, newline='') as infile, open(output_csv, 'w', newline='') as outfile:
-        reader = csv.DictReader(infile)
-        fieldnames = [
-            "User ID", "Vehicle Model", "Battery Capacity (kWh)",
-            "Charging Station ID", "Charging Station Location",
-            "Charging Start Time", "Charging End Time",
-            "Energy Consumed (kWh)", "Charging Duration (hours)",
-            "Charging Rate (kW)", "Charging Cost (USD)",
-            "Time of Day", "Day of Week",
-            "State of Charge (Start %)", "State of Charge (End %)",
-            "Distance Driven (since last charge) (km)",
-            "Temperature (°C)", "Vehicle Age (years)",
-            "Charger Type", "User Type"
-        ]
-        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in reader:
-            # Ensure timestamps are ISO format
-            row["Charging Start Time"] = datetime.fromisoformat(row["Charging Start Time"]).isoformat()
-            row["Charging End Time"]   = datetime.fromisoformat(row["Charging End Time"]).isoformat()
-            writer.writerow({k: row.get(k, "") for k in fieldnames})
-
-def transform_nrel_stations(raw_json, output_csv):
-    """Extract station fields from NREL JSON for staging."""
-    with open(raw_json) as f, open(output_csv, 'w', newline='') as outfile:
-        data = json.load(f)["fuel_stations"]
-        fieldnames = [
-            "station_id", "station_name", "street_address", "city", "state",
-            "zip", "country", "latitude", "longitude", "ev_connector_types",
-            "access_days_time", "station_type"
-        ]
-        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for rec in data:
-            connectors = rec.get("ev_connector_types")
-            connector_str = "|".join(connectors) if isinstance(connectors, list) else ""
-            writer.writerow({
-                "station_id": rec.get("id"),
-                "station_name": rec.get("station_name"),
-                "street_address": rec.get("street_address"),
-                "city": rec.get("city"),
-                "state": rec.get("state"),
-                "zip": rec.get("zip"),
-                "country": rec.get("country"),
-                "latitude": rec.get("latitude"),
-                "longitude": rec.get("longitude"),
-                "ev_connector_types": connector_str,
-                "access_days_time": rec.get("access_days_time"),
-                "station_type": rec.get("station_type")
-            })
-
-def transform_weather(raw_json, output_csv):
-    """Extract weather fields from OpenWeatherMap JSON for staging."""
-    with open(raw_json) as f, open(output_csv, 'w', newline='') as outfile:
-        records = json.load(f)["weather_data"]
-        fieldnames = [
-            "extraction_timestamp", "city", "weather_main",
-            "weather_description", "temp_celsius", "humidity", "wind_speed"
+QUARANTINE_DIR = Path("data/quarantine")
+
+SESSION_FIELDS = field_names(SESSION_CONTRACT)
+NREL_FIELDS = field_names(NREL_CONTRACT)
+WEATHER_FIELDS = field_names(WEATHER_CONTRACT)
+
+
+def _normalize_session(row):
+    # Ensure timestamps are ISO format
+    row["Charging Start Time"] = datetime.fromisoformat(row["Charging Start Time"]).isoformat()
+    row["Charging End Time"]   = datetime.fromisoformat(row["Charging End Time"]).isoformat()
+    return {k: row.get(k, "") for k in SESSION_FIELDS}
+
+
+def _write_sessions(rows, output_csv, metrics):
+    """Write already-normalized session rows through the schema contract; returns rows written."""
+    with ContractWriter(output_csv, SESSION_CONTRACT) as writer:
+        writer.write_many(rows)
+    writer.record(metrics)
+    return writer.rows_written
+
+
+def _normalized_sessions(rows, counter, cities=None):
+    def normalized():
+        for row in rows:
+            counter.rows_in += 1
+            yield _normalize_session(row)
+    return with_city_ids(normalized(), cities or CityIndex.load(), "Charging Station Location")
+
+
+def transform_ev_sessions(raw_csv, output_csv, dedup=True, quarantine_csv=None, cities=None):
+    """
+    Normalize EV sessions CSV for staging, with the canonical city_id of each
+    session's location (cities defaults to the cached CityIndex).
+
+    With dedup, repeats of a User ID + Charging Start Time pair are dropped, or
+    written to quarantine_csv when one is given, so session_id stays unique.
+    """
+    with stage("transform_ev_sessions") as m:
+        m.add_file_read(raw_csv)
+        rows = _normalized_sessions(iter_csv_rows(raw_csv), m, cities)
+        if not dedup:
+            m.rows_out = _write_sessions(rows, output_csv, m)
+        else:
+            quarantine_file = on_duplicate = None
+            if quarantine_csv:
+                quarantine_file, quarantine_writer = open_quarantine(quarantine_csv, SESSION_FIELDS)
+                on_duplicate = quarantine_writer.writerow
+            try:
+                with KeyDeduplicator(expected_keys=expected_keys([raw_csv])) as deduplicator:
+                    m.rows_out = _write_sessions(dedup_rows(rows, deduplicator, SESSION_KEY, on_duplicate),
+                                                 output_csv, m)
+                    m.extra["duplicates"] = deduplicator.duplicates
+            finally:
+                if quarantine_file is not None:
+                    quarantine_file.close()
+        m.add_file_written(output_csv)
+        return m.rows_out
+
+
+def session_byte_ranges(raw_csv, shards):
+    """
+    Split the body of a sessions CSV into at most `shards` byte ranges.
+
+    Every range starts right after a newline, so each one can be parsed on its
+    own. The session export has no quoted multi-line fields, which is what makes
+    splitting on raw newlines safe.
+    """
+    size = os.path.getsize(raw_csv)
+    with open(raw_csv, 'rb') as f:
+        f.readline()  # header
+        body_start = f.tell()
+        step = max((size - body_start) // max(shards, 1), 1)
+        bounds = [body_start]
+        while bounds[-1] < size and len(bounds) < shards:
+            f.seek(bounds[-1] + step)
+            f.readline()
+            if f.tell() >= size:
+                break
+            bounds.append(f.tell())
+        bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _iter_lines(raw_csv, start, end):
+    with open(raw_csv, 'rb') as f:
+        f.seek(start)
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield line.decode('utf-8')
+
+
+def transform_ev_sessions_shard(raw_csv, output_csv, start, end):
+    """Normalize the sessions found in bytes [start, end) of raw_csv."""
+    with open(raw_csv, newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f))
+    with stage("transform_ev_sessions_shard", shard=Path(output_csv).name) as m:
+        reader = csv.DictReader(_iter_lines(raw_csv, start, end), fieldnames=header)
+        m.bytes_read = end - start
+        m.rows_out = _write_sessions(_normalized_sessions(reader, m), output_csv, m)
+        m.add_file_written(output_csv)
+        return m.rows_out
+
+
+def concat_csv_shards(shard_paths, output_csv):
+    """Concatenate shard CSVs into output_csv, keeping only the first header."""
+    with open(output_csv, 'wb') as out:
+        for i, shard in enumerate(shard_paths):
+            with open(shard, 'rb') as f:
+                header = f.readline()
+                if i == 0:
+                    out.write(header)
+                shutil.copyfileobj(f, out)
+
+
+def transform_nrel_stations(raw_json, output_csv, cities=None):
+    """Extract station fields from a raw NREL extract (NDJSON or legacy JSON) for staging."""
+    def rows(m):
+        for rec in iter_raw_records(raw_json, "fuel_stations"):
+            m.rows_in += 1
+            row = {column.name: rec.get(column.source or column.name) for column in NREL_CONTRACT}
+            connectors = row["ev_connector_types"]
+            row["ev_connector_types"] = "|".join(connectors) if isinstance(connectors, list) else ""
+            yield row
+
+    with stage("transform_nrel_stations") as m, ContractWriter(output_csv, NREL_CONTRACT) as writer:
+        m.add_file_read(raw_json)
+        writer.write_many(with_city_ids(rows(m), cities or CityIndex.load(), "city", "state"))
+        writer.close()
+        writer.record(m)
+        m.rows_out = writer.rows_written
+        m.add_file_written(output_csv)
+    return m.rows_out
+
+def _weather_row(rec):
+    # Only the first entry of the weather list is kept
+    weather_main = ""
+    weather_desc = ""
+    for weather_item in rec.get("weather", []):
+        if isinstance(weather_item, dict):
+            weather_main = weather_item.get("main", "")
+            weather_desc = weather_item.get("description", "")
+            break
+
+    main = rec.get("main") or {}
+    wind = rec.get("wind") or {}
+    return {
+        "extraction_timestamp": rec.get("extraction_timestamp", ""),
+        "city": rec.get("name", ""),
+        "weather_main": weather_main,
+        "weather_description": weather_desc,
+        "temp_celsius": main.get("temp", ""),
+        "humidity": main.get("humidity", ""),
+        "wind_speed": wind.get("speed", "")
+    }
+
+def transform_weather(raw_json, output_csv, cities=None):
+    """Extract weather fields from a raw OpenWeatherMap extract (NDJSON or legacy JSON) for staging."""
+    def rows(m):
+        for rec in iter_raw_records(raw_json, "weather_data"):
+            m.rows_in += 1
+            yield _weather_row(rec)
+
+    with stage("transform_weather") as m, ContractWriter(output_csv, WEATHER_CONTRACT) as writer:
+        m.add_file_read(raw_json)
+        writer.write_many(with_city_ids(rows(m), cities or CityIndex.load(), "city"))
+        writer.close()
+        writer.record(m)
+        m.rows_out = writer.rows_written
+        m.add_file_written(output_csv)
+    return m.rows_out
+
+
+def append_csv(batch_csv, output_csv):
+    """Append a CSV's data rows to output_csv, creating it with the header if missing."""
+    with open(batch_csv, 'rb') as f:
+        header = f.readline()
+        exists = Path(output_csv).exists()
+        with open(output_csv, 'ab') as out:
+            if not exists:
+                out.write(header)
+            shutil.copyfileobj(f, out)
+
+
+def increment_path(increment_csv, batch):
+    """Per-batch increment file, e.g. weather_increment_<batch>.csv."""
+    increment_csv = Path(increment_csv)
+    return increment_csv.with_name(f"{increment_csv.stem}_{batch}{increment_csv.suffix}")
+
+
+def transform_weather_incremental(output_csv, increment_csv, store=None, ledger=None, cities=None):
+    """
+    Transform every weather extract in the raw manifest that the ledger has not
+    seen, as one batch. Its rows are appended to output_csv (all weather rows so
+    far) and written to increment_path(increment_csv, batch), which load.py
+    removes once loaded. Returns (files, rows).
+
+    With no ledger history, output_csv is rebuilt from all extracts.
+    """
+    store = store or RawStore(RAW_DIR)
+    ledger = ledger or Ledger()
+    output_csv, increment_csv = Path(output_csv), Path(increment_csv)
+    rebuild = not ledger.has_entries("weather_data")
+    pending = ledger.pending("weather_data", store.files("weather_data"))
+    if not pending:
+        return 0, 0
+
+    batch = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    batch_csv = increment_csv.with_name(f"{increment_csv.stem}.batch{increment_csv.suffix}")
+    batch_increment = increment_path(increment_csv, batch)
+    records = {}
+
+    def rows(m):
+        for entry in pending:
+            raw_json = store.resolve(entry)
+            m.add_file_read(raw_json)
+            records[entry["path"]] = 0
+            for rec in iter_raw_records(raw_json, "weather_data"):
+                records[entry["path"]] += 1
+                yield _weather_row(rec)
+
+    with stage("transform_weather") as m, ContractWriter(batch_csv, WEATHER_CONTRACT) as writer:
+        writer.write_many(with_city_ids(rows(m), cities or CityIndex.load(), "city"))
+        writer.close()
+        writer.record(m)
+        m.rows_in = sum(records.values())
+        m.rows_out = writer.rows_written
+        m.extra["files"] = len(pending)
+
+        if rebuild and output_csv.exists():
+            output_csv.unlink()
+        size = output_csv.stat().st_size if output_csv.exists() else None
+        try:
+            append_csv(batch_csv, output_csv)
+            # The rename publishes the increment whole; the loader never sees it half-written
+            os.replace(batch_csv, batch_increment)
+            ledger.mark_transformed("weather_data", pending, batch, records)
+        except BaseException:
+            # Undo the batch so its files are retried cleanly next run
+            batch_increment.unlink(missing_ok=True)
+            if size is None:
+                output_csv.unlink(missing_ok=True)
+            elif output_csv.exists():
+                os.truncate(output_csv, size)
+            raise
+        finally:
+            batch_csv.unlink(missing_ok=True)
+        m.add_file_written(output_csv)
+    return len(pending), m.rows_out
+
+
+def latest_raw(prefix):
+    """Newest raw extract for a source, from the raw store's manifest."""
+    return RawStore(RAW_DIR).latest(prefix)
+
+
+def _report_weather(result, out_weather):
+    files, rows = result
+    if files:
+        print(f"Weather data transformed from {files} new extracts, {rows} rows appended to {out_weather}")
+    else:
+        print("Weather data: no new extracts since the last run")
+
+
+def run_serial(raw_csv, out_csv, raw_nrel, out_nrel, out_weather, weather_increment,
+               dedup=True, quarantine_csv=None):
+    rows = transform_ev_sessions(raw_csv, out_csv, dedup=dedup, quarantine_csv=quarantine_csv)
+    print(f"EV sessions transformed to {out_csv} ({rows} rows)")
+
+    rows = transform_nrel_stations(raw_nrel, out_nrel)
+    print(f"NREL stations transformed to {out_nrel} ({rows} rows)")
+
+    _report_weather(transform_weather_incremental(out_weather, weather_increment), out_weather)
+    return [out_csv]
+
+
+def run_parallel(raw_csv, out_csv, raw_nrel, out_nrel, out_weather, weather_increment,
+                 workers=None, keep_shards=False, dedup=True, quarantine_csv=None):
+    """
+    Run the three transforms in a process pool, sharding the sessions CSV by
+    byte range. Shards are concatenated into out_csv unless keep_shards is set,
+    in which case they are left next to it as <name>.partNNN.csv.
+
+    Duplicates can span shards, so de-duplication runs afterwards as one
+    streaming pass over the shards in file order. Returns the session files.
+    """
+    workers = workers or os.cpu_count() or 1
+    run_id()  # fix the run ID before forking so every worker reports under it
+    # Stations and weather take one worker each; sessions get the rest.
+    ranges = session_byte_ranges(raw_csv, max(workers - 2, 1))
+    out_csv = Path(out_csv)
+    shard_paths = [out_csv.with_name(f"{out_csv.stem}.part{i:03d}{out_csv.suffix}")
+                   for i in range(len(ranges))]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        session_jobs = [
+            pool.submit(transform_ev_sessions_shard, raw_csv, shard, start, end)
+            for shard, (start, end) in zip(shard_paths, ranges)
         ]
-        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for rec in records:
-            # Default values
-            weather_main = ""
-            weather_desc = ""
-            # Iterate through weather entries list
-            for weather_item in rec.get("weather", []):
-                if isinstance(weather_item, dict):
-                    weather_main = weather_item.get("main", "")
-                    weather_desc = weather_item.get("description", "")
-                    break  # Only need first entry
-
-            main = rec.get("main") or {}
-            wind = rec.get("wind") or {}
-
-            writer.writerow({
-                "extraction_timestamp": rec.get("extraction_timestamp", ""),
-                "city": rec.get("name", ""),
-                "weather_main": weather_main,
-                "weather_description": weather_desc,
-                "temp_celsius": main.get("temp", ""),
-                "humidity": main.get("humidity", ""),
-                "wind_speed": wind.get("speed", "")
-            })
+        nrel_job = pool.submit(transform_nrel_stations, raw_nrel, out_nrel)
+        weather_job = pool.submit(transform_weather_incremental, out_weather, weather_increment)
+
+        rows = sum(job.result() for job in session_jobs)
+        print(f"NREL stations transformed to {out_nrel} ({nrel_job.result()} rows)")
+        _report_weather(weather_job.result(), out_weather)
+
+    duplicates = 0
+    if dedup:
+        with stage("dedup_ev_sessions") as m:
+            targets = shard_paths if keep_shards else [out_csv]
+            rows, duplicates = dedup_csv(shard_paths, targets, SESSION_KEY, quarantine_csv=quarantine_csv,
+                                         expected_keys=expected_keys(shard_paths))
+            m.rows_out = rows
+            m.extra["duplicates"] = duplicates
+    elif not keep_shards:
+        concat_csv_shards(shard_paths, out_csv)
+
+    if keep_shards:
+        print(f"EV sessions transformed to {len(shard_paths)} shards ({rows} rows, "
+              f"{duplicates} duplicates removed) next to {out_csv}")
+    else:
+        for shard in shard_paths:
+            shard.unlink()
+        print(f"EV sessions transformed to {out_csv} ({rows} rows, {duplicates} duplicates removed, "
+              f"{len(shard_paths)} shards)")
+    # Workers each rendered only their own stages; publish the whole run
+    write_openmetrics(read_run_records())
+    return shard_paths if keep_shards else [out_csv]
+
+
+def main(argv=None):
+    """Transform the latest raw extracts into staging CSVs"""
+    parser = argparse.ArgumentParser(description="Transform raw sources into staging CSVs")
+    parser.add_argument("--parallel", action="store_true",
+                        help="run the transforms in a process pool")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="pool size for --parallel (default: CPU count)")
+    parser.add_argument("--keep-shards", action="store_true",
+                        help="keep per-shard session outputs instead of concatenating them")
+    parser.add_argument("--duplicates", choices=["quarantine", "drop", "keep"], default="quarantine",
+                        help="what to do with repeated User ID + Charging Start Time sessions")
+    args = parser.parse_args(argv)
+
+    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
 
-if __name__ == "__main__":
     # EV sessions
     raw_csv = RAW_DIR / "ev_charging_patterns.csv"
     out_csv = PROCESSED_DIR / "ev_sessions_transformed.csv"
-    transform_ev_sessions(raw_csv, out_csv)
-    print(f"EV sessions transformed to {out_csv}")
+    fact_csv = PROCESSED_DIR / "fact_charging_sessions.csv"
 
     # NREL stations
-    raw_nrel = sorted(RAW_DIR.glob("nrel_stations_*.json"))[-1]
+    raw_nrel = latest_raw("nrel_stations")
     out_nrel = PROCESSED_DIR / "nrel_stations_transformed.csv"
-    transform_nrel_stations(raw_nrel, out_nrel)
-    print(f"NREL stations transformed to {out_nrel}")
+    changes_nrel = PROCESSED_DIR / "nrel_station_changes.csv"
 
-    # Weather data
-    raw_weather = sorted(RAW_DIR.glob("weather_data_*.json"))[-1]
+    # Weather data: every extract not yet in the ledger
     out_weather = PROCESSED_DIR / "weather_transformed.csv"
-    transform_weather(raw_weather, out_weather)
-    print(f"Weather data transformed to {out_weather}")
+    weather_increment = PROCESSED_DIR / "weather_increment.csv"
+
+    dedup = args.duplicates != "keep"
+    quarantine_csv = QUARANTINE_DIR / "ev_sessions_duplicates.csv" if args.duplicates == "quarantine" else None
+
+    # City IDs shared by sessions, stations and weather; rebuilt per NREL snapshot
+    build_city_index(raw_nrel)
+
+    if args.parallel:
+        session_files = run_parallel(raw_csv, out_csv, raw_nrel, out_nrel, out_weather, weather_increment,
+                                     workers=args.workers, keep_shards=args.keep_shards,
+                                     dedup=dedup, quarantine_csv=quarantine_csv)
+    else:
+        session_files = run_serial(raw_csv, out_csv, raw_nrel, out_nrel, out_weather, weather_increment,
+                                   dedup=dedup, quarantine_csv=quarantine_csv)
+
+    # DIM_STATION is maintained from the changes since the last loaded snapshot
+    changes = write_station_changes(out_nrel, changes_nrel, effective_from=snapshot_time(raw_nrel))
+    print(f"NREL station changes written to {changes_nrel} ({changes['insert']} new, "
+          f"{changes['update']} changed, {changes['close']} closed)")
+
+    with KeyRegistries() as keys:
+        # With --keep-shards there is no combined sessions file; read the shards
+        rows = build_fact_sessions(session_files, fact_csv, keys=keys, weather_csv=out_weather,
+                                   weather_dim_csv=PROCESSED_DIR / "dim_weather.csv")
+    print(f"Fact rows written to {fact_csv} ({rows} rows, clustered by date_id, station_id)")
+
+
+if __name__ == "__main__":
+    run_entry_point(main, "transform")
@@ -0,0 +1,51 @@
+"""
+Canonical city index tests.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from etl.cities import CityIndex, build_city_index, parse_city, with_city_ids
+
+
+def test_spellings_normalize_to_one_city():
+    assert parse_city("Houston,TX,US") == ("HOUSTON", "TX")
+    assert parse_city("Houston", "Texas") == ("HOUSTON", "TX")
+    assert parse_city("Ft. Worth, Texas") == ("FORT WORTH", "TX")
+    assert parse_city("  san josé ") == ("SAN JOSE", None)
+    assert parse_city("NYC") == ("NEW YORK", None)
+
+
+def test_build_assigns_ids_and_resolves_by_state(tmp_path):
+    raw = tmp_path / "nrel.json"
+    stations = ([{"city": "Portland", "state": "OR"}] * 3 + [{"city": "Portland", "state": "ME"}]
+                + [{"city": "St. Louis", "state": "MO"}])
+    raw.write_text(json.dumps({"fuel_stations": stations}))
+    path = tmp_path / "city_index.json"
+    index = build_city_index(raw, path, tmp_path / "keys", seeds=["Houston,TX,US"])
+
+    assert len(index) == 4
+    oregon, maine = index.resolve("Portland", "OR"), index.resolve("portland", "Maine")
+    assert None not in (oregon, maine) and oregon != maine
+    # Without a state, the city with the most stations wins
+    assert index.resolve("Portland") == oregon
+    assert index.resolve("Saint Louis") == index.resolve("ST LOUIS", "MO")
+    assert index.resolve("Atlantis") is None
+
+    # Unchanged extract: the cached index; a new one keeps every existing ID
+    assert build_city_index(raw, path, tmp_path / "keys").cities == index.cities
+    raw.write_text(json.dumps({"fuel_stations": stations + [{"city": "Austin", "state": "TX"}]}))
+    rebuilt = build_city_index(raw, path, tmp_path / "keys")
+    assert rebuilt.resolve("Portland", "ME") == maine
+    assert rebuilt.resolve("Austin,TX,US") == 5
+
+
+def test_with_city_ids_maps_columns_in_chunks():
+    index = CityIndex()
+    for key, city in enumerate(["Houston,TX,US", "Boston,MA,US"], 1):
+        index.cities[index.add(city, None)]["id"] = key
+    rows = [{"city": c} for c in ["Houston", "boston", "Houston", "Nowhere", "Boston,MA"]]
+    out = list(with_city_ids(iter(rows), index, "city", chunk_rows=2))
+    assert [row["city_id"] for row in out] == [1, 2, 1, None, 2]
@@ -0,0 +1,36 @@
+"""
+Shared CSV reader tests.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pyarrow")
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from etl.csv_reader import iter_csv_rows, read_csv_table
+
+
+def test_tables_keep_the_types_pandas_would_read(tmp_path):
+    path = tmp_path / "sessions.csv"
+    path.write_text("User ID,Charging Start Time,Energy,Age,Note\n"
+                    "User_1,2024-01-01 00:00:00,1.5,3,\n"
+                    "User_2,2024-01-01 01:00:00,,4,late\n")
+
+    table = read_csv_table(path)
+    types = {field.name: str(field.type) for field in table.schema}
+    # Timestamps stay text, as pandas.read_csv leaves them
+    assert types == {"User ID": "string", "Charging Start Time": "string",
+                     "Energy": "double", "Age": "int64", "Note": "string"}
+    assert table.column("Energy").to_pylist() == [1.5, None]
+    assert read_csv_table(path, as_strings=True).column("Energy").to_pylist() == ["1.5", ""]
+
+
+def test_rewritten_files_are_parsed_again(tmp_path):
+    path = tmp_path / "a.csv"
+    path.write_text("x\n1\n")
+    assert read_csv_table(path).column("x").to_pylist() == [1]
+    path.write_text("x\n2\n")
+    assert read_csv_table(path).column("x").to_pylist() == [2]
+    assert list(iter_csv_rows(path)) == [{"x": "2"}]
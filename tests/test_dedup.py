@@ -0,0 +1,72 @@
+"""
+De-duplication tests for the sessions staging output.
+"""
+
+import csv
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from etl.dedup import BloomFilter, KeyDeduplicator, bloom_parameters, dedup_csv, key_hash
+from etl.transform import transform_ev_sessions
+
+SAMPLE_CSV = Path(__file__).parent.parent / "reports" / "sample_data.csv"
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def with_duplicates(path, rows, repeat):
+    """Write rows followed by the first `repeat` of them again."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows + rows[:repeat])
+
+
+def test_spilled_keys_are_still_detected(tmp_path):
+    with KeyDeduplicator(max_memory_keys=3, spill_dir=tmp_path, bloom_bytes=1024) as dedup:
+        keys = [("user", str(i)) for i in range(10)]
+        assert not any(dedup.is_duplicate(k) for k in keys)
+        assert dedup.spilled
+        assert all(dedup.is_duplicate(k) for k in keys)
+        assert (dedup.unique, dedup.duplicates) == (10, 10)
+
+
+def test_bloom_filter_is_sized_for_one_percent_false_positives():
+    size, hashes = bloom_parameters(100_000_000)
+    assert hashes == 7 and 9.5 < size * 8 / 100_000_000 < 9.7
+    size, hashes = bloom_parameters(20_000)
+    bloom = BloomFilter(size, hashes)
+    for i in range(20_000):
+        bloom.add(key_hash(["seen", str(i)]))
+    false_positives = sum(key_hash(["new", str(i)]) in bloom for i in range(20_000))
+    assert false_positives < 20_000 * 0.02
+
+
+def test_transform_quarantines_duplicate_sessions(tmp_path):
+    raw = tmp_path / "raw.csv"
+    with_duplicates(raw, read_rows(SAMPLE_CSV), 5)
+    out, quarantine = tmp_path / "out.csv", tmp_path / "quarantine" / "dupes.csv"
+
+    assert transform_ev_sessions(raw, out, quarantine_csv=quarantine) == 20
+    assert len(read_rows(quarantine)) == 5
+    keys = {(r["User ID"], r["Charging Start Time"]) for r in read_rows(out)}
+    assert len(keys) == 20
+
+
+def test_dedup_csv_merges_across_files(tmp_path):
+    rows = read_rows(SAMPLE_CSV)
+    first, second = tmp_path / "a.csv", tmp_path / "b.csv"
+    with_duplicates(first, rows[:10], 0)
+    with_duplicates(second, rows[5:], 0)
+
+    merged = tmp_path / "merged.csv"
+    assert dedup_csv([first, second], [merged]) == (20, 5)
+    assert read_rows(merged) == rows
+
+    # Per-file rewrite in place keeps the first occurrence only
+    assert dedup_csv([first, second], [first, second]) == (20, 5)
+    assert len(read_rows(first)) == 10 and len(read_rows(second)) == 10
@@ -0,0 +1,108 @@
+"""
+Fact build tests on the 20-row sample sessions.
+"""
+
+import csv
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+import pytest
+
+from etl.cities import CityIndex
+from etl.facts import UNKNOWN_WEATHER_ID, MemoryCeiling, build_fact_sessions, cluster_sort_key
+from etl.keys import KeyRegistries
+from etl.transform import transform_ev_sessions
+
+SAMPLE_CSV = Path(__file__).parent.parent / "reports" / "sample_data.csv"
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def test_facts_are_written_in_clustering_order(tmp_path):
+    sessions = tmp_path / "sessions.csv"
+    transform_ev_sessions(SAMPLE_CSV, sessions)
+
+    in_memory, spilled = tmp_path / "facts.csv", tmp_path / "facts_spilled.csv"
+    with KeyRegistries(tmp_path / "keys") as keys:
+        assert build_fact_sessions(sessions, in_memory, keys=keys) == 20
+        # Three-row runs force the external merge path
+        assert build_fact_sessions(sessions, spilled, run_rows=3, keys=keys) == 20
+
+    rows = read_rows(in_memory)
+    assert rows == read_rows(spilled)
+    assert rows == sorted(rows, key=cluster_sort_key)
+    assert rows[0]["date_id"] == "2024010100"
+    assert rows[0]["session_id"] == "User_1-20240101T000000"
+    assert not list(tmp_path.glob("facts_run_*"))
+
+
+def test_facts_build_from_session_shards(tmp_path):
+    sessions = tmp_path / "sessions.csv"
+    transform_ev_sessions(SAMPLE_CSV, sessions)
+    header, *lines = sessions.read_text(encoding="utf-8").splitlines(keepends=True)
+    shards = [tmp_path / "sessions.part000.csv", tmp_path / "sessions.part001.csv"]
+    shards[0].write_text(header + "".join(lines[:7]), encoding="utf-8")
+    shards[1].write_text(header + "".join(lines[7:]), encoding="utf-8")
+
+    with KeyRegistries(tmp_path / "keys") as keys:
+        assert build_fact_sessions(shards, tmp_path / "from_shards.csv", keys=keys) == 20
+        build_fact_sessions(sessions, tmp_path / "facts.csv", keys=keys)
+    assert read_rows(tmp_path / "from_shards.csv") == read_rows(tmp_path / "facts.csv")
+
+
+def test_weather_is_attached_by_city_and_hour_in_chunks(tmp_path):
+    cities = CityIndex()
+    cities.cities[cities.add("Houston,TX,US", None)]["id"] = 1
+    sessions = tmp_path / "sessions.csv"
+    transform_ev_sessions(SAMPLE_CSV, sessions, cities=cities)
+    weather = tmp_path / "weather.csv"
+    weather.write_text("extraction_timestamp,city,city_id\n"
+                       "2024-01-01T00:10:00,Houston,1\n2024-01-01T03:00:00,Houston,1\n")
+
+    facts, dim_weather = tmp_path / "facts.csv", tmp_path / "dim_weather.csv"
+    with KeyRegistries(tmp_path / "keys") as keys:
+        assert build_fact_sessions(sessions, facts, keys=keys, weather_csv=weather, chunk_rows=3,
+                                   weather_dim_csv=dim_weather) == 20
+    weather_ids = {row["date_id"]: int(row["weather_id"]) for row in read_rows(facts)}
+    # Sessions at 00:00 and 03:00 are in Houston; 01:00 is in San Francisco
+    assert weather_ids["2024010100"] == 1 and weather_ids["2024010103"] == 2
+    assert weather_ids["2024010101"] == UNKNOWN_WEATHER_ID
+    # Every matched weather_id has its DIM_WEATHER row
+    assert [(r["weather_id"], r["city_id"], r["date_id"]) for r in read_rows(dim_weather)] == [
+        ("1", "1", "2024010100"), ("2", "1", "2024010103")]
+
+
+def test_fact_keys_are_replaced_by_surrogate_keys(tmp_path):
+    sessions = tmp_path / "sessions.csv"
+    transform_ev_sessions(SAMPLE_CSV, sessions)
+    facts = tmp_path / "facts.csv"
+    with KeyRegistries(tmp_path / "keys") as keys:
+        build_fact_sessions(sessions, facts, keys=keys)
+        for row, session in zip(sorted(read_rows(facts), key=lambda r: r["session_id"]),
+                                sorted(read_rows(sessions), key=lambda r: (r["User ID"], r["Charging Start Time"]))):
+            for dimension, field, natural in (("user", "user_id", "User ID"),
+                                              ("vehicle", "vehicle_id", "Vehicle Model"),
+                                              ("station", "station_id", "Charging Station ID")):
+                assert keys[dimension].lookup([session[natural]]) == [int(row[field])]
+
+
+def test_invalid_rows_are_dropped_and_memory_ceiling_is_enforced(tmp_path):
+    sessions = tmp_path / "sessions.csv"
+    transform_ev_sessions(SAMPLE_CSV, sessions)
+    rows = read_rows(sessions)
+    rows[0]["Charging Cost (USD)"] = ""
+    rows[1]["Charging Start Time"] = "not a time"
+    with open(sessions, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    with KeyRegistries(tmp_path / "keys") as keys:
+        assert build_fact_sessions(sessions, tmp_path / "facts.csv", keys=keys, chunk_rows=4) == 18
+        if MemoryCeiling.private_bytes():
+            with pytest.raises(MemoryError):
+                build_fact_sessions(sessions, tmp_path / "facts.csv", keys=keys, memory_mb=1)
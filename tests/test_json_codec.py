@@ -0,0 +1,38 @@
+"""
+Round-trip tests for the raw NDJSON extract format.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from data_sources.json_codec import (
+    NDJSONWriter, iter_ndjson, iter_raw_records, raw_filename, read_metadata,
+)
+
+STATIONS = [
+    {"id": 1517, "station_name": "LADWP - Truesdale Center", "city": "Sun Valley",
+     "ev_connector_types": ["CHADEMO", "J1772"], "latitude": 34.2483191527193},
+    {"id": 1519, "station_name": "Café Central", "city": "Los Angeles",
+     "ev_connector_types": None, "latitude": None},
+]
+
+
+@pytest.mark.parametrize("compression", ["none", "gzip"])
+def test_ndjson_round_trip(tmp_path, compression):
+    path = tmp_path / raw_filename("nrel_stations", compression, "20240101_000000")
+    with NDJSONWriter(path, {"states_processed": ["CA"]}) as writer:
+        for station in STATIONS:
+            writer.write(station)
+
+    assert list(iter_ndjson(path)) == STATIONS
+    assert read_metadata(path) == {"states_processed": ["CA"], "record_count": 2}
+
+
+def test_legacy_json_still_readable(tmp_path):
+    path = tmp_path / "nrel_stations_20240101_000000.json"
+    path.write_text(json.dumps({"metadata": {}, "fuel_stations": STATIONS}, indent=2))
+    assert list(iter_raw_records(path, "fuel_stations")) == STATIONS
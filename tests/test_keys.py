@@ -0,0 +1,65 @@
+"""
+Surrogate key registry tests.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from etl.keys import KeyRegistries, KeyRegistry
+
+
+def test_keys_are_stable_across_reopen_and_growth(tmp_path):
+    with KeyRegistry("station", tmp_path) as registry:
+        assert registry.assign(["S1", "S2", "S1", "S3"]) == [1, 2, 1, 3]
+        # Past the initial capacity, so the index is rehashed
+        many = [f"S{i}" for i in range(4000)]
+        ids = registry.assign(many)
+    assert ids[1:4] == [1, 2, 3] and len(set(ids)) == 4000
+
+    with KeyRegistry("station", tmp_path) as registry:
+        assert len(registry) == 4000
+        assert registry.lookup(["S3", "missing", "S3999"]) == [3, None, ids[3999]]
+        assert registry.key(ids[3999]) == "S3999"
+        assert list(registry.since(3998)) == [(3999, "S3998"), (4000, "S3999")]
+
+
+def test_uncommitted_batch_is_ignored(tmp_path):
+    with KeyRegistry("city", tmp_path) as registry:
+        registry.assign(["Boston", "Denver"])
+    # A batch that appended its keys but crashed before updating the count
+    with open(tmp_path / "city.keys", "ab") as f:
+        f.write(b"Austin")
+    with KeyRegistry("city", tmp_path) as registry:
+        assert registry.lookup(["Austin"]) == [None]
+        assert registry.assign(["Seattle", "Boston"]) == [3, 1]
+        assert registry.key(3) == "Seattle"
+
+
+class FakeCursor:
+    def __init__(self, loaded):
+        self.loaded = loaded
+        self.inserted = []
+
+    def execute(self, sql, params=None):
+        self.dimension = params[0]
+
+    def fetchone(self):
+        return (self.loaded.get(self.dimension, 0),)
+
+    def executemany(self, sql, rows):
+        self.inserted += rows
+
+
+def test_sync_sends_only_new_keys(tmp_path):
+    with KeyRegistries(tmp_path) as registries:
+        registries["vehicle"].assign(["Tesla Model 3", "Nissan Leaf", "BMW i3"])
+        # The warehouse already holds the first key, e.g. from a sync whose commit was not recorded
+        cs = FakeCursor({"vehicle": 1})
+        synced = registries.sync_keys(cs)
+        assert cs.inserted == [("vehicle", "Nissan Leaf", 2), ("vehicle", "BMW i3", 3)]
+        registries.mark_synced(synced)
+        assert registries.unsynced() == {}
+
+        registries["vehicle"].assign(["BMW i3", "Kia EV6"])
+        assert registries.unsynced() == {"vehicle": 1}
@@ -0,0 +1,173 @@
+"""
+Ledger and incremental weather transform tests.
+"""
+
+import csv
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from data_sources.raw_store import RawStore
+from data_sources.synthetic_data import generate_weather_json
+from etl import load
+from etl.ledger import LOADED, PUT, Ledger, LoadManifest
+from etl.transform import transform_weather_incremental
+
+
+def add_extract(store, day, records, seed):
+    extracted = datetime(2024, 1, day)
+    path = store.path_for("weather_data", "none", extracted)
+    generate_weather_json(path, records, seed=seed)
+    store.register(path, "weather_data", extracted)
+
+
+def count_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return sum(1 for _ in csv.DictReader(f))
+
+
+def test_only_new_extracts_are_transformed(tmp_path):
+    store = RawStore(tmp_path / "raw")
+    ledger = Ledger(tmp_path / "ledger.sqlite")
+    output, increment = tmp_path / "weather.csv", tmp_path / "weather_increment.csv"
+
+    add_extract(store, 1, 11, seed=1)
+    assert transform_weather_incremental(output, increment, store, ledger) == (1, 11)
+    assert transform_weather_incremental(output, increment, store, ledger) == (0, 0)
+
+    add_extract(store, 2, 5, seed=2)
+    assert transform_weather_incremental(output, increment, store, ledger) == (1, 5)
+    assert count_rows(output) == 16
+    # Nothing loaded yet, so both batches' increments are waiting
+    increments = sorted(tmp_path.glob("weather_increment_*.csv"))
+    assert [count_rows(path) for path in increments] == [11, 5]
+    assert len(ledger.unloaded("weather_data")) == 2
+
+    assert ledger.mark_loaded("weather_data", [load.increment_batch(increments[0])]) == 1
+    assert len(ledger.unloaded("weather_data")) == 1
+    assert ledger.mark_loaded("weather_data") == 1
+    assert ledger.unloaded("weather_data") == []
+
+
+def test_changed_extract_is_pending_again(tmp_path):
+    ledger = Ledger(tmp_path / "ledger.sqlite")
+    entry = {"path": "a.ndjson", "sha256": "1" * 64}
+    ledger.mark_transformed("weather_data", [entry], "run-1", {"a.ndjson": 3})
+    assert ledger.pending("weather_data", [entry]) == []
+    changed = dict(entry, sha256="2" * 64)
+    assert ledger.pending("weather_data", [changed]) == [changed]
+
+
+def test_load_plan_skips_unchanged_outputs(tmp_path, monkeypatch):
+    stations, sessions = tmp_path / "stations.csv", tmp_path / "sessions.csv"
+    stations.write_text("station_id\n1\n")
+    sessions.write_text("session_id\n1\n")
+    monkeypatch.setattr(load, "FILES", {"nrel_stations": stations, "ev_sessions": sessions,
+                                        "weather_data": tmp_path / "missing.csv"})
+    manifest = LoadManifest(tmp_path / "ledger.sqlite")
+
+    plan = load.plan_load(manifest)
+    assert sorted(plan) == ["ev_sessions", "nrel_stations"]
+    assert all(put for files in plan.values() for _, _, put in files)
+
+    manifest.mark(stations.name, stations, plan["nrel_stations"][0][1], LOADED)
+    manifest.mark(sessions.name, sessions, plan["ev_sessions"][0][1], PUT)
+    plan = load.plan_load(manifest)
+    # Committed and unchanged: skipped; staged but never committed: copied without a PUT
+    assert list(plan) == ["ev_sessions"] and plan["ev_sessions"][0][2] is False
+
+    stations.write_text("station_id\n1\n2\n")
+    assert "nrel_stations" in load.plan_load(manifest)
+    assert len(load.plan_load(manifest, force=True)) == 2
+
+
+class RecordingConnection:
+    """Records statements; with fail_copy, COPY INTO fails like a load cut short mid-plan."""
+
+    description = sfqid = None
+    rowcount = 0
+
+    def __init__(self, fail_copy=False):
+        self.fail_copy = fail_copy
+        self.statements = []
+        self.commits = 0
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        self.statements.append(" ".join(sql.split()))
+        if self.fail_copy and sql.strip().startswith("COPY"):
+            raise RuntimeError("warehouse suspended")
+
+    def close(self):
+        pass
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_load_plan_runs_truncate_and_copy_in_one_transaction(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    changes = tmp_path / "nrel_station_changes.csv"
+    changes.write_text("change_type,station_id\ninsert,1\n")
+    manifest = LoadManifest(tmp_path / "ledger.sqlite")
+    plan = load.plan_load(manifest, files={"nrel_station_changes": [changes]})
+    conn = RecordingConnection(fail_copy=True)
+
+    try:
+        load.load_plan(conn, plan, manifest)
+    except RuntimeError:
+        pass
+    statements = conn.statements
+    begin = statements.index("BEGIN")
+    assert statements[0].startswith("PUT") and begin == 1
+    assert statements[begin + 1] == "TRUNCATE TABLE STAGING.stg_nrel_station_changes"
+    # Rolled back by the caller, so the file stays PUT and is copied again
+    assert conn.commits == 0 and manifest.status(changes.name, plan["nrel_station_changes"][0][1]) == PUT
+
+
+def test_station_changes_apply_idempotently_and_promote_before_loaded(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    changes = tmp_path / "nrel_station_changes.csv"
+    changes.write_text("change_type,station_id\nupdate,1\n")
+    manifest = LoadManifest(tmp_path / "ledger.sqlite")
+    plan = load.plan_load(manifest, files={"nrel_station_changes": [changes]})
+    digest = plan["nrel_station_changes"][0][1]
+    promoted = []
+    monkeypatch.setattr(load, "commit_snapshot", lambda: promoted.append(manifest.status(changes.name, digest)))
+    conn = RecordingConnection()
+    load.load_plan(conn, plan, manifest)
+
+    # Reapplying a change set neither closes the version it opened nor duplicates it
+    update = next(sql for sql in conn.statements if "UPDATE ANALYTICS.DIM_STATION" in sql)
+    insert = next(sql for sql in conn.statements if "INSERT INTO ANALYTICS.DIM_STATION" in sql)
+    assert "d.effective_from < c.effective_from" in update
+    assert "NOT EXISTS" in insert and "d.effective_from = c.effective_from" in insert
+    # A crash between the two leaves the file PUT, never LOADED with its snapshot unpromoted
+    assert promoted == [PUT] and manifest.status(changes.name, digest) == LOADED
+
+
+def test_fact_loads_insert_only_new_sessions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    facts = tmp_path / "fact_charging_sessions.csv"
+    facts.write_text("session_id\nUser_1-20240101T000000\n")
+    manifest = LoadManifest(tmp_path / "ledger.sqlite")
+    plan = load.plan_load(manifest, files={"fact_charging_sessions": [facts]})
+    conn = RecordingConnection()
+    load.load_plan(conn, plan, manifest)
+
+    statements = conn.statements
+    # The full fact file goes to staging; only the MERGE touches the fact table
+    assert "TRUNCATE TABLE STAGING.stg_fact_charging_sessions" in statements
+    copy = next(sql for sql in statements if sql.startswith("COPY"))
+    assert copy.startswith("COPY INTO STAGING.stg_fact_charging_sessions")
+    merge = next(sql for sql in statements if "INSERT INTO ANALYTICS.FACT_CHARGING_SESSIONS" in sql)
+    assert "WHERE NOT EXISTS" in merge and "UPDATE" not in merge
+    # Inserted in clustering order, so new micro-partitions prune from the first load
+    assert merge.endswith("ORDER BY s.date_id, s.station_id")
+    assert statements.index(copy) < statements.index(merge) and conn.commits == 1
+    # The weather dimension, with its unknown member, is merged before the facts reference it
+    dim_merge = next(sql for sql in statements if "MERGE INTO ANALYTICS.DIM_WEATHER" in sql)
+    assert "SELECT -1," in dim_merge and statements.index(dim_merge) < statements.index(merge)
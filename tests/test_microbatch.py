@@ -0,0 +1,76 @@
+"""
+Micro-batch loader tests; the Snowflake load is replaced by a recorder.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from etl import load
+from etl.ledger import LOADED, LoadManifest
+from etl.microbatch import MicroBatchLoader
+
+
+def make_loader(tmp_path, monkeypatch, **kwargs):
+    monkeypatch.setattr(load, "FILES", {"nrel_stations": tmp_path / "stations.csv",
+                                        "weather_data": tmp_path / "weather_increment_*.csv"})
+    manifest = LoadManifest(tmp_path / "ledger.sqlite")
+    loaded = []
+
+    def record(plan):
+        loaded.append(sorted(path.name for files in plan.values() for path, _, _ in files))
+        for files in plan.values():
+            for path, checksum, _ in files:
+                manifest.mark(path.name, path, checksum, LOADED)
+
+    return MicroBatchLoader(manifest, loader=record, **kwargs), loaded
+
+
+def test_files_wait_a_poll_and_flush_on_age(tmp_path, monkeypatch):
+    batcher, loaded = make_loader(tmp_path, monkeypatch, max_wait=60)
+    (tmp_path / "weather_increment_1.csv").write_text("city\nBoston\n")
+
+    assert batcher.poll(0) == 0  # seen once: may still be written
+    assert batcher.poll(10) == 1
+    assert not batcher.due(10)
+    assert batcher.due(70)
+    assert batcher.flush()
+    assert loaded == [["weather_increment_1.csv"]]
+    # Loaded and unchanged: not queued again
+    assert batcher.poll(80) == 0
+
+
+def test_batches_are_bounded_and_failures_retry(tmp_path, monkeypatch):
+    batcher, loaded = make_loader(tmp_path, monkeypatch, max_files=2, max_wait=1000)
+    for i in range(3):
+        (tmp_path / f"weather_increment_{i}.csv").write_text(f"city\nCity{i}\n")
+    batcher.poll(0)
+    batcher.poll(1)
+    assert batcher.due(1)  # the file bound is reached
+
+    real_loader, calls = batcher.loader, []
+
+    def flaky(plan):
+        calls.append(plan)
+        if len(calls) == 1:
+            raise RuntimeError("warehouse unavailable")
+        real_loader(plan)
+
+    batcher.loader = flaky
+    assert not batcher.flush()
+    assert batcher.failures == 1 and len(batcher.queue) == 3
+    assert batcher.backoff() == batcher.interval * 2
+
+    assert batcher.flush() and batcher.flush()
+    assert loaded == [["weather_increment_0.csv", "weather_increment_1.csv"], ["weather_increment_2.csv"]]
+    assert batcher.failures == 0 and not batcher.queue
+
+
+def test_changed_file_is_requeued(tmp_path, monkeypatch):
+    batcher, loaded = make_loader(tmp_path, monkeypatch)
+    stations = tmp_path / "stations.csv"
+    stations.write_text("station_id\n1\n")
+    assert batcher.run(once=True) == 0
+    stations.write_text("station_id\n1\n2\n")
+    assert batcher.run(once=True) == 0
+    assert loaded == [["stations.csv"], ["stations.csv"]]
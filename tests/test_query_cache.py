@@ -0,0 +1,108 @@
+"""
+Query result cache tests, run against an in-process stand-in connection.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from database.query_cache import QueryCache, cache_key
+from database.sql_text import normalize_sql, referenced_tables
+
+
+class FakeConnection:
+    """Answers the watermark lookup and counts every other query."""
+
+    def __init__(self):
+        self.watermarks = {"ANALYTICS.AGG_CITY_DAY": "2024-01-01 00:00:00"}
+        self.queries = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = [("CITY",), ("SESSIONS",)]
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        if "ETL_WATERMARKS" in sql:
+            self._rows = list(self.conn.watermarks.items())
+        else:
+            self.conn.queries += 1
+            self._rows = [("Denver", self.conn.queries)]
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+SQL = "SELECT city_id, SUM(sessions) AS sessions FROM ANALYTICS.AGG_CITY_DAY r GROUP BY ALL"
+
+
+def test_normalized_sql_shares_a_key():
+    reformatted = "select city_id,  SUM(sessions) as sessions -- by city\nfrom analytics.agg_city_day r group by all;"
+    assert normalize_sql(reformatted) == normalize_sql(SQL)
+    assert cache_key(reformatted) == cache_key(SQL)
+    assert cache_key(SQL, {"city": "Denver"}) != cache_key(SQL, {"city": "Austin"})
+    assert referenced_tables(SQL) == ["ANALYTICS.AGG_CITY_DAY"]
+
+
+def test_new_load_watermark_invalidates(tmp_path):
+    conn = FakeConnection()
+    cache = QueryCache(cache_dir=tmp_path, check_interval=0)
+
+    assert cache.fetch(conn, SQL)[1] == [("Denver", 1)]
+    assert cache.fetch(conn, SQL)[1] == [("Denver", 1)]
+    assert conn.queries == 1
+
+    conn.watermarks["ANALYTICS.AGG_CITY_DAY"] = "2024-01-02 00:00:00"
+    assert cache.fetch(conn, SQL)[1] == [("Denver", 2)]
+    # Loads of unrelated tables leave the entry alone
+    conn.watermarks["ANALYTICS.DIM_STATION"] = "2024-01-03 00:00:00"
+    assert cache.fetch(conn, SQL)[1] == [("Denver", 2)]
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_memory_tier_is_lru(tmp_path):
+    conn = FakeConnection()
+    cache = QueryCache(cache_dir=tmp_path, memory_entries=1, disk_bytes=0, check_interval=0)
+    cache.fetch(conn, SQL, {"city": "Denver"})
+    cache.fetch(conn, SQL, {"city": "Austin"})
+    cache.fetch(conn, SQL, {"city": "Denver"})
+    assert conn.queries == 3
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    import pytest
+    pytest.importorskip("pyarrow")
+    conn = FakeConnection()
+    QueryCache(cache_dir=tmp_path, check_interval=0).fetch(conn, SQL)
+    columns, rows = QueryCache(cache_dir=tmp_path, check_interval=0).fetch(conn, SQL)
+    assert (columns, rows, conn.queries) == (["CITY", "SESSIONS"], [("Denver", 1)], 1)
+
+
+def test_queries_without_a_watermark_for_every_table_are_not_cached(tmp_path):
+    conn = FakeConnection()
+    cache = QueryCache(cache_dir=tmp_path, check_interval=0)
+    uncacheable = [
+        "SELECT city_id, sessions FROM AGG_CITY_DAY",  # unqualified, after USE SCHEMA
+        "SELECT * FROM ANALYTICS.FACT_CHARGING_SESSIONS",  # no load recorded yet
+        "WITH c AS (SELECT * FROM ANALYTICS.AGG_CITY_DAY) SELECT * FROM c",
+        "SELECT * FROM TABLE(INFORMATION_SCHEMA.QUERY_HISTORY())",
+        "SELECT CURRENT_TIMESTAMP()",
+    ]
+    for sql in uncacheable:
+        cache.fetch(conn, sql)
+        cache.fetch(conn, sql)
+    assert conn.queries == 2 * len(uncacheable) and cache.uncached == 2 * len(uncacheable)
+    assert not list(tmp_path.glob("*.parquet"))
+
+    # A database prefix still resolves to the watermarked SCHEMA.TABLE
+    cache.fetch(conn, "SELECT * FROM EV_CHARGING_DW.ANALYTICS.AGG_CITY_DAY")
+    cache.fetch(conn, "SELECT * FROM EV_CHARGING_DW.ANALYTICS.AGG_CITY_DAY")
+    assert cache.hits == 1
@@ -0,0 +1,81 @@
+"""
+Query telemetry tests, run against a stand-in Snowflake connection.
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from database.query_log import TracedConnection, enrich, read_queries, summarize
+from database.sql_text import fingerprint
+from etl.metrics import run_id, stage
+
+
+class FakeCursor:
+    def __init__(self, history=()):
+        self.history = history
+        self.sfqid = None
+        self.rowcount = None
+        self.executed = 0
+
+    def execute(self, sql, params=None):
+        self.executed += 1
+        if "FAIL" in sql:
+            error = RuntimeError("SQL compilation error")
+            error.sfqid = "q-err"
+            raise error
+        self.sfqid = f"q-{self.executed}"
+        self.rowcount = 3
+        return self
+
+    def fetchall(self):
+        return list(self.history)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, history=()):
+        self.history = history
+
+    def cursor(self):
+        return FakeCursor(self.history)
+
+
+def test_fingerprint_ignores_literals_and_layout():
+    assert fingerprint("select * from t where id = 1") == fingerprint("SELECT *\n  FROM t WHERE id = 42;")
+    assert fingerprint("COPY INTO t FROM @s FILES = ('a.csv')") == fingerprint("copy into t from @s files = ('b.csv')")
+    assert fingerprint("SELECT * FROM t") != fingerprint("SELECT * FROM u")
+
+
+def test_statements_are_logged_and_enriched(tmp_path):
+    log = tmp_path / "queries.jsonl"
+    conn = TracedConnection(FakeConnection(), log)
+    cs = conn.cursor()
+    with stage("load_copy"):
+        assert cs.execute("COPY INTO t FROM @s FILES = ('a.csv')") is cs
+    cs.execute("COPY INTO t FROM @s FILES = ('b.csv')")
+    with pytest.raises(RuntimeError):
+        cs.execute("SELECT FAIL")
+
+    records = read_queries(path=log)
+    assert [r["sfqid"] for r in records] == ["q-1", "q-2", "q-err"]
+    assert records[0]["stage"] == "load_copy" and records[1]["stage"] is None
+    assert records[0]["kind"] == "COPY" and records[0]["rowcount"] == 3
+    assert records[2]["status"] == "error" and "compilation" in records[2]["error"]
+    assert all(r["run_id"] == run_id() for r in records)
+    # enrich() bounds query history by started_at, so it must carry its offset
+    assert datetime.fromisoformat(records[0]["started_at"]).utcoffset() == timedelta(0)
+
+    history = [("q-1", 1200, 100, 1000, 0, 4096, 10, 1, 1, "EV_DEV_WH", "X-Small")]
+    assert enrich(TracedConnection(FakeConnection(history), log), path=log) == 1
+    records = read_queries(path=log)
+    assert records[0]["history"]["bytes_scanned"] == 4096
+    assert "history" not in records[1]
+
+    copy = summarize(r for r in records if r["kind"] == "COPY")
+    assert len(copy) == 1 and copy[0]["count"] == 2 and copy[0]["bytes_scanned"] == 4096
@@ -0,0 +1,77 @@
+"""
+Adaptive rate limiter tests against a fake clock.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from data_sources import rate_limiter
+from data_sources.rate_limiter import RateLimiter, retry_after_seconds
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(rate_limiter, "time", fake)
+    return fake
+
+
+def test_paces_at_steady_rate_without_headers(clock):
+    limiter = RateLimiter(60, 60)
+    for _ in range(3):
+        limiter.wait()
+        limiter.update(FakeResponse())
+    assert limiter.waited_seconds == pytest.approx(2.0)
+
+
+def test_speeds_up_with_quota_and_slows_near_reserve(clock):
+    limiter = RateLimiter(1000, 3600, min_interval=0.1)
+    limiter.wait()
+    limiter.update(FakeResponse(headers={"X-RateLimit-Limit": "1000", "X-RateLimit-Remaining": "900"}))
+    assert limiter.interval == pytest.approx(0.1)
+    limiter.update(FakeResponse(headers={"x-ratelimit-limit": "1000", "x-ratelimit-remaining": "50"}))
+    assert limiter.interval == pytest.approx(72.0)
+
+
+def test_throttle_honours_retry_after_then_recovers(clock):
+    limiter = RateLimiter(60, 60)
+    limiter.wait()
+    limiter.update(FakeResponse(429, {"Retry-After": "7"}))
+    limiter.backoff(0, FakeResponse(429))
+    limiter.wait()
+    assert limiter.throttled == 1
+    assert limiter.waited_seconds == pytest.approx(7.0)
+
+
+def test_throttle_without_retry_after_doubles_interval(clock):
+    limiter = RateLimiter(60, 60)
+    limiter.wait()
+    limiter.update(FakeResponse(429))
+    limiter.wait()
+    assert limiter.waited_seconds == pytest.approx(2.0)
+
+
+def test_retry_after_http_date():
+    assert retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert retry_after_seconds("3") == 3.0
+    assert retry_after_seconds("soon") is None
@@ -0,0 +1,62 @@
+"""
+Raw store tests: partitioned layout, manifest registration and lookup.
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from data_sources.json_codec import NDJSONWriter, iter_ndjson, read_metadata
+from data_sources.raw_store import RawStore
+from data_sources.weather_api import WeatherExtractor
+
+
+def test_writer_partitions_and_registers(tmp_path):
+    store = RawStore(tmp_path)
+    extracted = datetime(2024, 1, 2, 3, 4, 5)
+    with store.open_writer("weather_data", {"cities": 2}, "none", extracted) as writer:
+        writer.write({"name": "Austin", "extraction_timestamp": "2024-01-02T03:04:06"})
+        writer.write({"name": "Dallas", "extraction_timestamp": "2024-01-02T03:04:05"})
+
+    assert writer.path == tmp_path / "source=weather_data/date=2024-01-02/weather_data_20240102_030405.ndjson"
+    [entry] = store.files("weather_data")
+    assert entry["record_count"] == 2
+    assert (entry["min_time"], entry["max_time"]) == ("2024-01-02T03:04:05", "2024-01-02T03:04:06")
+    assert len(entry["sha256"]) == 64
+    assert store.latest("weather_data") == writer.path
+    assert len(list(iter_ndjson(writer.path))) == 2
+
+
+def test_failed_extract_is_not_registered(tmp_path):
+    store = RawStore(tmp_path)
+    with pytest.raises(RuntimeError):
+        with store.open_writer("nrel_stations", compression="none") as writer:
+            writer.write({"id": 1})
+            raise RuntimeError("API down")
+    assert not writer.path.exists() and not writer.final_path.exists()
+    # Nothing is left behind for index_existing() to pick up as the latest extract
+    assert store.index_existing() == 0
+    assert store.files("nrel_stations") == []
+
+
+def test_weather_save_to_file_takes_the_combined_extract(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = {"metadata": {"total_cities": 2},
+            "weather_data": [{"name": "Austin"}, {"name": "Dallas"}]}
+    path = WeatherExtractor().save_to_file(data, "weather_data_20240101_000000.ndjson")
+    assert [r["name"] for r in iter_ndjson(path)] == ["Austin", "Dallas"]
+    assert read_metadata(path)["total_cities"] == 2
+
+
+def test_latest_indexes_legacy_flat_files(tmp_path):
+    for stamp in ("20240101_000000", "20240301_000000", "20240201_000000"):
+        with NDJSONWriter(tmp_path / f"nrel_stations_{stamp}.ndjson") as writer:
+            writer.write({"id": 1})
+    store = RawStore(tmp_path)
+    assert store.latest("nrel_stations") == tmp_path / "nrel_stations_20240301_000000.ndjson"
+    assert [e["extracted_at"][:10] for e in store.files("nrel_stations", since="2024-01-15")] == \
+        ["2024-02-01", "2024-03-01"]
+    assert store.index_existing() == 0
@@ -0,0 +1,79 @@
+"""
+Routing tests for the dashboard rollups.
+"""
+
+import csv
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from etl.cities import CityIndex
+from etl.facts import FACT_FIELDS, build_fact_sessions
+from etl.keys import KeyRegistries
+from etl.rollups import DIMENSION_SOURCES, ROLLUPS, UNKNOWN_CITY_ID, choose_rollup, merge_sql, rollup_query
+from etl.transform import transform_ev_sessions
+
+SAMPLE_CSV = Path(__file__).parent.parent / "reports" / "sample_data.csv"
+
+
+def test_queries_route_to_smallest_rollup():
+    assert choose_rollup(["city_id"], "month").name == "city_day"
+    assert choose_rollup(["charger_type"], "day").name == "station_hour"
+    assert choose_rollup(["city_id"], "hour").name == "station_hour"
+    assert choose_rollup(["vehicle_id"], None).name == "vehicle_month"
+    # Nothing pre-aggregates vehicles by day or by city
+    assert choose_rollup(["vehicle_id"], "day") is None
+    assert choose_rollup(["vehicle_id", "city_id"]) is None
+
+
+def test_rollup_query_reaggregates_rollup():
+    sql, params = rollup_query(["city_id"], "month", measures=["sessions"], filters={"city_id": 7})
+    assert "FROM ANALYTICS.AGG_CITY_DAY r" in sql
+    assert "DATE_TRUNC('month', r.period_start)" in sql
+    assert "SUM(r.sessions)" in sql
+    assert params == {"city_id": 7}
+
+
+def test_rollup_query_falls_back_to_facts():
+    sql, _ = rollup_query(["vehicle_id"], "day")
+    assert "FROM ANALYTICS.FACT_CHARGING_SESSIONS f" in sql
+    assert "DIM_STATION" not in sql
+
+
+def test_merge_adds_to_existing_rows():
+    for rollup in ROLLUPS:
+        sql = merge_sql(rollup)
+        assert "f.loaded_at > %(since)s AND f.loaded_at <= %(until)s" in sql
+        assert "t.sessions = t.sessions + n.sessions" in sql
+
+
+def test_city_rollups_group_by_the_sessions_own_city(tmp_path):
+    cities = CityIndex()
+    cities.cities[cities.add("Houston,TX,US", None)]["id"] = 7
+    sessions, facts = tmp_path / "sessions.csv", tmp_path / "facts.csv"
+    transform_ev_sessions(SAMPLE_CSV, sessions, cities=cities)
+    with KeyRegistries(tmp_path / "keys") as keys:
+        build_fact_sessions(sessions, facts, keys=keys)
+    with open(facts, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+
+    # Every rollup dimension reads a fact column; nothing joins DIM_STATION
+    groups = {}
+    for rollup in ROLLUPS:
+        sql = merge_sql(rollup)
+        assert "JOIN" not in sql
+        for dimension in rollup.dimensions:
+            column = re.search(r"f\.(\w+)", DIMENSION_SOURCES[dimension]).group(1)
+            assert column in FACT_FIELDS
+            groups[dimension] = Counter(row[column] or None for row in rows)
+    assert groups["city_id"]["7"] > 0 and set(groups["city_id"]) - {"7"} == {None}
+    assert "DC Fast Charger" in groups["charger_type"]
+    assert f"COALESCE(f.city_id, {UNKNOWN_CITY_ID}) AS city_id" in merge_sql(ROLLUPS[1])
+
+
+def test_rollup_measures_are_never_null():
+    sql = merge_sql(ROLLUPS[0])
+    for measure in ("energy_consumed_kwh", "charging_cost_usd", "duration_hours"):
+        assert f"COALESCE(SUM(f.{measure}), 0)" in sql
@@ -0,0 +1,57 @@
+"""
+Snapshot diffing tests for the SCD Type 2 station dimension.
+"""
+
+import csv
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from etl.scd import commit_snapshot, load_index, snapshot_time, write_station_changes
+from etl.transform import NREL_FIELDS
+
+
+def write_snapshot(path, stations):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=NREL_FIELDS)
+        writer.writeheader()
+        for station_id, name in stations:
+            writer.writerow({"station_id": station_id, "station_name": name, "city": "Denver"})
+
+
+def read_changes(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return sorted((row["change_type"], row["station_id"]) for row in csv.DictReader(f))
+
+
+def test_consecutive_snapshots_emit_only_changes(tmp_path):
+    index = tmp_path / "state" / "hashes.csv"
+    snapshot, changes = tmp_path / "stations.csv", tmp_path / "changes.csv"
+
+    write_snapshot(snapshot, [("1", "A"), ("2", "B"), ("3", "C")])
+    counts = write_station_changes(snapshot, changes, index, datetime(2024, 1, 1))
+    assert counts["insert"] == 3
+    commit_snapshot(index)
+
+    write_snapshot(snapshot, [("1", "A"), ("2", "B renamed"), ("4", "D")])
+    counts = write_station_changes(snapshot, changes, index, datetime(2024, 2, 1))
+    assert read_changes(changes) == [("close", "3"), ("insert", "4"), ("update", "2")]
+    assert counts["unchanged"] == 1
+
+
+def test_uncommitted_diff_is_repeated(tmp_path):
+    index = tmp_path / "hashes.csv"
+    snapshot, changes = tmp_path / "stations.csv", tmp_path / "changes.csv"
+    write_snapshot(snapshot, [("1", "A")])
+
+    write_station_changes(snapshot, changes, index)
+    # The load never committed, so the next run still sees station 1 as new
+    assert write_station_changes(snapshot, changes, index)["insert"] == 1
+    commit_snapshot(index)
+    assert list(load_index(index)) == ["1"]
+    assert write_station_changes(snapshot, changes, index)["unchanged"] == 1
+
+
+def test_snapshot_time_from_raw_name():
+    assert snapshot_time("data/raw/nrel_stations_20240102_030405.ndjson.gz") == datetime(2024, 1, 2, 3, 4, 5)
@@ -0,0 +1,89 @@
+"""
+Schema contract tests: rounding, typing and reject counting.
+"""
+
+import csv
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from etl import schema
+from etl.schema import Column, ContractWriter
+
+CONTRACT = [
+    Column("id", "integer", nullable=False),
+    Column("energy", "decimal", 3),
+    Column("started", "timestamp"),
+    Column("note", "string"),
+]
+ROWS = [
+    {"id": "1", "energy": "60.71234573492677", "started": "2024-01-01 08:30:00", "note": "ok"},
+    {"id": "2.0", "energy": "-0.00001", "started": "2024-01-01T09:00:00.250000", "note": ""},
+    {"id": "3", "energy": "abc", "started": "yesterday", "note": "bad values"},
+    {"id": "", "energy": "1", "started": "", "note": "missing id"},
+]
+EXPECTED = [
+    {"id": "1", "energy": "60.712", "started": "2024-01-01T08:30:00", "note": "ok"},
+    {"id": "2", "energy": "0.000", "started": "2024-01-01T09:00:00", "note": ""},
+    {"id": "3", "energy": "", "started": "", "note": "bad values"},
+]
+
+
+@pytest.mark.parametrize("arrow", [True, False])
+def test_contract_rounds_types_and_counts_rejects(tmp_path, monkeypatch, arrow):
+    if arrow:
+        pytest.importorskip("pyarrow")
+    else:
+        monkeypatch.setattr(schema, "pa", None)
+    out = tmp_path / "out.csv"
+    with ContractWriter(out, CONTRACT, batch_rows=2) as writer:
+        writer.write_many(ROWS)
+
+    with open(out, newline='', encoding='utf-8') as f:
+        assert list(csv.DictReader(f)) == EXPECTED
+    assert writer.rows_written == 3
+    assert writer.rows_rejected == 1
+    assert dict(writer.rejected_values) == {"energy": 1, "started": 1}
+
+
+def test_projected_nrel_extract_transforms_identically(tmp_path):
+    from data_sources.json_codec import NDJSONWriter, iter_ndjson
+    from data_sources.synthetic_data import generate_nrel_json
+    from etl.schema import NREL_CONTRACT, project, source_fields
+    from etl.transform import transform_nrel_stations
+
+    full = tmp_path / "nrel_full.ndjson"
+    projected = tmp_path / "nrel_projected.ndjson"
+    generate_nrel_json(full, 50)
+    fields = source_fields(NREL_CONTRACT)
+    with NDJSONWriter(projected) as writer:
+        writer.write_many(project(rec, fields) for rec in iter_ndjson(full))
+
+    transform_nrel_stations(full, tmp_path / "full.csv")
+    transform_nrel_stations(projected, tmp_path / "projected.csv")
+    assert (tmp_path / "full.csv").read_text() == (tmp_path / "projected.csv").read_text()
+    assert projected.stat().st_size < full.stat().st_size / 2
+
+
+@pytest.mark.parametrize("arrow", [True, False])
+def test_paths_round_decimal_text_and_bound_integers(tmp_path, monkeypatch, arrow):
+    if arrow:
+        pytest.importorskip("pyarrow")
+    else:
+        monkeypatch.setattr(schema, "pa", None)
+    contract = [Column("n", "integer"), Column("cost", "decimal", 2)]
+    rows = [{"n": "1e30", "cost": "2.675"}, {"n": "2.5", "cost": "-0.001"}, {"n": "-3.5", "cost": "1e20"}]
+    out = tmp_path / "out.csv"
+    with ContractWriter(out, contract) as writer:
+        writer.write_many(rows)
+
+    with open(out, newline='', encoding='utf-8') as f:
+        assert list(csv.DictReader(f)) == [
+            # Beyond int64 is rejected rather than crashing; 2.675 is not rounded as a float
+            {"n": "", "cost": "2.68"},
+            {"n": "2", "cost": "0.00"},
+            {"n": "-4", "cost": ""},
+        ]
+    assert dict(writer.rejected_values) == {"n": 1, "cost": 1}
@@ -0,0 +1,51 @@
+"""
+Fetch helper tests, run against an in-process stand-in cursor.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from database.snowflake_connector import (
+    fetch_to_parquet, iter_arrow_batches, iter_parquet_batches, read_sql_statements,
+)
+
+
+class ArrowConnection:
+    """Returns `chunks` pyarrow tables like Snowflake's result chunks."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetch_arrow_batches(self):
+        return iter(self.chunks)
+
+    def close(self):
+        pass
+
+
+def test_read_sql_statements_skips_comments(tmp_path):
+    path = tmp_path / "x.sql"
+    path.write_text("-- header\nSELECT 1;\n\n-- only a comment;\nSELECT 2;\n")
+    assert read_sql_statements(path) == ["-- header\nSELECT 1", "SELECT 2"]
+
+
+def test_batches_are_resliced_and_spilled(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    chunks = [pa.table({"id": list(range(i, i + 25))}) for i in (0, 25)]
+
+    sizes = [b.num_rows for b in iter_arrow_batches(ArrowConnection(chunks), "SELECT", batch_size=10)]
+    assert sizes == [10, 10, 5, 10, 10, 5]
+
+    path = tmp_path / "spill" / "facts.parquet"
+    assert fetch_to_parquet(ArrowConnection(chunks), "SELECT", path, batch_size=10) == 50
+    ids = [i for b in iter_parquet_batches(path, batch_size=20) for i in b.column("id").to_pylist()]
+    assert ids == list(range(50))
@@ -0,0 +1,64 @@
+"""
+Transform tests for the EV sessions staging output.
+Runs against the 20-row sample in reports/sample_data.csv.
+"""
+
+import csv
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from etl import metrics
+from etl.cities import CityIndex
+from etl.transform import (
+    concat_csv_shards, session_byte_ranges, transform_ev_sessions,
+    transform_ev_sessions_shard, transform_nrel_stations, transform_weather,
+)
+
+SAMPLE_CSV = Path(__file__).parent.parent / "reports" / "sample_data.csv"
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def test_sharded_transform_matches_serial(tmp_path):
+    serial = tmp_path / "serial.csv"
+    transform_ev_sessions(SAMPLE_CSV, serial)
+
+    ranges = session_byte_ranges(SAMPLE_CSV, 4)
+    assert len(ranges) > 1
+    shards = []
+    for i, (start, end) in enumerate(ranges):
+        shard = tmp_path / f"part{i}.csv"
+        transform_ev_sessions_shard(SAMPLE_CSV, shard, start, end)
+        shards.append(shard)
+    merged = tmp_path / "merged.csv"
+    concat_csv_shards(shards, merged)
+
+    assert merged.read_bytes() == serial.read_bytes()
+
+
+def test_timestamps_are_iso(tmp_path):
+    out = tmp_path / "out.csv"
+    transform_ev_sessions(SAMPLE_CSV, out)
+    rows = read_rows(out)
+    assert len(rows) == 20
+    assert rows[0]["Charging Start Time"] == "2024-01-01T00:00:00"
+
+
+def test_stage_metrics_count_the_bytes_written(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_DIR", tmp_path / "logs")
+    nrel, weather = tmp_path / "nrel.ndjson", tmp_path / "weather.ndjson"
+    nrel.write_text(json.dumps({"id": 1, "station_name": "A", "city": "Houston", "state": "TX",
+                                "ev_connector_types": ["J1772"]}) + "\n")
+    weather.write_text(json.dumps({"name": "Houston", "main": {"temp": 20.5, "humidity": 40},
+                                   "weather": [{"main": "Clear"}]}) + "\n")
+    transform_nrel_stations(nrel, tmp_path / "nrel.csv", cities=CityIndex())
+    transform_weather(weather, tmp_path / "weather.csv", cities=CityIndex())
+
+    written = {r["stage"]: r["bytes_written"] for r in metrics.read_run_records()}
+    assert written["transform_nrel_stations"] == (tmp_path / "nrel.csv").stat().st_size > 0
+    assert written["transform_weather"] == (tmp_path / "weather.csv").stat().st_size > 0